@@ -3,7 +3,6 @@ from flask_socketio import SocketIO
 from flask import Flask
 from config import Config
 from app.extensions import db, migrate, login_manager
-from flask_login import current_user
 
 socketio = SocketIO(cors_allowed_origins="*")
 
@@ -12,9 +11,11 @@ def create_app(config_class=Config):
     flask_app = Flask(__name__)
     flask_app.config.from_object(config_class)
 
+    from app.realtime import socketio_options
     socketio.init_app(
         flask_app,
-        async_mode=os.environ.get("SOCKETIO_ASYNC_MODE", "eventlet")
+        async_mode=os.environ.get("SOCKETIO_ASYNC_MODE", "eventlet"),
+        **socketio_options(flask_app.config),
     )
     # дальше как у тебя
     is_dev = flask_app.config.get("IS_DEV", False)
@@ -29,6 +30,22 @@ def create_app(config_class=Config):
     db.init_app(flask_app)
     migrate.init_app(flask_app, db)
 
+    from app.cache import init_feed_cache
+    init_feed_cache(flask_app)
+
+    from app.uploads import init_upload_queue
+    init_upload_queue(flask_app)
+
+    # resuming and scheduling jobs is left to the web server (app.jobs.start_background_jobs)
+    from app.jobs import init_job_runner
+    init_job_runner(flask_app)
+
+    from app.realtime import init_realtime
+    init_realtime(flask_app)
+
+    from app.query_stats import init_query_stats
+    init_query_stats(flask_app)
+
     # dev only: auto create tables when migrations are not in use
     if flask_app.config.get("AUTO_CREATE_DB", False):
         try:
@@ -56,11 +73,7 @@ def create_app(config_class=Config):
     from app.routes import bp as main_bp
     flask_app.register_blueprint(main_bp)
 
-    from app.services import ensure_admin_flag
-
-    @flask_app.before_request
-    def promote_admin_if_needed():
-        if current_user.is_authenticated:
-            ensure_admin_flag(current_user)
+    from app.cli import register_cli
+    register_cli(flask_app)
 
     return flask_app
\ No newline at end of file
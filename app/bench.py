@@ -0,0 +1,201 @@
+"""Route latency benchmarks (`flask bench`).
+
+Runs a fixed set of scenarios against seeded data (see app/seed.py) through
+the Flask test client, or against a running server with --base-url, and
+reports p50/p95/p99 latency and queries per request as JSON, so results can
+be diffed between releases. In-process runs count queries with
+count_queries(); remote runs read them from the Server-Timing header
+(QUERY_STATS_ENABLED=1 on the server).
+"""
+from __future__ import annotations
+
+import http.cookiejar
+import random
+import re
+import time
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models import User, Thread, Comment
+from app.query_stats import count_queries
+from app.seed import SEED_PASSWORD
+
+_SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+@dataclass
+class Response:
+    status: int
+    queries: Optional[int]
+
+
+class _InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, data=None, json=None) -> Response:
+        with count_queries() as stats:
+            resp = self.client.open(path, method=method, data=data, json=json)
+        return Response(resp.status_code, stats.count)
+
+
+class _HttpClient:
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+
+    def request(self, method: str, path: str, data=None, json=None) -> Response:
+        body, headers = None, {}
+        if json is not None:
+            import json as json_lib
+            body, headers = json_lib.dumps(json).encode(), {"Content-Type": "application/json"}
+        elif data is not None:
+            body = urllib.parse.urlencode(data).encode()
+        req = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers)
+        try:
+            resp = self.opener.open(req)
+        except urllib.error.HTTPError as err:  # 3xx/4xx still count as a request
+            resp = err
+        resp.read()
+        match = _SERVER_TIMING_QUERIES.search(", ".join(resp.headers.get_all("Server-Timing") or []))
+        return Response(resp.status, int(match.group(1)) if match else None)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return round(sorted_values[index], 2)
+
+
+def summarize(samples: List[float], queries: List[Optional[int]], errors: int) -> Dict[str, object]:
+    ordered = sorted(samples)
+    counted = [q for q in queries if q is not None]
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "p50_ms": _percentile(ordered, 50),
+        "p95_ms": _percentile(ordered, 95),
+        "p99_ms": _percentile(ordered, 99),
+        "mean_ms": round(sum(ordered) / len(ordered), 2),
+        "queries_per_request": round(sum(counted) / len(counted), 2) if counted else None,
+        "max_queries": max(counted) if counted else None,
+    }
+
+
+def _targets() -> Dict[str, object]:
+    """Pick the interesting rows: busiest thread, most prolific author, seed users."""
+    busiest = db.session.execute(
+        db.select(Thread.id).order_by(Thread.comment_count.desc(), Thread.id).limit(1)
+    ).scalar()
+    prolific = db.session.execute(
+        db.select(User.username)
+        .join(Thread, Thread.user_id == User.id)
+        .group_by(User.id, User.username)
+        .order_by(func.count(Thread.id).desc())
+        .limit(1)
+    ).scalar()
+    seed_users = db.session.execute(
+        db.select(User.username).where(User.username.like("seed\\_%", escape="\\")).order_by(User.id).limit(200)
+    ).scalars().all()
+    top_comment = db.session.execute(
+        db.select(Comment.id, Comment.post_id).where(Comment.post_id == busiest).limit(1)
+    ).first()
+    return {"thread_id": busiest, "username": prolific, "seed_users": seed_users, "comment": top_comment}
+
+
+def _deep_cursor(sort: str, pages: int) -> Optional[str]:
+    from app.services import get_threads_feed_after
+    after = None
+    for _ in range(pages):
+        page = get_threads_feed_after(after=after, sort=sort)
+        if not page.has_next:
+            break
+        after = page.next_cursor
+    return after
+
+
+def run_benchmarks(app, iterations: int = 50, base_url: Optional[str] = None, deep_pages: int = 20,
+                   only: Optional[List[str]] = None) -> Dict[str, object]:
+    with app.app_context():
+        targets = _targets()
+        deep = {sort: _deep_cursor(sort, deep_pages) for sort in ("new", "top", "discussed", "hot")}
+    if not targets["seed_users"] or targets["thread_id"] is None:
+        raise RuntimeError("No seeded data: run `flask seed` first")
+
+    def make_client(username: str):
+        client = _HttpClient(base_url) if base_url else _InProcessClient(app)
+        client.request("POST", "/login", data={"username": username, "password": SEED_PASSWORD})
+        return client
+
+    reader = make_client(targets["seed_users"][0])
+    # create_thread is rate limited per user (5/min), so writers rotate over
+    # a shuffled pool (back-to-back runs rarely pick the same accounts)
+    writer_pool = random.sample(targets["seed_users"][1:] or targets["seed_users"], k=len(targets["seed_users"][1:]) or 1)
+    writers: List = []
+
+    def writer(i: int):
+        n = (i + 1) // 5  # i == -1 is the warm-up request
+        while len(writers) <= n:
+            writers.append(make_client(writer_pool[len(writers) % len(writer_pool)]))
+        return writers[n]
+
+    thread_id, comment = targets["thread_id"], targets["comment"]
+    scenarios: Dict[str, Callable[[int], Response]] = {
+        "threads_new": lambda i: reader.request("GET", "/threads?sort=new"),
+        "threads_top": lambda i: reader.request("GET", "/threads?sort=top"),
+        "threads_discussed": lambda i: reader.request("GET", "/threads?sort=discussed"),
+        "threads_hot": lambda i: reader.request("GET", "/threads?sort=hot"),
+        "threads_top_week": lambda i: reader.request("GET", "/threads?sort=top&t=week"),
+        "thread_detail": lambda i: reader.request("GET", f"/thread/{thread_id}"),
+        "user_profile": lambda i: reader.request("GET", f"/user/{targets['username']}"),
+        "vote_post": lambda i: reader.request("POST", f"/thread/{thread_id}/vote", json={"value": 1}),
+        "create_thread": lambda i: writer(i).request(
+            "POST", "/", data={"title": f"bench {i}", "content": "benchmark thread"}
+        ),
+    }
+    for sort, after in deep.items():
+        if after:
+            query = urllib.parse.urlencode({"sort": sort, "after": after})
+            scenarios[f"threads_{sort}_deep"] = lambda i, q=query: reader.request("GET", f"/threads?{q}")
+    if comment is not None:
+        scenarios["vote_comment"] = lambda i: reader.request(
+            "POST", f"/thread/{comment.post_id}/comment/{comment.id}/vote", json={"value": 1}
+        )
+
+    results = {}
+    for name, run in scenarios.items():
+        if only and name not in only:
+            continue
+        if name == "create_thread":
+            writer(iterations - 1)  # log every writer in before timing starts
+        run(-1)  # warm-up (template compilation, caches)
+        samples, queries, errors = [], [], 0
+        for i in range(iterations):
+            started = time.perf_counter()
+            resp = run(i)
+            samples.append((time.perf_counter() - started) * 1000)
+            queries.append(resp.queries)
+            errors += resp.status >= 400
+        results[name] = summarize(samples, queries, errors)
+
+    return {
+        "meta": {
+            "iterations": iterations,
+            "target": base_url or "in-process",
+            "database": app.config.get("SQLALCHEMY_DATABASE_URI", "").split("://", 1)[0],
+            "feed_cache": bool(app.config.get("FEED_CACHE_ENABLED", True)),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scenarios": results,
+    }
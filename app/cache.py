@@ -0,0 +1,149 @@
+"""Small cache layer with pluggable backends.
+
+`memory://` (default) is a per-process TTL + LRU store; `redis://...` uses
+redis-py when it is installed. Anything with the redis-py
+get/set(ex=)/delete/incr API can be passed as a client (tests use a fake).
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+from flask import current_app
+
+
+class MemoryCache:
+    """Thread-safe TTL + LRU cache living in the current process."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl else 0
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            _expires_at, value = self._data.get(key, (0, 0))
+            value = int(value) + 1
+            self._data[key] = (0, value)
+            return value
+
+
+class RedisCache:
+    """Redis backend; values are stored as strings."""
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCache":
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("FEED_CACHE_URL points at Redis but the 'redis' package is not installed") from exc
+        return cls(redis.Redis.from_url(url, decode_responses=True))
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self.client.set(key, value, ex=ttl or None)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(key))
+
+
+def create_cache(url: Optional[str], max_entries: int = 256):
+    url = (url or "memory://").strip()
+    if url.startswith("memory://"):
+        return MemoryCache(max_entries=max_entries)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache.from_url(url)
+    raise RuntimeError(f"Unsupported cache URL: {url}")
+
+
+def init_feed_cache(app) -> None:
+    if "feed_cache" not in app.extensions:
+        app.extensions["feed_cache"] = create_cache(
+            app.config.get("FEED_CACHE_URL"),
+            max_entries=int(app.config.get("FEED_CACHE_MAX_ENTRIES", 256)),
+        )
+
+
+# Feed pages
+# Every key embeds a global and a per-sort generation number; invalidation
+# just bumps one, so all workers sharing a Redis backend drop their pages at once.
+_FEED_GENERATION_KEY = "feed:generation"
+
+
+def _feed_cache():
+    if not current_app.config.get("FEED_CACHE_ENABLED", True):
+        return None
+    return current_app.extensions.get("feed_cache")
+
+
+def _feed_key(cache, sort: str, after: Optional[str], per_page: int) -> str:
+    # sort is a feed sort, optionally with its top window ("top:day")
+    generation = cache.get(_FEED_GENERATION_KEY) or 0
+    sort_generation = cache.get(f"{_FEED_GENERATION_KEY}:{sort.split(':', 1)[0]}") or 0
+    return f"feed:{generation}.{sort_generation}:{sort}:{per_page}:{after or ''}"
+
+
+def get_feed_page(sort: str, after: Optional[str], per_page: int) -> Optional[dict]:
+    """Cached anonymous feed page: {"html": str, "post_ids": [int]} or None."""
+    cache = _feed_cache()
+    if cache is None:
+        return None
+    raw = cache.get(_feed_key(cache, sort, after, per_page))
+    if raw is None:
+        return None
+    return json.loads(raw)
+
+
+def set_feed_page(sort: str, after: Optional[str], per_page: int, page: dict) -> None:
+    cache = _feed_cache()
+    if cache is None:
+        return
+    ttl = int(current_app.config.get("FEED_CACHE_TTL", 30))
+    cache.set(_feed_key(cache, sort, after, per_page), json.dumps(page), ttl)
+
+
+def invalidate_feed_cache(sorts: Optional[Iterable[str]] = None) -> None:
+    """Drop every cached feed page, or only the pages of `sorts`."""
+    cache = _feed_cache()
+    if cache is None:
+        return
+    if sorts is None:
+        cache.incr(_FEED_GENERATION_KEY)
+        return
+    for sort in sorts:
+        cache.incr(f"{_FEED_GENERATION_KEY}:{sort}")
@@ -0,0 +1,90 @@
+import contextvars
+import json
+
+import click
+
+
+def register_cli(app) -> None:
+    @app.cli.command("seed")
+    @click.option("--users", default=100, show_default=True, help="Accounts to create")
+    @click.option("--threads", default=1000, show_default=True, help="Threads to create")
+    @click.option("--comments", default=10000, show_default=True, help="Comments (skewed towards hot threads)")
+    @click.option("--votes", default=20000, show_default=True, help="Votes (2/3 threads, 1/3 comments)")
+    @click.option("--seed", "random_seed", default=0, show_default=True, help="Random seed")
+    def seed_command(users, threads, comments, votes, random_seed):
+        """Bulk-insert synthetic data for benchmarks."""
+        from app.seed import SEED_PASSWORD, seed_data
+
+        result = seed_data(users=users, threads=threads, comments=comments, votes=votes, seed=random_seed)
+        click.echo(
+            f"Seeded {result.users} users, {result.threads} threads, {result.comments} comments, "
+            f"{result.post_votes + result.comment_votes} votes "
+            f"(login: seed_{result.first_user_id} / {SEED_PASSWORD})"
+        )
+
+    @app.cli.command("reconcile-counters")
+    @click.option("--chunk-size", default=None, type=int, help="Ids per UPDATE (default COUNTER_RECONCILE_CHUNK)")
+    @click.option("--dry-run", is_flag=True, help="Only report the drift")
+    def reconcile_counters_command(chunk_size, dry_run):
+        """Recompute post.score / comment_count / hot_rank, comment.score and
+        user.thread_count / comment_count."""
+        from app.counters import reconcile_counters
+
+        report = reconcile_counters(chunk_size=chunk_size, dry_run=dry_run)
+        for name, drift in report.counters.items():
+            click.echo(f"{name}: {drift.rows} rows off by {drift.total} in total")
+        click.echo(("Would fix" if dry_run else "Fixed") + f" {report.rows} rows")
+
+    @app.cli.command("rebuild-vote-rollups")
+    def rebuild_vote_rollups_command():
+        """Refill the day/week/month top feeds from post_votes."""
+        from app.cache import invalidate_feed_cache
+        from app.rollups import rebuild_rollups
+
+        report = rebuild_rollups()
+        invalidate_feed_cache()
+        click.echo(f"Top threads: day {report['day']}, week {report['week']}, month {report['month']}")
+
+    @app.cli.command("rerender-content")
+    @click.option("--chunk-size", default=1000, show_default=True, help="Rows per UPDATE batch")
+    def rerender_content_command(chunk_size):
+        """Re-render stored content_html older than RENDERER_VERSION, in this process."""
+        from app.cache import invalidate_feed_cache
+        from app.rendering import rerender_stale
+
+        rows = rerender_stale(chunk_size=chunk_size)
+        invalidate_feed_cache()
+        click.echo(f"Re-rendered {rows} rows")
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index_command():
+        """Re-read the SQLite FTS5 search tables from post / comment."""
+        from app.search import rebuild_search_index
+
+        rebuild_search_index()
+        click.echo("Search index rebuilt")
+
+    @app.cli.command("bench")
+    @click.option("--iterations", "-n", default=50, show_default=True, help="Requests per scenario")
+    @click.option("--base-url", default=None, help="Benchmark a running server instead of the test client")
+    @click.option("--deep-pages", default=20, show_default=True, help="Cursor depth for the deep feed pages")
+    @click.option("--scenario", "only", multiple=True, help="Run only these scenarios")
+    @click.option("--no-feed-cache", is_flag=True, help="Render /threads on every request")
+    @click.option("--output", "-o", type=click.Path(dir_okay=False), default=None, help="Write JSON here")
+    def bench_command(iterations, base_url, deep_pages, only, no_feed_cache, output):
+        """Report p50/p95/p99 latency and queries per request for the main routes."""
+        from app.bench import run_benchmarks
+
+        if no_feed_cache:
+            app.config["FEED_CACHE_ENABLED"] = False
+        # `flask` pushes an app context for every command; the test client would
+        # reuse it (shared g and session across requests), so run in a clean one
+        report = contextvars.Context().run(
+            run_benchmarks, app, iterations=iterations, base_url=base_url, deep_pages=deep_pages,
+            only=list(only) or None,
+        )
+        text = json.dumps(report, indent=2)
+        if output:
+            with open(output, "w", encoding="utf-8") as fh:
+                fh.write(text + "\n")
+        click.echo(text)
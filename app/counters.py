@@ -0,0 +1,195 @@
+"""Reconciliation of the denormalized counters.
+
+post.score, post.comment_count, comment.score and user.thread_count /
+comment_count are kept up to date incrementally by the services; this
+recomputes them from post_votes, comment_votes, comment and post and fixes
+whatever drifted. post.hot_rank is recomputed from the corrected counters
+(app.ranking) before the user counters are checked.
+
+Each counter is processed in id ranges of COUNTER_RECONCILE_CHUNK rows: one
+grouped SELECT measures the drift, one `UPDATE ... FROM (grouped subquery)`
+rewrites only the rows that differ, then the chunk commits. Runs from
+`flask reconcile-counters` and, every COUNTER_RECONCILE_INTERVAL seconds,
+as a background admin job (app.jobs), so the report ends up on the
+admin page.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+
+from app.extensions import db
+from app.models import User, Thread, Comment, PostVote, CommentVote
+from app.ranking import refresh_hot_ranks
+
+ProgressCallback = Callable[[int, int], None]
+
+
+@dataclass
+class CounterDrift:
+    rows: int = 0     # rows whose stored value was wrong
+    total: float = 0  # sum of |stored - actual| over those rows
+
+
+@dataclass
+class ReconcileReport:
+    counters: Dict[str, CounterDrift] = field(default_factory=dict)
+    dry_run: bool = False
+
+    @property
+    def rows(self) -> int:
+        return sum(d.rows for d in self.counters.values())
+
+    def summary(self) -> str:
+        verb = "Расхождений" if self.dry_run else "Исправлено"
+        parts = [f"{name}: {d.rows} (Σ{d.total})" for name, d in self.counters.items()]
+        return f"{verb}: " + ", ".join(parts)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "dry_run": self.dry_run,
+            "counters": {name: {"rows": d.rows, "total": d.total} for name, d in self.counters.items()},
+        }
+
+
+def _post_score(lo: int, hi: int):
+    post = aliased(Thread)
+    return (
+        db.select(post.id.label("id"), func.coalesce(func.sum(PostVote.value), 0).label("value"))
+        .select_from(post)
+        .outerjoin(PostVote, PostVote.post_id == post.id)
+        .where(post.id.between(lo, hi))
+        .group_by(post.id)
+    )
+
+
+def _post_comment_count(lo: int, hi: int):
+    post = aliased(Thread)
+    return (
+        db.select(post.id.label("id"), func.count(Comment.id).label("value"))
+        .select_from(post)
+        .outerjoin(Comment, Comment.post_id == post.id)
+        .where(post.id.between(lo, hi))
+        .group_by(post.id)
+    )
+
+
+def _comment_score(lo: int, hi: int):
+    comment = aliased(Comment)
+    return (
+        db.select(comment.id.label("id"), func.coalesce(func.sum(CommentVote.value), 0).label("value"))
+        .select_from(comment)
+        .outerjoin(CommentVote, CommentVote.comment_id == comment.id)
+        .where(comment.id.between(lo, hi))
+        .group_by(comment.id)
+    )
+
+
+def _user_thread_count(lo: int, hi: int):
+    user = aliased(User)
+    return (
+        db.select(user.id.label("id"), func.count(Thread.id).label("value"))
+        .select_from(user)
+        .outerjoin(Thread, Thread.user_id == user.id)
+        .where(user.id.between(lo, hi))
+        .group_by(user.id)
+    )
+
+
+def _user_comment_count(lo: int, hi: int):
+    user = aliased(User)
+    return (
+        db.select(user.id.label("id"), func.count(Comment.id).label("value"))
+        .select_from(user)
+        .outerjoin(Comment, Comment.user_id == user.id)
+        .where(user.id.between(lo, hi))
+        .group_by(user.id)
+    )
+
+
+# name -> (model, counter column, grouped "actual value" select for an id range);
+# hot_rank has no SQL formula (log10 is not portable) and is computed in Python
+COUNTERS = {
+    "post.score": (Thread, "score", _post_score),
+    "post.comment_count": (Thread, "comment_count", _post_comment_count),
+    "comment.score": (Comment, "score", _comment_score),
+    "post.hot_rank": (Thread, "hot_rank", None),
+    "user.thread_count": (User, "thread_count", _user_thread_count),
+    "user.comment_count": (User, "comment_count", _user_comment_count),
+}
+
+
+def _id_ranges(model, chunk_size: int):
+    lo, hi = db.session.execute(db.select(func.min(model.id), func.max(model.id))).one()
+    if lo is None:
+        return []
+    return [(start, min(start + chunk_size - 1, hi)) for start in range(lo, hi + 1, chunk_size)]
+
+
+def _reconcile_hot_range(lo: int, hi: int, dry_run: bool) -> CounterDrift:
+    rows, total = refresh_hot_ranks(Thread.id.between(lo, hi), dry_run)
+    db.session.commit()
+    return CounterDrift(rows=rows, total=total)
+
+
+def _reconcile_range(model, column_name: str, actual_select, dry_run: bool) -> CounterDrift:
+    column = getattr(model, column_name)
+    actual = actual_select.subquery("actual")
+    differs = (model.id == actual.c.id, column != actual.c.value)
+
+    rows, total = db.session.execute(
+        db.select(func.count(), func.coalesce(func.sum(func.abs(column - actual.c.value)), 0)).where(*differs)
+    ).one()
+    if rows and not dry_run:
+        db.session.execute(
+            db.update(model)
+            .where(*differs)
+            .values({column_name: actual.c.value})
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+    return CounterDrift(rows=int(rows), total=int(total))
+
+
+def reconcile_counters(
+    chunk_size: Optional[int] = None,
+    dry_run: bool = False,
+    progress: Optional[ProgressCallback] = None,
+) -> ReconcileReport:
+    """Recompute every counter in COUNTERS: post.score, post.comment_count,
+    comment.score, post.hot_rank and user.thread_count / comment_count.
+
+    Returns the drift found (and fixed unless dry_run).
+    """
+    chunk_size = max(1, int(chunk_size or current_app.config.get("COUNTER_RECONCILE_CHUNK", 5000)))
+    plan = [(name, _id_ranges(model, chunk_size)) for name, (model, _, _) in COUNTERS.items()]
+    total_chunks = sum(len(ranges) for _, ranges in plan)
+
+    report = ReconcileReport(dry_run=dry_run)
+    done = 0
+    if progress is not None:
+        progress(done, total_chunks)
+    for name, ranges in plan:
+        model, column_name, actual_for = COUNTERS[name]
+        drift = report.counters.setdefault(name, CounterDrift())
+        for lo, hi in ranges:
+            if actual_for is None:
+                chunk = _reconcile_hot_range(lo, hi, dry_run)
+            else:
+                chunk = _reconcile_range(model, column_name, actual_for(lo, hi), dry_run)
+            drift.rows += chunk.rows
+            drift.total += chunk.total
+            done += 1
+            if progress is not None:
+                progress(done, total_chunks)
+
+    if report.rows and not dry_run:
+        current_app.logger.warning("Counter drift fixed: %s", report.to_dict())
+        from app.cache import invalidate_feed_cache
+        invalidate_feed_cache()
+    return report
+
@@ -0,0 +1,255 @@
+"""Set-based deletes for comments, threads and whole accounts.
+
+Everything is removed with `DELETE ... WHERE ... IN (...)` statements, and
+the dependent rows go first, so nothing is left pointing at a deleted row:
+
+    comment_votes -> comment (replies before parents) -> post_votes
+    -> vote rollups -> post
+    -> the user's own votes -> updates -> user
+
+Large deletions run in chunks of DELETE_CHUNK_SIZE ids, each chunk in its own
+transaction, so no single statement holds row locks for long. Scores and
+comment counts of content that survives (threads the users commented on or
+voted for, comments they voted for) and the thread/comment counts of
+surviving authors are recomputed in bulk at the end.
+
+The purge functions take an optional `progress(done, total)` callback that
+is called after every chunk (app.jobs stores it on the AdminJob row).
+
+Deleted rows are not synchronized into the session: ORM objects loaded
+before the purge are expired by the chunk commits and must not be touched
+afterwards — keep their ids instead.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Set
+
+from flask import current_app
+from sqlalchemy import func, literal
+
+from app.extensions import db
+from app.models import User, Thread, Comment, PostVote, CommentVote, Update, PostVoteRollup, PostPeriodScore
+from app.ranking import refresh_hot_ranks
+from app.rollups import retract_post_votes
+
+ProgressCallback = Callable[[int, int], None]
+
+
+@dataclass(frozen=True)
+class PurgeStats:
+    users: int = 0
+    threads: int = 0
+    comments: int = 0
+    votes: int = 0
+    updates: int = 0
+
+
+def _chunk_size() -> int:
+    return max(1, int(current_app.config.get("DELETE_CHUNK_SIZE", 1000)))
+
+
+class _Progress:
+    def __init__(self, callback: Optional[ProgressCallback], total: int):
+        self.callback = callback
+        self.total = total
+        self.done = 0
+        self.advance(0)
+
+    def advance(self, n: int) -> None:
+        self.done += n
+        if self.callback is not None:
+            self.callback(self.done, self.total)
+
+
+def _chunks(ids: List[int], size: int) -> Iterable[List[int]]:
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _delete(model, where) -> int:
+    result = db.session.execute(
+        db.delete(model).where(where).execution_options(synchronize_session=False)
+    )
+    return max(0, result.rowcount or 0)
+
+
+def _comment_subtrees(where) -> List[int]:
+    """Ids of the matching comments and all their replies, deepest first."""
+    tree = (
+        db.select(Comment.id, literal(0).label("depth"))
+        .where(where)
+        .cte("doomed_comments", recursive=True)
+    )
+    tree = tree.union(
+        db.select(Comment.id, tree.c.depth + 1).where(Comment.parent_id == tree.c.id)
+    )
+    depth = func.max(tree.c.depth)
+    return list(db.session.execute(
+        db.select(tree.c.id).group_by(tree.c.id).order_by(depth.desc(), tree.c.id)
+    ).scalars())
+
+
+def _delete_comments(comment_ids: List[int], touched_threads: Set[int], touched_users: Set[int],
+                     progress: _Progress) -> tuple[int, int]:
+    """Delete comments (already ordered replies first) with their votes."""
+    comments = votes = 0
+    for chunk in _chunks(comment_ids, _chunk_size()):
+        for thread_id, user_id in db.session.execute(
+            db.select(Comment.post_id, Comment.user_id).where(Comment.id.in_(chunk)).distinct()
+        ):
+            touched_threads.add(thread_id)
+            touched_users.add(user_id)
+        votes += _delete(CommentVote, CommentVote.comment_id.in_(chunk))
+        comments += _delete(Comment, Comment.id.in_(chunk))
+        db.session.commit()
+        progress.advance(len(chunk))
+    return comments, votes
+
+
+def _delete_threads(thread_ids: List[int], touched_users: Set[int], progress: _Progress) -> tuple[int, int, int]:
+    """Delete threads with every comment on them and all votes on both."""
+    threads = comments = votes = 0
+    for chunk in _chunks(thread_ids, _chunk_size()):
+        touched_users.update(db.session.execute(
+            db.select(Thread.user_id).where(Thread.id.in_(chunk))
+            .union(db.select(Comment.user_id).where(Comment.post_id.in_(chunk)))
+        ).scalars())
+        thread_comments = db.select(Comment.id).where(Comment.post_id.in_(chunk))
+        votes += _delete(CommentVote, CommentVote.comment_id.in_(thread_comments))
+        # one statement per chunk, so replies and their parents go together
+        comments += _delete(Comment, Comment.post_id.in_(chunk))
+        votes += _delete(PostVote, PostVote.post_id.in_(chunk))
+        _delete(PostVoteRollup, PostVoteRollup.post_id.in_(chunk))
+        _delete(PostPeriodScore, PostPeriodScore.post_id.in_(chunk))
+        threads += _delete(Thread, Thread.id.in_(chunk))
+        db.session.commit()
+        progress.advance(len(chunk))
+    return threads, comments, votes
+
+
+def recount_threads(thread_ids: Iterable[int]) -> None:
+    """Recompute score, comment_count (and so hot_rank) from the vote and comment tables."""
+    ids = sorted(set(thread_ids))
+    score = db.select(func.coalesce(func.sum(PostVote.value), 0)).where(PostVote.post_id == Thread.id)
+    count = db.select(func.count(Comment.id)).where(Comment.post_id == Thread.id)
+    for chunk in _chunks(ids, _chunk_size()):
+        db.session.execute(
+            db.update(Thread)
+            .where(Thread.id.in_(chunk))
+            .values(score=score.scalar_subquery(), comment_count=count.scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+        refresh_hot_ranks(Thread.id.in_(chunk))
+    db.session.commit()
+
+
+def recount_comments(comment_ids: Iterable[int]) -> None:
+    ids = sorted(set(comment_ids))
+    score = db.select(func.coalesce(func.sum(CommentVote.value), 0)).where(CommentVote.comment_id == Comment.id)
+    for chunk in _chunks(ids, _chunk_size()):
+        db.session.execute(
+            db.update(Comment)
+            .where(Comment.id.in_(chunk))
+            .values(score=score.scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+
+
+def recount_users(user_ids: Iterable[int]) -> None:
+    """Recompute thread_count and comment_count of the surviving authors."""
+    ids = sorted(set(user_ids))
+    threads = db.select(func.count(Thread.id)).where(Thread.user_id == User.id)
+    comments = db.select(func.count(Comment.id)).where(Comment.user_id == User.id)
+    for chunk in _chunks(ids, _chunk_size()):
+        db.session.execute(
+            db.update(User)
+            .where(User.id.in_(chunk))
+            .values(thread_count=threads.scalar_subquery(), comment_count=comments.scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+
+
+def _thread_ids_of(user_ids: List[int]) -> List[int]:
+    return list(db.session.execute(
+        db.select(Thread.id).where(Thread.user_id.in_(user_ids)).order_by(Thread.id)
+    ).scalars())
+
+
+def purge_comments(comment_ids: Iterable[int], progress: Optional[ProgressCallback] = None) -> PurgeStats:
+    """Delete comments with all their replies and every vote on them."""
+    ids = sorted({int(x) for x in comment_ids})
+    if not ids:
+        return PurgeStats()
+    doomed = _comment_subtrees(Comment.id.in_(ids))
+    touched_threads: Set[int] = set()
+    touched_users: Set[int] = set()
+    comments, votes = _delete_comments(doomed, touched_threads, touched_users, _Progress(progress, len(doomed)))
+    recount_threads(touched_threads)
+    recount_users(touched_users)
+    return PurgeStats(comments=comments, votes=votes)
+
+
+def purge_threads(thread_ids: Iterable[int], progress: Optional[ProgressCallback] = None) -> PurgeStats:
+    """Delete threads, their comments and every vote on them."""
+    ids = sorted({int(x) for x in thread_ids})
+    touched_users: Set[int] = set()
+    threads, comments, votes = _delete_threads(ids, touched_users, _Progress(progress, len(ids)))
+    recount_users(touched_users)
+    return PurgeStats(threads=threads, comments=comments, votes=votes)
+
+
+def purge_user_threads(user_ids: Iterable[int], progress: Optional[ProgressCallback] = None) -> PurgeStats:
+    """Delete every thread authored by these users (the accounts stay)."""
+    return purge_threads(_thread_ids_of(sorted({int(x) for x in user_ids})), progress)
+
+
+def purge_users(user_ids: Iterable[int], progress: Optional[ProgressCallback] = None) -> PurgeStats:
+    """Delete accounts with their threads, comments, votes and updates."""
+    ids = sorted({int(x) for x in user_ids})
+    if not ids:
+        return PurgeStats()
+
+    # content that survives but loses votes or comments
+    touched_threads: Set[int] = set(db.session.execute(
+        db.select(PostVote.post_id).where(PostVote.user_id.in_(ids)).distinct()
+    ).scalars())
+    touched_comments: Set[int] = set(db.session.execute(
+        db.select(CommentVote.comment_id).where(CommentVote.user_id.in_(ids)).distinct()
+    ).scalars())
+
+    # their comments on other people's threads, with the replies under them
+    own_threads = db.select(Thread.id).where(Thread.user_id.in_(ids))
+    comment_ids = _comment_subtrees(Comment.user_id.in_(ids) & Comment.post_id.not_in(own_threads))
+    thread_ids = _thread_ids_of(ids)
+    tracker = _Progress(progress, len(comment_ids) + len(thread_ids))
+
+    touched_users: Set[int] = set()
+    comments, votes = _delete_comments(comment_ids, touched_threads, touched_users, tracker)
+    threads, thread_comments, thread_votes = _delete_threads(thread_ids, touched_users, tracker)
+    comments += thread_comments
+    votes += thread_votes
+
+    # their votes leave the day/week/month leaderboards too (app.rollups)
+    retract_post_votes(db.session.execute(
+        db.select(PostVote.post_id, PostVote.value, PostVote.updated_at).where(PostVote.user_id.in_(ids))
+    ).all())
+    votes += _delete(PostVote, PostVote.user_id.in_(ids))
+    votes += _delete(CommentVote, CommentVote.user_id.in_(ids))
+    db.session.execute(
+        db.update(Comment)
+        .where(Comment.reply_to_user_id.in_(ids))
+        .values(reply_to_user_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    updates = _delete(Update, Update.author_id.in_(ids))
+    users = _delete(User, User.id.in_(ids))
+    db.session.commit()
+
+    recount_threads(touched_threads)
+    recount_comments(touched_comments)
+    recount_users(touched_users.difference(ids))
+
+    return PurgeStats(users=users, threads=threads, comments=comments, votes=votes, updates=updates)
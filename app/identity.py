@@ -0,0 +1,115 @@
+"""Logged-in user identity for Flask-Login.
+
+`load_user` runs on every authenticated request (and Socket.IO connect), but
+pages only need who the user is: id, username, display_name, avatar_url and
+is_admin. Those are kept as small immutable snapshots in a per-process
+TTL + LRU cache; `current_user` wraps one and loads the full ORM `User` only
+when something else is read (bio, age, ...) or a write needs `.orm`.
+
+Profile/avatar/admin writes call `invalidate_user`; other workers pick the
+change up after USER_CACHE_TTL seconds.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+from flask import current_app
+from flask_login import UserMixin
+
+from app.cache import MemoryCache
+from app.extensions import db
+from app.models import User
+
+
+class UserSnapshot:
+    __slots__ = ("id", "username", "display_name", "avatar_url", "is_admin")
+
+    def __init__(self, id: int, username: str, display_name: Optional[str], avatar_url: Optional[str],
+                 is_admin: bool):
+        self.id = id
+        self.username = username
+        self.display_name = display_name
+        self.avatar_url = avatar_url
+        self.is_admin = bool(is_admin)
+
+
+class CurrentUser(UserMixin):
+    """Per-request `current_user`: snapshot fields, full row on demand."""
+
+    def __init__(self, snapshot: UserSnapshot):
+        self._snapshot = snapshot
+        self._orm = None
+
+    id = property(lambda self: self._snapshot.id)
+    username = property(lambda self: self._snapshot.username)
+    display_name = property(lambda self: self._snapshot.display_name)
+    avatar_url = property(lambda self: self._snapshot.avatar_url)
+    is_admin = property(lambda self: self._snapshot.is_admin)
+
+    @property
+    def orm(self) -> User:
+        """The full `User` row, loaded once; use it for writes."""
+        if self._orm is None:
+            self._orm = db.session.get(User, self._snapshot.id)
+        return self._orm
+
+    def __getattr__(self, name):
+        # only reached for attributes the snapshot does not have
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.orm, name)
+
+    def __repr__(self):
+        return f'<CurrentUser {self.username}>'
+
+
+def _user_cache() -> Optional[MemoryCache]:
+    size = int(current_app.config.get("USER_CACHE_SIZE", 0) or 0)
+    if size <= 0:
+        return None
+    cache = current_app.extensions.get("user_cache")
+    if cache is None or cache.max_entries != size:
+        cache = current_app.extensions["user_cache"] = MemoryCache(max_entries=size)
+    return cache
+
+
+def _key(user_id: int) -> str:
+    return f"user:{int(user_id)}"
+
+
+def _load_snapshot(user_id: int) -> Optional[UserSnapshot]:
+    row = db.session.execute(
+        db.select(User.id, User.username, User.display_name, User.avatar_url, User.is_admin)
+        .where(User.id == user_id)
+    ).first()
+    return UserSnapshot(*row) if row is not None else None
+
+
+def get_user_snapshot(user_id: int) -> Optional[UserSnapshot]:
+    cache = _user_cache()
+    if cache is None:
+        return _load_snapshot(user_id)
+
+    snapshot = cache.get(_key(user_id))
+    if snapshot is None:
+        snapshot = _load_snapshot(user_id)
+        if snapshot is not None:
+            cache.set(_key(user_id), snapshot, int(current_app.config.get("USER_CACHE_TTL", 60)))
+    return snapshot
+
+
+def load_current_user(user_id) -> Optional[CurrentUser]:
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    snapshot = get_user_snapshot(user_id)
+    return CurrentUser(snapshot) if snapshot is not None else None
+
+
+def invalidate_user(*user_ids: int) -> None:
+    cache = _user_cache()
+    if cache is None:
+        return
+    for user_id in user_ids:
+        cache.delete(_key(user_id))
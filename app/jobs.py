@@ -0,0 +1,342 @@
+"""Background runner for long admin operations.
+
+Admin routes insert an AdminJob row and hand its id to a small worker pool,
+so the request returns right away. The handler runs in its own app context,
+writes progress into the row after every chunk (see app.deletion) and the
+admin page polls /admin/jobs to show it.
+
+Rows are durable: on startup, queued jobs and running jobs that stopped
+reporting progress (the process died) are picked up again. Handlers must be
+idempotent; the deletions are, a rerun just finishes the remaining work.
+
+JOB_QUEUE_MODE = "thread" (default) runs jobs in a thread pool (green
+threads under eventlet); "inline" runs them right away in the caller, which
+is what tests use.
+
+Maintenance jobs in PERIODIC_JOBS are enqueued by a daemon thread every
+<interval config key> seconds, with actor_id NULL; finished ones older than
+PERIODIC_JOB_RETENTION_DAYS are pruned at the same time. Every web worker
+runs these threads; enqueue_scheduled() keeps it to one job per kind.
+
+Resuming and scheduling (and the ADMIN_USERNAMES promotion) happen in
+start_background_jobs(), which only the web server calls (gunicorn.conf.py,
+run.py), not create_app(): CLI commands such as `flask db upgrade` must not
+claim jobs or write rows, the pool is joined at exit.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import JSON, DateTime, Integer, String, literal
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.extensions import db
+from app.models import AdminJob
+
+ProgressCallback = Callable[[int, int], None]
+JobHandler = Callable[[Dict[str, Any], ProgressCallback], str]
+
+# kind -> handler(params, progress) returning a one-line summary
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# kind -> config key with its interval in seconds (0 = off)
+PERIODIC_JOBS = {
+    "reconcile_counters": "COUNTER_RECONCILE_INTERVAL",
+    "compact_vote_rollups": "VOTE_ROLLUP_INTERVAL",
+    "clear_upload_placeholders": "UPLOAD_PLACEHOLDER_SWEEP_INTERVAL",
+}
+
+
+def job_handler(kind: str):
+    def register(fn: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobRunner:
+    def __init__(self, app, mode: str = "thread", workers: int = 1, stale_after: float = 300):
+        self.app = app
+        self.mode = mode
+        self.stale_after = float(stale_after)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="admin-job") if mode == "thread" else None
+
+    def submit(self, job_id: int) -> None:
+        if self._executor is None:
+            self._run(job_id)
+        else:
+            self._executor.submit(self._run, job_id)
+
+    def _run(self, job_id: int) -> None:
+        with self.app.app_context():
+            if not self._claim(job_id):
+                return  # another worker got it, or it is already finished
+            job = db.session.get(AdminJob, job_id)
+            handler = JOB_HANDLERS.get(job.kind)
+            try:
+                if handler is None:
+                    raise LookupError(f"unknown job kind: {job.kind}")
+                summary = handler(dict(job.params or {}), lambda done, total: self._report(job_id, done, total))
+            except Exception as exc:
+                db.session.rollback()
+                current_app.logger.exception("Admin job %s (%s) failed", job_id, job.kind)
+                self._finish(job_id, status="failed", error=str(exc)[:512] or type(exc).__name__)
+            else:
+                self._finish(job_id, status="done", summary=(summary or "")[:256])
+
+    def _claim(self, job_id: int) -> bool:
+        result = db.session.execute(
+            db.update(AdminJob)
+            .where(AdminJob.id == job_id, AdminJob.status == "queued")
+            .values(status="running", updated_at=_now())
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def _report(self, job_id: int, done: int, total: int) -> None:
+        db.session.execute(
+            db.update(AdminJob)
+            .where(AdminJob.id == job_id)
+            .values(done=done, total=total, updated_at=_now())
+        )
+        db.session.commit()
+
+    def _finish(self, job_id: int, **values) -> None:
+        now = _now()
+        db.session.execute(
+            db.update(AdminJob)
+            .where(AdminJob.id == job_id)
+            .values(updated_at=now, finished_at=now, **values)
+        )
+        db.session.commit()
+
+    def resume(self) -> int:
+        """Resubmit queued jobs and running ones with no progress for stale_after seconds."""
+        stale = _now() - timedelta(seconds=self.stale_after)
+        db.session.execute(
+            db.update(AdminJob)
+            .where(AdminJob.status == "running", AdminJob.updated_at < stale)
+            .values(status="queued")
+        )
+        db.session.commit()
+        job_ids = db.session.execute(
+            db.select(AdminJob.id).where(AdminJob.status == "queued").order_by(AdminJob.id)
+        ).scalars().all()
+        for job_id in job_ids:
+            self.submit(job_id)
+        return len(job_ids)
+
+
+def init_job_runner(app) -> None:
+    if "job_runner" not in app.extensions:
+        app.extensions["job_runner"] = JobRunner(
+            app,
+            mode=app.config.get("JOB_QUEUE_MODE", "thread"),
+            workers=int(app.config.get("JOB_QUEUE_WORKERS", 1)),
+            stale_after=float(app.config.get("JOB_STALE_SECONDS", 300)),
+        )
+
+
+def job_runner() -> JobRunner:
+    return current_app.extensions["job_runner"]
+
+
+def enqueue_job(kind: str, params: Dict[str, Any], actor_id: Optional[int]) -> int:
+    """Store the job row and hand it to the runner; returns the job id."""
+    if kind not in JOB_HANDLERS:
+        raise LookupError(f"unknown job kind: {kind}")
+    job = AdminJob(kind=kind, params=params, actor_id=actor_id, status="queued")
+    db.session.add(job)
+    db.session.commit()
+    job_id = job.id
+    job_runner().submit(job_id)
+    return job_id
+
+
+def enqueue_scheduled(kind: str, params: Dict[str, Any], skip_if=None) -> Optional[int]:
+    """Enqueue an actor-less job unless one of `kind` is active or matches
+    the `skip_if` condition; returns the job id or None.
+
+    The check and the insert are one INSERT ... SELECT ... WHERE NOT EXISTS,
+    and uq_admin_jobs_scheduled_active rejects the second of two concurrent
+    inserts, so several workers scheduling at once enqueue a single job.
+    """
+    if kind not in JOB_HANDLERS:
+        raise LookupError(f"unknown job kind: {kind}")
+    now = _now()
+    blocking = AdminJob.status.in_(ACTIVE_STATUSES)
+    if skip_if is not None:
+        blocking = blocking | skip_if
+    row = db.select(
+        literal(kind, String), literal(params, JSON), literal("queued", String),
+        literal(0, Integer), literal(0, Integer), literal(now, DateTime), literal(now, DateTime),
+    ).where(~db.select(AdminJob.id).where(AdminJob.kind == kind, blocking).exists())
+    insert = db.insert(AdminJob).from_select(
+        ["kind", "params", "status", "done", "total", "created_at", "updated_at"], row
+    ).returning(AdminJob.id)
+    try:
+        job_id = db.session.execute(insert).scalar()
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return None
+    if job_id is not None:
+        job_runner().submit(job_id)
+    return job_id
+
+
+def recent_jobs(limit: int = 10) -> List[AdminJob]:
+    return db.session.execute(
+        db.select(AdminJob).order_by(AdminJob.id.desc()).limit(limit)
+    ).scalars().all()
+
+
+def job_to_dict(job: AdminJob) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "done": job.done,
+        "total": job.total,
+        "percent": job.percent,
+        "summary": job.summary,
+        "error": job.error,
+    }
+
+
+def schedule_due(app, kind: str, interval: float) -> Optional[int]:
+    """Enqueue `kind` unless one ran (or is running) within the interval."""
+    with app.app_context():
+        now = _now()
+        db.session.execute(
+            db.delete(AdminJob)
+            .where(AdminJob.kind == kind, AdminJob.actor_id.is_(None), AdminJob.status == "done")
+            .where(AdminJob.finished_at < now - timedelta(days=app.config.get("PERIODIC_JOB_RETENTION_DAYS", 7)))
+        )
+        db.session.commit()
+        return enqueue_scheduled(kind, {}, skip_if=AdminJob.created_at >= now - timedelta(seconds=interval))
+
+
+def init_periodic_jobs(app) -> None:
+    """Start one scheduler thread per enabled entry of PERIODIC_JOBS."""
+    if app.config.get("TESTING") or "periodic_jobs" in app.extensions:
+        return
+    threads = app.extensions["periodic_jobs"] = []
+    for kind, config_key in PERIODIC_JOBS.items():
+        interval = float(app.config.get(config_key, 0))
+        if interval <= 0:
+            continue
+
+        def loop(kind=kind, interval=interval):
+            while True:
+                time.sleep(interval)
+                try:
+                    schedule_due(app, kind, interval)
+                except Exception:
+                    app.logger.exception("Scheduling %s failed", kind)
+
+        thread = threading.Thread(target=loop, name=f"periodic-{kind}", daemon=True)
+        threads.append(thread)
+        thread.start()
+
+
+def start_background_jobs(app) -> None:
+    """Promote ADMIN_USERNAMES accounts, resume interrupted admin jobs,
+    enqueue the content re-render if the renderer version changed and start
+    the PERIODIC_JOBS schedulers.
+
+    For web server processes only: gunicorn calls it from post_worker_init
+    (gunicorn.conf.py), `python run.py` before serving.
+    """
+    from app.rendering import schedule_rerender
+    from app.services import promote_configured_admins
+
+    with app.app_context():
+        try:
+            # ADMIN_USERNAMES is resolved here and at login (ensure_admin_flag),
+            # not in a before_request hook on every hit
+            promote_configured_admins()
+            resumed = job_runner().resume()
+            if resumed:
+                app.logger.info("Resumed %s admin job(s).", resumed)
+            # stored content_html from an older renderer version
+            if schedule_rerender():
+                app.logger.info("Content re-render job enqueued.")
+        except SQLAlchemyError:
+            db.session.rollback()
+            app.logger.info("Startup jobs skipped: database is not ready.")
+    init_periodic_jobs(app)
+
+
+# Handlers call back into app.services, which imports this module
+
+@job_handler("delete_user_threads")
+def _delete_user_threads(params: Dict[str, Any], progress: ProgressCallback) -> str:
+    from app.services import admin_delete_all_posts_from_user
+
+    result = admin_delete_all_posts_from_user(params["user_id"], actor_is_admin=True, progress=progress)
+    if not result.deleted:
+        return "Пользователь не найден."
+    return f"Удалено тредов: {result.deleted_count}"
+
+
+@job_handler("delete_users")
+def _delete_users(params: Dict[str, Any], progress: ProgressCallback) -> str:
+    from app.services import admin_bulk_delete_users
+
+    result = admin_bulk_delete_users(
+        params["user_ids"], actor_user_id=params["actor_id"], actor_is_admin=True, progress=progress
+    )
+    return f"Удалено аккаунтов: {result.deleted_count}"
+
+
+@job_handler("reconcile_counters")
+def _reconcile_counters(params: Dict[str, Any], progress: ProgressCallback) -> str:
+    from app.counters import reconcile_counters
+
+    return reconcile_counters(progress=progress).summary()
+
+
+@job_handler("compact_vote_rollups")
+def _compact_vote_rollups(params: Dict[str, Any], progress: ProgressCallback) -> str:
+    from app.cache import invalidate_feed_cache
+    from app.rollups import compact_rollups
+
+    report = compact_rollups()
+    invalidate_feed_cache()
+    return (
+        f"Свёрнуто часовых корзин: {report['folded']}, удалено старых: {report['expired']}; "
+        f"в топе: день {report['day']}, неделя {report['week']}, месяц {report['month']}"
+    )
+
+
+@job_handler("clear_upload_placeholders")
+def _clear_upload_placeholders(params: Dict[str, Any], progress: ProgressCallback) -> str:
+    from app.uploads import clear_stale_placeholders
+
+    cleared = clear_stale_placeholders(current_app.config.get("UPLOAD_PLACEHOLDER_TTL", 3600))
+    return (
+        f"Сброшено заглушек: треды {cleared['thread']}, комментарии {cleared['comment']}, "
+        f"обновления {cleared['update']}"
+    )
+
+
+@job_handler("rerender_content")
+def _rerender_content(params: Dict[str, Any], progress: ProgressCallback) -> str:
+    from app.cache import invalidate_feed_cache
+    from app.rendering import rerender_stale
+
+    rows = rerender_stale(progress=progress)
+    invalidate_feed_cache()
+    return f"Перерисовано записей: {rows}"
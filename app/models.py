@@ -4,17 +4,25 @@ from flask_login import UserMixin
 from datetime import datetime, timezone
 from app.extensions import db, login_manager
 from sqlalchemy import CheckConstraint, UniqueConstraint
+from sqlalchemy.orm import validates
 
 @login_manager.user_loader
 def load_user(user_id):
-    # return User.query.get(int(user_id)) устаревшая тема
-    return db.session.get(User, int(user_id))
+    # cached identity snapshot; the full User row is loaded lazily (app/identity.py)
+    from app.identity import load_current_user
+    return load_current_user(user_id)
+
+def _username_lower(context):
+    # Core inserts (app/seed.py); ORM writes go through User._fold_username
+    return context.get_current_parameters()["username"].lower()
 
 class User(db.Model, UserMixin):
     __tablename__ = 'user'
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
+    # folded in Python: SQLite's lower() only folds ASCII
+    username_lower = db.Column(db.String(64), nullable=False, default=_username_lower)
     password_hash = db.Column(db.String(256))
     is_admin = db.Column(db.Boolean, default=False)
 
@@ -23,8 +31,31 @@ class User(db.Model, UserMixin):
     bio = db.Column(db.Text)
     avatar_url = db.Column(db.String(256))
 
+    # denormalized for the profile header; kept up to date by app.services /
+    # app.deletion and reconciled by app.counters
+    thread_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
     threads = db.relationship('Thread', backref='author', lazy=True)
 
+    # Case-insensitive username prefix search in the admin list
+    # (text_pattern_ops lets Postgres use it for LIKE 'abc%')
+    __table_args__ = (
+        db.Index(
+            'ix_user_username_lower',
+            username_lower,
+            postgresql_ops={'username_lower': 'text_pattern_ops'},
+        ),
+        # "threads" / "comments" sorts of the admin list
+        db.Index('ix_user_thread_count_id', thread_count.desc(), id.desc()),
+        db.Index('ix_user_comment_count_id', comment_count.desc(), id.desc()),
+    )
+
+    @validates('username')
+    def _fold_username(self, key, value):
+        self.username_lower = value.lower() if value is not None else None
+        return value
+
     @property
     def posts(self):
         """Backward compatibility alias for threads"""
@@ -55,6 +86,29 @@ class PostVote(db.Model):
         CheckConstraint('value in (1, -1)', name='ck_post_vote_value'),
     )
 
+class PostVoteRollup(db.Model):
+    """Net post votes per hour (bucket_hours=1) or, once compacted, per day (24)."""
+    __tablename__ = 'post_vote_rollups'
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), primary_key=True)
+    bucket_hours = db.Column(db.SmallInteger, primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    delta = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_post_vote_rollups_bucket', bucket_hours, bucket_start),
+    )
+
+class PostPeriodScore(db.Model):
+    """Leaderboard for /threads?sort=top&t=<period>: net votes within the period."""
+    __tablename__ = 'post_period_scores'
+    period = db.Column(db.String(8), primary_key=True)  # day | week | month
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), primary_key=True)
+    score = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_post_period_scores_rank', period, score.desc(), post_id.desc()),
+    )
+
 class CommentVote(db.Model):
     __tablename__ = 'comment_votes'
     id = db.Column(db.Integer, primary_key=True)
@@ -77,6 +131,14 @@ class Thread(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     content = db.Column(db.Text, nullable=False)
+    # what the feed cards show (app.services.content_preview); the rest of
+    # `content` is fetched when a card is expanded
+    content_preview = db.Column(db.String(256), nullable=False, default='', server_default='')
+    content_has_more = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    # rendered once at write time (app/rendering.py); NULL until rendered
+    content_html = db.Column(db.Text, nullable=True)
+    content_preview_html = db.Column(db.Text, nullable=True)
+    content_html_version = db.Column(db.SmallInteger, nullable=True)
     date_posted = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     image_url = db.Column(db.String(256), nullable=True)
     comment_count = db.Column(db.Integer, nullable=False, default=0)
@@ -84,10 +146,24 @@ class Thread(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
     score = db.Column(db.Integer, nullable=False, default=0)
+    # precomputed "hot" sort key (app/ranking.py)
+    hot_rank = db.Column(db.Float, nullable=False, default=0.0)
+
+    # Match the feed sort orders (keyset pagination uses id as the tiebreaker)
+    __table_args__ = (
+        db.Index('ix_post_hot_rank', hot_rank.desc(), id.desc()),
+        db.Index('ix_post_score_date_posted', score.desc(), date_posted.desc(), id.desc()),
+        db.Index('ix_post_comment_count_date_posted', comment_count.desc(), date_posted.desc(), id.desc()),
+        db.Index('ix_post_date_posted', date_posted.desc(), id.desc()),
+        db.Index('ix_post_user_id_date_posted_id', user_id, date_posted.desc(), id.desc()),
+    )
 
     def __repr__(self):
         return f"Thread('{self.title}', '{self.date_posted}')"
 
+# Backward compatibility alias
+Post = Thread
+
 
 class Comment(db.Model):
     __tablename__ = 'comment'
@@ -110,6 +186,14 @@ class Comment(db.Model):
 
     score = db.Column(db.Integer, nullable=False, default=0)
 
+    # rendered once at write time (app/rendering.py); NULL until rendered
+    content_html = db.Column(db.Text, nullable=True)
+    content_html_version = db.Column(db.SmallInteger, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_comment_post_id_parent_id_date_posted', post_id, parent_id, date_posted),
+    )
+
     @property
     def post(self):
         """Backward compatibility alias for thread"""
@@ -126,9 +210,54 @@ class Update(db.Model):
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     image_path = db.Column(db.String(256), nullable=True)
+    # rendered once at write time (app/rendering.py); NULL until rendered
+    content_html = db.Column(db.Text, nullable=True)
+    content_html_version = db.Column(db.SmallInteger, nullable=True)
     
     author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     author = db.relationship('User', backref='updates', lazy=True)
 
     def __repr__(self):
-        return f"<Update {self.id} '{self.title}'>"
\ No newline at end of file
+        return f"<Update {self.id} '{self.title}'>"
+
+class AdminJob(db.Model):
+    """Long admin operation run by app.jobs; the row survives restarts."""
+    __tablename__ = 'admin_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued | running | done | failed
+    # progress in threads + comments processed so far (see app.deletion)
+    done = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    summary = db.Column(db.String(256))
+    error = db.Column(db.String(512))
+    # not a foreign key: the job outlives a deleted actor; None for scheduled jobs
+    actor_id = db.Column(db.Integer)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    # bumped on every progress report; stale running jobs are picked up again
+    updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_admin_jobs_status_updated_at', status, updated_at),
+        # at most one queued/running scheduled job per kind (app.jobs.enqueue_scheduled)
+        db.Index(
+            'uq_admin_jobs_scheduled_active', kind, unique=True,
+            sqlite_where=db.text("actor_id IS NULL AND status IN ('queued', 'running')"),
+            postgresql_where=db.text("actor_id IS NULL AND status IN ('queued', 'running')"),
+        ),
+    )
+
+    @property
+    def percent(self) -> int:
+        if self.status == 'done':
+            return 100
+        if not self.total:
+            return 0
+        return min(100, int(self.done * 100 / self.total))
+
+    def __repr__(self):
+        return f"<AdminJob {self.id} {self.kind} {self.status} {self.done}/{self.total}>"
@@ -0,0 +1,159 @@
+"""Per-request SQL instrumentation (opt-in: QUERY_STATS_ENABLED=1).
+
+SQLAlchemy cursor events count every statement and its time. At the end of
+a request the totals go out as a `Server-Timing` header and one structured
+log line with the slowest statements; a statement shape that repeats more
+than QUERY_STATS_N_PLUS_ONE times in one request is logged as a likely N+1.
+
+`count_queries()` collects the same numbers around any block of code and
+is what the query-budget tests use.
+"""
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_WS_RE = re.compile(r"\s+")
+_IN_LIST_RE = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+
+
+def statement_shape(statement: str) -> str:
+    """SQL with whitespace collapsed and IN lists / literals folded."""
+    shape = _WS_RE.sub(" ", statement).strip()
+    shape = _IN_LIST_RE.sub("(?)", shape)
+    return _NUMBER_RE.sub("N", shape)
+
+
+class QueryStats:
+    def __init__(self, n_plus_one_threshold: int = 5):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.count = 0
+        self.total = 0.0  # seconds
+        self.queries: List[Tuple[float, str]] = []
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        self.queries.append((duration, statement))
+        self.shapes[statement_shape(statement)] += 1
+
+    @property
+    def total_ms(self) -> float:
+        return round(self.total * 1000, 2)
+
+    def slowest(self, n: int = 3) -> List[Dict[str, object]]:
+        top = sorted(self.queries, key=lambda q: q[0], reverse=True)[:n]
+        return [{"ms": round(d * 1000, 2), "sql": _WS_RE.sub(" ", s).strip()[:300]} for d, s in top]
+
+    def repeated(self) -> List[Dict[str, object]]:
+        """Statement shapes seen more than the N+1 threshold."""
+        return [
+            {"count": n, "sql": shape[:300]}
+            for shape, n in self.shapes.most_common()
+            if n > self.n_plus_one_threshold
+        ]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total_ms};desc="{self.count} queries"'
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries, {self.total_ms} ms"]
+        lines += [f"  {n} x {shape}" for shape, n in self.shapes.most_common()]
+        return "\n".join(lines)
+
+
+# Collectors opened with count_queries() in this thread
+_local = threading.local()
+
+
+def _active_collectors() -> List[QueryStats]:
+    collectors = list(getattr(_local, "collectors", ()))
+    stats = g.get("_query_stats") if has_app_context() else None
+    if stats is not None:
+        collectors.append(stats)
+    return collectors
+
+
+@contextmanager
+def count_queries(n_plus_one_threshold: int = 5):
+    stats = QueryStats(n_plus_one_threshold)
+    stack = _local.__dict__.setdefault("collectors", [])
+    stack.append(stats)
+    try:
+        yield stats
+    finally:
+        stack.remove(stats)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("_query_start")
+    if not started:
+        return
+    duration = time.perf_counter() - started.pop()
+    for stats in _active_collectors():
+        stats.record(statement, duration)
+
+
+_listening = False
+
+
+def _listen() -> None:
+    global _listening
+    if not _listening:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _listening = True
+
+
+def init_query_stats(app) -> None:
+    # the engine hooks are cheap without collectors, so tests can always count
+    _listen()
+    if not app.config.get("QUERY_STATS_ENABLED", False):
+        return
+
+    @app.before_request
+    def _start_query_stats():
+        g._query_stats = QueryStats(int(current_app.config.get("QUERY_STATS_N_PLUS_ONE", 5)))
+        g._query_stats_started = time.perf_counter()
+
+    @app.after_request
+    def _finish_query_stats(response):
+        stats: Optional[QueryStats] = g.pop("_query_stats", None)
+        if stats is None:
+            return response
+        total_ms = round((time.perf_counter() - g.pop("_query_stats_started")) * 1000, 2)
+
+        response.headers.add("Server-Timing", stats.server_timing())
+        response.headers.add("Server-Timing", f"app;dur={total_ms}")
+
+        repeated = stats.repeated()
+        line = {
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "queries": stats.count,
+            "db_ms": stats.total_ms,
+            "total_ms": total_ms,
+            "slowest": stats.slowest(int(current_app.config.get("QUERY_STATS_SLOWEST", 3))),
+        }
+        if repeated:
+            line["n_plus_one"] = repeated
+            current_app.logger.warning("query_stats %s", json.dumps(line, ensure_ascii=False))
+        else:
+            current_app.logger.info("query_stats %s", json.dumps(line, ensure_ascii=False))
+        return response
@@ -0,0 +1,59 @@
+"""Precomputed "hot" rank for the /threads?sort=hot feed.
+
+    activity = score + HOT_COMMENT_WEIGHT * comment_count
+    hot_rank = sign(activity) * log10(max(|activity|, 1)) + age_seconds / HOT_DECAY_SECONDS
+
+age_seconds is counted from a fixed epoch, so a newer thread starts higher
+and an old one never has to be "decayed": 10x the activity buys
+HOT_DECAY_SECONDS of recency. The rank only changes when score or
+comment_count do, so it is stored in post.hot_rank (indexed) and rewritten
+on vote / comment; the counter reconcile job (app.counters) recomputes it
+in batches to catch anything that slipped through.
+"""
+from __future__ import annotations
+
+import math
+from datetime import datetime, timezone
+from typing import Tuple
+
+from app.extensions import db
+from app.models import Thread
+
+HOT_EPOCH = datetime(2024, 1, 1)
+HOT_DECAY_SECONDS = 45000  # 12.5 hours
+HOT_COMMENT_WEIGHT = 0.5
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def hot_rank(score: int, comment_count: int, date_posted: datetime) -> float:
+    activity = (score or 0) + HOT_COMMENT_WEIGHT * (comment_count or 0)
+    order = math.log10(max(abs(activity), 1))
+    sign = 1 if activity > 0 else -1 if activity < 0 else 0
+    age = (_naive_utc(date_posted) - HOT_EPOCH).total_seconds()
+    # rounded so the value survives float storage and the JSON feed cursor unchanged
+    return round(sign * order + age / HOT_DECAY_SECONDS, 7)
+
+
+def refresh_hot_ranks(where, dry_run: bool = False) -> Tuple[int, float]:
+    """Recompute hot_rank for the threads matching `where` (keep it to one chunk).
+
+    Only rows whose stored rank is off are written, with one executemany
+    UPDATE by primary key. Returns (rows off, total drift). Caller commits.
+    """
+    rows = db.session.execute(
+        db.select(Thread.id, Thread.score, Thread.comment_count, Thread.date_posted, Thread.hot_rank).where(where)
+    ).all()
+    changes, drift = [], 0.0
+    for thread_id, score, comment_count, date_posted, stored in rows:
+        rank = hot_rank(score, comment_count, date_posted)
+        if stored is None or abs(rank - stored) > 1e-6:
+            changes.append({"id": thread_id, "hot_rank": rank})
+            drift += abs(rank - (stored or 0.0))
+    if changes and not dry_run:
+        db.session.execute(db.update(Thread), changes)
+    return len(changes), round(drift, 3)
@@ -0,0 +1,181 @@
+"""Socket.IO broadcasts for thread pages.
+
+Creations and deletions go out right away. Score updates are coalesced per
+room: the first one schedules a flush `REALTIME_THROTTLE_MS` later and every
+update that arrives before it only replaces the pending payload, so a vote
+storm costs one event per entity per interval instead of one per click.
+With REALTIME_THROTTLE_MS = 0 (tests) everything is emitted immediately.
+
+With several workers every emit is published on SOCKETIO_MESSAGE_QUEUE
+(redis://, amqp:// via Kombu, or memory:// for a single process / tests) and
+each worker delivers it to the clients connected to it.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import socketio as python_socketio
+from flask import current_app
+
+
+class LoopbackManager(python_socketio.PubSubManager):
+    """In-process pub/sub backend: managers on the same channel share a bus.
+
+    Messages are delivered synchronously, so there is no listener thread.
+    """
+    name = "loopback"
+    _buses: Dict[str, List["LoopbackManager"]] = {}
+    _buses_lock = threading.Lock()
+
+    def initialize(self):
+        python_socketio.Manager.initialize(self)
+        if not self.write_only:
+            self.subscribe()
+
+    def subscribe(self) -> None:
+        with self._buses_lock:
+            self._buses.setdefault(self.channel, []).append(self)
+
+    def unsubscribe(self) -> None:
+        with self._buses_lock:
+            peers = self._buses.get(self.channel, [])
+            if self in peers:
+                peers.remove(self)
+
+    def _publish(self, data):
+        with self._buses_lock:
+            peers = list(self._buses.get(self.channel, []))
+        for peer in peers:
+            if peer is not self:
+                peer._deliver(data)
+
+    def _deliver(self, data):
+        if data.get("method") == "callback":
+            self._handle_callback(data)
+            return
+        handler = {
+            "emit": self._handle_emit,
+            "disconnect": self._handle_disconnect,
+            "enter_room": self._handle_enter_room,
+            "leave_room": self._handle_leave_room,
+            "close_room": self._handle_close_room,
+        }.get(data.get("method"))
+        if handler is not None:
+            handler(data)
+
+
+def socketio_options(config) -> Dict[str, Any]:
+    """Extra SocketIO.init_app() kwargs for the configured message queue."""
+    url = (config.get("SOCKETIO_MESSAGE_QUEUE") or "").strip()
+    channel = config.get("SOCKETIO_CHANNEL", "flask-socketio")
+    if not url:
+        # explicit None: SocketIO keeps server_options between init_app() calls
+        return {"client_manager": None}
+    if url.startswith("memory://"):
+        return {"client_manager": LoopbackManager(channel=channel)}
+    # redis:// and rediss:// -> RedisManager, anything else -> KombuManager
+    return {"message_queue": url, "channel": channel}
+
+
+def message_queue_status(server) -> Dict[str, Any]:
+    """Backend name and whether it answers; used by /healthz."""
+    manager = getattr(server, "manager", None)
+    name = getattr(manager, "name", None) or "local"
+    status = {"backend": name, "ok": True}
+    redis_client = getattr(manager, "redis", None)
+    if redis_client is not None:
+        try:
+            redis_client.ping()
+        except Exception as exc:
+            status.update(ok=False, error=exc.__class__.__name__)
+    return status
+
+
+class EventThrottle:
+    def __init__(
+        self,
+        emit: Callable[..., Any],
+        interval: float = 0.5,
+        spawn: Optional[Callable[..., Any]] = None,
+        sleep: Optional[Callable[[float], Any]] = None,
+    ):
+        self.emit = emit
+        self.interval = float(interval)
+        self.spawn = spawn
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        # room -> {(event, key): payload}, in first-seen order
+        self._pending: Dict[str, "OrderedDict[Tuple[str, Hashable], dict]"] = {}
+
+    def send(self, room: str, event: str, payload: dict) -> None:
+        """Emit now (creations, deletions)."""
+        self.emit(event, payload, to=room)
+
+    def push(self, room: str, event: str, payload: dict, key: Hashable = None) -> None:
+        """Queue an update; a later push with the same (event, key) replaces it."""
+        if self.interval <= 0:
+            self.emit(event, payload, to=room)
+            return
+
+        with self._lock:
+            pending = self._pending.get(room)
+            schedule = pending is None
+            if schedule:
+                pending = self._pending[room] = OrderedDict()
+            pending[(event, key)] = payload
+
+        if schedule:
+            self.spawn(self._flush_later, room)
+
+    def _flush_later(self, room: str) -> None:
+        self.sleep(self.interval)
+        self.flush(room)
+
+    def flush(self, room: Optional[str] = None) -> int:
+        """Emit what is pending (for one room or all); returns the number of events."""
+        with self._lock:
+            rooms = [room] if room is not None else list(self._pending)
+            batches = [(r, self._pending.pop(r, None)) for r in rooms]
+
+        sent = 0
+        for r, pending in batches:
+            for (event, _key), payload in (pending or {}).items():
+                self.emit(event, payload, to=r)
+                sent += 1
+        return sent
+
+
+def init_realtime(app) -> None:
+    if "realtime" not in app.extensions:
+        from app import socketio
+        app.extensions["realtime"] = EventThrottle(
+            socketio.emit,
+            interval=int(app.config.get("REALTIME_THROTTLE_MS", 500)) / 1000,
+            spawn=socketio.start_background_task,
+            sleep=socketio.sleep,
+        )
+
+
+def _throttle() -> EventThrottle:
+    return current_app.extensions["realtime"]
+
+
+def thread_room(thread_id: int) -> str:
+    return f"thread_{int(thread_id)}"
+
+
+def broadcast(thread_id: int, event: str, payload: dict) -> None:
+    try:
+        _throttle().send(thread_room(thread_id), event, payload)
+    except Exception:
+        # never fail a write because a socket could not be reached
+        current_app.logger.exception("Socket.IO emit failed: %s", event)
+
+
+def broadcast_throttled(thread_id: int, event: str, payload: dict, key: Hashable = None) -> None:
+    try:
+        _throttle().push(thread_room(thread_id), event, payload, key=key)
+    except Exception:
+        current_app.logger.exception("Socket.IO emit failed: %s", event)
@@ -0,0 +1,130 @@
+"""Write-time rendering of user text (threads, comments, updates) to HTML.
+
+The services render `content_html` once when a row is written and store it
+with RENDERER_VERSION in `content_html_version`; templates output the stored
+HTML, so page renders do no regex work. Bump RENDERER_VERSION whenever the
+output of these functions changes: the next web worker start
+(app.jobs.start_background_jobs) enqueues the rerender_content admin job,
+which re-renders every row with an older (or no) version; `flask
+rerender-content` does the same in the foreground. Until it gets to a row, templates fall back to the
+`linkify` / `mentions_to_links` filters.
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, Optional
+
+from markupsafe import Markup, escape
+from sqlalchemy import func, or_
+
+from app.extensions import db
+from app.models import AdminJob, Comment, Thread, Update
+
+RENDERER_VERSION = 1
+
+_URL_RE = re.compile(r'(?P<url>https?://[^\s]+)', re.IGNORECASE)
+# @username (alphanumeric and underscore, 1-64 chars)
+_MENTION_RE = re.compile(r'@([a-zA-Z0-9_]{1,64})')
+
+
+def render_links(text: Optional[str]) -> Markup:
+    """Escape text, turn URLs into links and newlines into <br>."""
+    if not text:
+        return Markup('')
+    s = escape(text)
+
+    def repl(m):
+        url = m.group('url')
+        href = url if url.lower().startswith(('http://', 'https://')) else f'https://{url}'
+        return Markup(f'<a href="{href}" target="_blank" rel="nofollow noopener noreferrer">{url}</a>')
+
+    s = _URL_RE.sub(repl, s)
+    s = s.replace('\n', Markup('<br>'))
+    return Markup(s)
+
+
+def _urls_to_links(text_part: str) -> Markup:
+    def url_repl(m):
+        url = m.group('url')
+        return Markup(f'<a href="{url}" target="_blank" rel="nofollow noopener noreferrer">{escape(url)}</a>')
+    return Markup(_URL_RE.sub(url_repl, escape(text_part)))
+
+
+def render_mentions(text: Optional[str]) -> Markup:
+    """render_links plus @username mentions linked to the profile."""
+    if not text:
+        return Markup('')
+
+    parts = []
+    last_end = 0
+    for match in _MENTION_RE.finditer(text):
+        if match.start() > last_end:
+            parts.append(_urls_to_links(text[last_end:match.start()]))
+        username = match.group(1)
+        parts.append(Markup(f'<a href="/user/{username}" class="mention">@{escape(username)}</a>'))
+        last_end = match.end()
+    if last_end < len(text):
+        parts.append(_urls_to_links(text[last_end:]))
+
+    result = Markup(''.join(parts))
+    return result.replace('\n', Markup('<br>'))
+
+
+def rendered(text: Optional[str], mentions: bool = False) -> Dict[str, object]:
+    """Column values for a freshly written row: content_html + its renderer version."""
+    html = render_mentions(text) if mentions else render_links(text)
+    return {"content_html": str(html), "content_html_version": RENDERER_VERSION}
+
+
+def thread_html(content: Optional[str], preview: str) -> Dict[str, object]:
+    """content_html, content_preview_html and the version for a thread."""
+    return {**rendered(content), "content_preview_html": str(render_links(preview))}
+
+
+RENDERED_MODELS = (Thread, Comment, Update)
+
+
+def _render_row(model, row) -> Dict[str, object]:
+    if model is Thread:
+        return {"id": row.id, **thread_html(row.content, row.content_preview)}
+    return {"id": row.id, **rendered(row.content, mentions=model is Comment)}
+
+
+def rerender_stale(chunk_size: int = 1000, progress=None) -> int:
+    """Re-render every row whose content_html_version is not RENDERER_VERSION.
+
+    Walks each table by id in chunks (one executemany UPDATE + commit per
+    chunk). Returns the number of rows re-rendered.
+    """
+    plan = []
+    for model in RENDERED_MODELS:
+        lo, hi = db.session.execute(db.select(func.min(model.id), func.max(model.id))).one()
+        if lo is not None:
+            plan.append((model, [(s, min(s + chunk_size - 1, hi)) for s in range(lo, hi + 1, chunk_size)]))
+    total = sum(len(ranges) for _, ranges in plan)
+
+    done = rendered_rows = 0
+    if progress is not None:
+        progress(done, total)
+    for model, ranges in plan:
+        columns = [model.id, model.content] + ([model.content_preview] if hasattr(model, "content_preview") else [])
+        stale = or_(model.content_html_version.is_(None), model.content_html_version != RENDERER_VERSION)
+        for lo, hi in ranges:
+            rows = db.session.execute(db.select(*columns).where(model.id.between(lo, hi), stale)).all()
+            if rows:
+                db.session.execute(db.update(model), [_render_row(model, row) for row in rows])
+            db.session.commit()
+            rendered_rows += len(rows)
+            done += 1
+            if progress is not None:
+                progress(done, total)
+    return rendered_rows
+
+
+def schedule_rerender() -> Optional[int]:
+    """Enqueue rerender_content unless one is active or already covered
+    RENDERER_VERSION; atomic across workers (app.jobs.enqueue_scheduled)."""
+    from app.jobs import enqueue_scheduled
+
+    covered = (AdminJob.status == "done") & (AdminJob.params["version"].as_integer() == RENDERER_VERSION)
+    return enqueue_scheduled("rerender_content", {"version": RENDERER_VERSION}, skip_if=covered)
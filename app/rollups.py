@@ -0,0 +1,171 @@
+"""Windowed "top" leaderboards: /threads?sort=top&t=day|week|month.
+
+Every post vote adds its net change (+1/-1, ±2 when flipped) to
+post_vote_rollups (the current hour's bucket) and to the thread's row of
+each period in post_period_scores, so a period feed is a range scan of
+ix_post_period_scores_rank instead of an aggregate over post_votes.
+
+The compact_vote_rollups job (app.jobs, every VOTE_ROLLUP_INTERVAL seconds)
+folds hourly buckets older than HOURLY_RETENTION into daily ones, drops
+buckets older than the longest period and rebuilds post_period_scores from
+the buckets — that is what lets old votes fall out of a period.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func, literal
+
+from app.extensions import db
+from app.models import PostVote, PostVoteRollup, PostPeriodScore
+
+PERIODS = {
+    "day": timedelta(days=1),
+    "week": timedelta(days=7),
+    "month": timedelta(days=30),
+}
+HOURLY_RETENTION = timedelta(days=2)
+UPSERT_BATCH = 1000  # rows per multi-row INSERT ... ON CONFLICT
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _hour(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _add_to_buckets(deltas: Dict[Tuple[int, datetime], int], bucket_hours: int = 1) -> None:
+    """{(post_id, bucket_start): delta} -> post_vote_rollups, adding to existing buckets."""
+    from app.services import _upsert  # app.services imports this module
+
+    rows = [
+        {"post_id": post_id, "bucket_hours": bucket_hours, "bucket_start": start, "delta": delta}
+        for (post_id, start), delta in deltas.items()
+    ]
+    for i in range(0, len(rows), UPSERT_BATCH):
+        stmt = _upsert(PostVoteRollup).values(rows[i:i + UPSERT_BATCH])
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=["post_id", "bucket_hours", "bucket_start"],
+            set_={"delta": PostVoteRollup.delta + stmt.excluded.delta},
+        ))
+
+
+def _add_to_periods(deltas: Dict[Tuple[str, int], int]) -> None:
+    """{(period, post_id): delta} -> post_period_scores."""
+    from app.services import _upsert
+
+    rows = [
+        {"period": period, "post_id": post_id, "score": delta}
+        for (period, post_id), delta in deltas.items()
+    ]
+    for i in range(0, len(rows), UPSERT_BATCH):
+        stmt = _upsert(PostPeriodScore).values(rows[i:i + UPSERT_BATCH])
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=["period", "post_id"],
+            set_={"score": PostPeriodScore.score + stmt.excluded.score},
+        ))
+
+
+def record_post_votes(deltas: Dict[int, int], now: Optional[datetime] = None) -> None:
+    """Add net vote changes {post_id: delta} to the current bucket and every period. Caller commits."""
+    deltas = {int(post_id): int(delta) for post_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    bucket = _hour(now or _now())
+    _add_to_buckets({(post_id, bucket): delta for post_id, delta in deltas.items()})
+    _add_to_periods({(period, post_id): delta for period in PERIODS for post_id, delta in deltas.items()})
+
+
+def retract_post_votes(votes: Iterable[Tuple[int, int, datetime]], now: Optional[datetime] = None) -> None:
+    """Take deleted votes [(post_id, value, voted_at)] back out of their bucket and periods. Caller commits.
+
+    voted_at is the vote's updated_at: a flipped vote is retracted from the
+    hour it was flipped in, which is close enough for a leaderboard.
+    """
+    now = now or _now()
+    oldest = now - max(PERIODS.values())
+    buckets: Dict[Tuple[int, datetime], int] = defaultdict(int)
+    periods: Dict[Tuple[str, int], int] = defaultdict(int)
+    for post_id, value, voted_at in votes:
+        hour = _hour(voted_at)
+        if hour < _hour(oldest):
+            continue
+        buckets[(post_id, hour)] -= value
+        for period, span in PERIODS.items():
+            if hour >= _hour(now - span):
+                periods[(period, post_id)] -= value
+    if buckets:
+        _add_to_buckets(buckets)
+    if periods:
+        _add_to_periods(periods)
+
+
+def compact_rollups(now: Optional[datetime] = None) -> Dict[str, int]:
+    """Fold old hourly buckets into days, expire old buckets, rebuild the period scores."""
+    now = now or _now()
+    # only whole days are folded; votes always land in the current hour,
+    # so a day that is past the cutoff never gets new hourly buckets
+    cutoff = (now - HOURLY_RETENTION).replace(hour=0, minute=0, second=0, microsecond=0)
+    hourly = db.session.execute(
+        db.select(PostVoteRollup.post_id, PostVoteRollup.bucket_start, PostVoteRollup.delta)
+        .where(PostVoteRollup.bucket_hours == 1, PostVoteRollup.bucket_start < cutoff)
+    ).all()
+    daily: Dict[tuple, int] = defaultdict(int)
+    for post_id, bucket_start, delta in hourly:
+        daily[(post_id, bucket_start.replace(hour=0))] += delta
+    if daily:
+        _add_to_buckets(daily, bucket_hours=24)
+        db.session.execute(
+            db.delete(PostVoteRollup)
+            .where(PostVoteRollup.bucket_hours == 1, PostVoteRollup.bucket_start < cutoff)
+        )
+
+    oldest = now - max(PERIODS.values()) - timedelta(days=1)
+    expired = db.session.execute(
+        db.delete(PostVoteRollup).where(PostVoteRollup.bucket_start < oldest)
+    ).rowcount or 0
+    db.session.commit()
+
+    report = {"folded": len(hourly), "expired": expired}
+    for period, span in PERIODS.items():
+        total = func.sum(PostVoteRollup.delta)
+        db.session.execute(db.delete(PostPeriodScore).where(PostPeriodScore.period == period))
+        inserted = db.session.execute(
+            db.insert(PostPeriodScore).from_select(
+                ["period", "post_id", "score"],
+                db.select(literal(period), PostVoteRollup.post_id, total)
+                .where(PostVoteRollup.bucket_start >= now - span)
+                .group_by(PostVoteRollup.post_id)
+                .having(total != 0),
+            )
+        )
+        # one transaction per period, so the feed never sees it empty
+        db.session.commit()
+        report[period] = inserted.rowcount or 0
+    return report
+
+
+def rebuild_rollups(now: Optional[datetime] = None) -> Dict[str, int]:
+    """Rebuild the buckets from post_votes (after the migration, or when they drifted), then compact."""
+    now = now or _now()
+    since = now - max(PERIODS.values())
+    buckets: Dict[Tuple[int, datetime], int] = defaultdict(int)
+    votes = db.session.execute(
+        db.select(PostVote.post_id, PostVote.value, PostVote.updated_at)
+        .where(PostVote.updated_at >= since)
+        .execution_options(yield_per=UPSERT_BATCH)
+    )
+    for post_id, value, voted_at in votes:
+        buckets[(post_id, _hour(voted_at))] += value
+
+    db.session.execute(db.delete(PostVoteRollup))
+    if buckets:
+        _add_to_buckets(buckets)
+    db.session.commit()
+    return compact_rollups(now)
@@ -1,15 +1,17 @@
 from functools import wraps
 
-from flask import render_template, flash, redirect, url_for, request
+from flask import render_template, flash, redirect, url_for, request, jsonify
 from flask_login import current_user, login_required
 
 from app.routes import bp
-from app.models import User
 from app.services import (
-    admin_delete_all_posts_from_user,
-    admin_delete_user,
-    admin_bulk_delete_users,
+    list_admin_users,
+    schedule_delete_all_posts_from_user,
+    schedule_delete_user,
+    schedule_bulk_delete_users,
 )
+from app.jobs import recent_jobs, job_to_dict
+from app.uploads import upload_queue
 
 
 def admin_required(view):
@@ -31,24 +33,35 @@ def admin_required(view):
 @login_required
 @admin_required
 def admin_users():
-    users = User.query.order_by(User.id.asc()).all()
+    page = list_admin_users(
+        q=request.args.get('q', ''),
+        sort=request.args.get('sort', 'id'),
+        after=request.args.get('after') or None,
+    )
     breadcrumbs = [
         {'label': 'Админка', 'url': ''}
     ]
-    return render_template('admin_users.html', users=users, breadcrumbs=breadcrumbs)
+    return render_template(
+        'admin_users.html',
+        users=page.items,
+        pagination=page,
+        jobs=recent_jobs(),
+        breadcrumbs=breadcrumbs,
+    )
 
 
 @bp.route('/admin/user/<int:user_id>/posts/delete', methods=['POST'])
 @login_required
 @admin_required
 def admin_delete_user_posts(user_id: int):
-    result = admin_delete_all_posts_from_user(
+    result = schedule_delete_all_posts_from_user(
         target_user_id=user_id,
+        actor_user_id=current_user.id,
         actor_is_admin=bool(getattr(current_user, 'is_admin', False)),
     )
 
-    if result.deleted:
-        flash(f'Удалено постов: {result.deleted_count}', 'success')
+    if result.scheduled:
+        flash(f'Удаление постов запущено (задача #{result.job_id}).', 'success')
     elif result.reason == 'not_found':
         flash('Пользователь не найден.', 'warning')
     else:
@@ -61,14 +74,14 @@ def admin_delete_user_posts(user_id: int):
 @login_required
 @admin_required
 def admin_delete_user_account(user_id: int):
-    result = admin_delete_user(
+    result = schedule_delete_user(
         target_user_id=user_id,
         actor_user_id=current_user.id,
         actor_is_admin=bool(getattr(current_user, 'is_admin', False)),
     )
 
-    if result.deleted:
-        flash('Аккаунт удалён.', 'success')
+    if result.scheduled:
+        flash(f'Удаление аккаунта запущено (задача #{result.job_id}).', 'success')
     elif result.reason == 'self_delete_blocked':
         flash('Нельзя удалить свой аккаунт через админку.', 'warning')
     elif result.reason == 'not_found':
@@ -85,17 +98,31 @@ def admin_delete_user_account(user_id: int):
 def admin_delete_users_bulk():
     ids = request.form.getlist('user_ids')
 
-    result = admin_bulk_delete_users(
+    result = schedule_bulk_delete_users(
         target_user_ids=ids,
         actor_user_id=current_user.id,
         actor_is_admin=bool(getattr(current_user, 'is_admin', False)),
     )
 
-    if result.deleted:
-        flash(f'Удалено аккаунтов: {result.deleted_count}', 'success')
+    if result.scheduled:
+        flash(f'Удаление аккаунтов запущено (задача #{result.job_id}).', 'success')
     elif result.reason == 'empty':
         flash('Не выбраны пользователи (или выбран только ваш аккаунт).', 'warning')
     else:
         flash('Недостаточно прав.', 'danger')
 
     return redirect(url_for('routes.admin_users'))
+
+
+@bp.route('/admin/uploads/metrics')
+@login_required
+@admin_required
+def admin_upload_metrics():
+    return jsonify(upload_queue().metrics())
+
+
+@bp.route('/admin/jobs')
+@login_required
+@admin_required
+def admin_jobs():
+    return jsonify([job_to_dict(job) for job in recent_jobs()])
@@ -0,0 +1,30 @@
+import os
+
+from flask import jsonify
+
+from app import socketio
+from app.extensions import db
+from app.realtime import message_queue_status
+from app.routes import bp
+
+
+@bp.route('/healthz')
+def healthz():
+    """Liveness/readiness probe for the load balancer (no auth, no session)"""
+    checks = {}
+    try:
+        db.session.execute(db.text('SELECT 1'))
+        checks['db'] = {'ok': True}
+    except Exception as exc:
+        checks['db'] = {'ok': False, 'error': exc.__class__.__name__}
+    finally:
+        db.session.rollback()
+
+    checks['message_queue'] = message_queue_status(socketio.server)
+
+    ok = all(check['ok'] for check in checks.values())
+    return jsonify({
+        'status': 'ok' if ok else 'fail',
+        'pid': os.getpid(),
+        'checks': checks,
+    }), 200 if ok else 503
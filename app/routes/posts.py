@@ -1,22 +1,31 @@
 from flask import render_template, flash, redirect, url_for, request, jsonify
 from flask_login import current_user, login_required
-from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm import joinedload
+from markupsafe import Markup
 import cloudinary.uploader
 
 from app.routes import bp
+from app.cache import get_feed_page, set_feed_page
 from app.extensions import db
+from app.rendering import render_links
 from app.models import User, Thread, Comment, PostVote, CommentVote
 from app.services import (
     create_thread,
     delete_thread,
-    get_threads_feed,
-    list_user_threads,
+    get_threads_feed_after,
+    FEED_SORTS,
+    get_thread_content_rest,
+    TOP_WINDOWS,
+    load_comments_page,
+    load_replies_page,
     create_update,
     list_updates,
     create_comment,
     delete_comment,
     vote_post,
     vote_comment,
+    resolve_my_votes,
+    search,
 )
 
 @bp.route('/', methods=['GET', 'POST'])
@@ -24,6 +33,8 @@ from app.services import (
 def index():
     # Redirect to user profile instead of separate index page
     if current_user.is_authenticated:
+        if request.method == 'POST':
+            return thread_new()
         return redirect(url_for('routes.user_profile', username='me'))
     else:
         return redirect(url_for('routes.login'))
@@ -34,46 +45,71 @@ def index():
 def threads():
     """Thread listing page (replaces old feed behavior)"""
     sort = request.args.get('sort', 'new')
-    page = request.args.get('page', 1, type=int)
-
-    pagination = get_threads_feed(
-        page=page, 
-        per_page=20, 
-        sort=sort
-    )
-    # Load current user's votes for threads so highlight persists after refresh
-    if pagination.items and current_user.is_authenticated:
-        post_ids = [t.id for t in pagination.items]
-        votes = PostVote.query.filter(
-            PostVote.user_id == current_user.id,
-            PostVote.post_id.in_(post_ids)
-        ).all()
-        votes_by_post = {v.post_id: v.value for v in votes}
-        for t in pagination.items:
-            t.my_vote = votes_by_post.get(t.id, 0)
+    if sort not in FEED_SORTS:
+        sort = 'new'
+    # top of the day / week / month; all-time without ?t=
+    window = request.args.get('t') if sort == 'top' else None
+    if window not in TOP_WINDOWS:
+        window = None
+    cache_sort = f"{sort}:{window}" if window else sort
+    after = request.args.get('after') or None
+    per_page = 20
+
+    # The list itself is viewer-agnostic and shared through the feed cache
+    cached = get_feed_page(cache_sort, after, per_page)
+    if cached is None:
+        feed_page = get_threads_feed_after(
+            after=after,
+            per_page=per_page,
+            sort=sort,
+            window=window,
+        )
+        cached = {
+            "html": render_template(
+                'components/_feed_page.html',
+                threads=feed_page.items,
+                pagination=feed_page,
+                sort=sort,
+                shared_render=True,
+            ),
+            "post_ids": [t.id for t in feed_page.items],
+        }
+        set_feed_page(cache_sort, after, per_page, cached)
+
+    # Current user's votes are overlaid on top so highlight persists after refresh
+    my_votes = resolve_my_votes(current_user.id, post_ids=cached["post_ids"])
 
     return render_template(
         'threads.html', 
-        threads=pagination.items, 
-        pagination=pagination, 
-        sort=sort
+        feed_html=Markup(cached["html"]),
+        sort=sort,
+        window=window,
+        my_votes=my_votes,
+    )
+
+@bp.route('/search')
+@login_required
+def search_page():
+    """Full-text search over threads and comments"""
+    results = search(request.args.get('q'), after=request.args.get('after') or None)
+    return render_template('search.html', results=results)
+
+def _comments_fragment(comments_page, depth, next_url):
+    html = render_template(
+        'components/_comment_fragment.html',
+        comments=comments_page.items,
+        depth=depth,
+        my_votes=resolve_my_votes(current_user.id, comment_ids=comments_page.by_id),
     )
+    return jsonify({"html": html, "next_url": next_url})
 
 @bp.route('/thread/<int:thread_id>')
 @login_required
 def thread_detail(thread_id):
     """Single thread detail page"""
-    # Eager-load comments, their authors, and replies to avoid N+1 queries
-    from sqlalchemy.orm import selectinload
-    
     thread = (
         db.session.query(Thread)
-        .options(
-            joinedload(Thread.comments).joinedload(Comment.author),
-            joinedload(Thread.comments).joinedload(Comment.reply_to_user),
-            joinedload(Thread.comments).selectinload(Comment.replies).joinedload(Comment.author),
-            joinedload(Thread.comments).selectinload(Comment.replies).joinedload(Comment.reply_to_user)
-        )
+        .options(joinedload(Thread.author))
         .filter(Thread.id == thread_id)
         .first()
     )
@@ -81,37 +117,61 @@ def thread_detail(thread_id):
         flash('Тред не найден', 'danger')
         return redirect(url_for('routes.threads'))
 
+    # First page of top-level comments with a few inline replies each
+    comments_page = load_comments_page(thread.id)
+
     # Current user's vote for thread and comments (for highlight on load)
-    thread_my_vote = 0
-    comment_my_votes = {}
-    if current_user.is_authenticated:
-        pv = PostVote.query.filter_by(user_id=current_user.id, post_id=thread.id).first()
-        thread_my_vote = pv.value if pv else 0
-        comment_ids = [c.id for c in thread.comments]
-        if comment_ids:
-            cvs = CommentVote.query.filter(
-                CommentVote.user_id == current_user.id,
-                CommentVote.comment_id.in_(comment_ids)
-            ).all()
-            comment_my_votes = {v.comment_id: v.value for v in cvs}
-    thread.my_vote = thread_my_vote
-    for c in thread.comments:
-        c.my_vote = comment_my_votes.get(c.id, 0)
-    
-    # Separate top-level comments (no parent) from replies
-    top_level_comments = [c for c in thread.comments if c.parent_id is None]
-    # Sort top-level comments by date
-    top_level_comments.sort(key=lambda c: c.date_posted)
-    # Sort replies within each comment
-    for comment in thread.comments:
-        if comment.replies:
-            comment.replies.sort(key=lambda r: r.date_posted)
-    
+    my_votes = resolve_my_votes(current_user.id, post_ids=[thread.id], comment_ids=comments_page.by_id)
+
     breadcrumbs = [
         {'label': 'Треды', 'url': url_for('routes.threads')},
         {'label': (thread.title[:50] + ('...' if len(thread.title) > 50 else '')) if thread.title else 'Тред', 'url': ''}
     ]
-    return render_template('thread.html', thread=thread, top_level_comments=top_level_comments, breadcrumbs=breadcrumbs)
+    return render_template(
+        'thread.html',
+        thread=thread,
+        top_level_comments=comments_page.items,
+        comments_page=comments_page,
+        my_votes=my_votes,
+        breadcrumbs=breadcrumbs,
+    )
+
+@bp.route('/thread/<int:thread_id>/content')
+@login_required
+def thread_content_rest(thread_id: int):
+    """The rest of a thread body behind a feed card's preview"""
+    rest = get_thread_content_rest(thread_id)
+    if rest is None:
+        return jsonify({"success": False, "reason": "not_found"}), 404
+    return jsonify({"html": str(render_links(rest))})
+
+@bp.route('/thread/<int:thread_id>/comments')
+@login_required
+def thread_comments_page(thread_id: int):
+    """Next page of top-level comments as an HTML fragment"""
+    if db.session.get(Thread, thread_id) is None:
+        return jsonify({"success": False, "reason": "not_found"}), 404
+
+    comments_page = load_comments_page(thread_id, after=request.args.get('after') or None)
+
+    next_url = None
+    if comments_page.has_next:
+        next_url = url_for('routes.thread_comments_page', thread_id=thread_id, after=comments_page.next_cursor)
+    return _comments_fragment(comments_page, 0, next_url)
+
+@bp.route('/comment/<int:comment_id>/replies')
+@login_required
+def comment_replies_page(comment_id: int):
+    """Next page of replies to a comment as an HTML fragment"""
+    if db.session.get(Comment, comment_id) is None:
+        return jsonify({"success": False, "reason": "not_found"}), 404
+
+    comments_page = load_replies_page(comment_id, after=request.args.get('after') or None)
+
+    next_url = None
+    if comments_page.has_next:
+        next_url = url_for('routes.comment_replies_page', comment_id=comment_id, after=comments_page.next_cursor)
+    return _comments_fragment(comments_page, 1, next_url)
 
 @bp.route('/thread/new', methods=['POST'])
 @login_required
@@ -1,11 +1,12 @@
-from flask import render_template, flash, redirect, url_for, request
+from flask import render_template, flash, redirect, url_for, request, jsonify
 from flask_login import current_user, login_required
 
 from app.routes import bp
 from app.extensions import db
-from app.models import User, Thread, PostVote
-
-import cloudinary.uploader
+from app.models import User
+from app.identity import invalidate_user
+from app.services import resolve_my_votes, get_user_threads_after
+from app.uploads import enqueue_upload, avatar_upload_options
 
 MAX_AVATAR_MB = 5
 
@@ -28,44 +29,38 @@ def update_avatar():
         flash(f'Файл слишком большой. Максимальный размер: {MAX_AVATAR_MB}MB.', 'error')
         return redirect(request.referrer or url_for('routes.user_profile', username='me'))
 
-    result = cloudinary.uploader.upload(
+    # Uploaded in the background; the page gets the new avatar over Socket.IO
+    enqueue_upload(
         f,
-        public_id=f'avatar_{current_user.id}',
-        overwrite=True,
-        invalidate=True,
-        resource_type='image',
-        transformation=[
-            {'width': 256, 'height': 256, 'crop': 'fill', 'gravity': 'auto'},
-            {'quality': 'auto'},
-            {'fetch_format': 'auto'},
-        ],
+        kind='avatar',
+        target_id=current_user.id,
+        options=avatar_upload_options(current_user.id),
+        room=f'user_{current_user.id}',
     )
 
-    current_user.avatar_url = result['secure_url']
-    from app.extensions import db
-    db.session.commit()
-
-    flash('Аватар обновлен.', 'success')
+    flash('Аватар загружается, он обновится через пару секунд.', 'success')
     return redirect(request.referrer or url_for('routes.user_profile', username='me'))
 
 @bp.route('/settings', methods = ['POST', 'GET'])
 @login_required
 def settings():
     if request.method == 'POST':
+        # current_user is a cached snapshot; writes go to the full row
+        user = current_user.orm
         age_val = request.form.get('age')
         if age_val and age_val.strip():
             try:
-                current_user.age = int(age_val)
+                user.age = int(age_val)
             except ValueError:
                 pass
         else:
-            current_user.age = None
+            user.age = None
 
         display_name = request.form.get('display_name', '').strip()    
-        current_user.display_name = display_name if display_name else current_user.username
+        user.display_name = display_name if display_name else user.username
 
         bio = request.form.get('bio', '').strip()
-        current_user.bio = bio if bio else None
+        user.bio = bio if bio else None
 
         avatar_link = request.form.get('avatar_url', '').strip()
         
@@ -73,16 +68,17 @@ def settings():
         # Don't overwrite existing uploaded avatar (from /profile/avatar) with dicebear
         # If avatar_link is empty, keep the existing avatar_url unchanged
         if avatar_link:
-            current_user.avatar_url = avatar_link
+            user.avatar_url = avatar_link
         # Note: If avatar_link is empty, we preserve the existing avatar_url
         # This allows users to keep their uploaded avatars even if the URL field is cleared
 
         db.session.commit()
+        invalidate_user(user.id)
 
         flash('Профиль обновлен.')
         return redirect(url_for('routes.user_profile', username='me'))
     
-    return render_template('settings.html', user=current_user)
+    return render_template('settings.html', user=current_user.orm)
 
 
 
@@ -97,18 +93,11 @@ def user_profile(username):
         return redirect(url_for('routes.user_profile', username=current_user.username))
     
     user = User.query.filter_by(username=username).first_or_404()
-    threads = Thread.query.filter_by(author=user).order_by(Thread.date_posted.desc()).all()
+    # first page only; the rest comes from user_threads_page ("load more")
+    threads_page = get_user_threads_after(user.id)
 
     # Current user's votes for threads (highlight persists after refresh)
-    if threads and current_user.is_authenticated:
-        post_ids = [t.id for t in threads]
-        votes = PostVote.query.filter(
-            PostVote.user_id == current_user.id,
-            PostVote.post_id.in_(post_ids)
-        ).all()
-        votes_by_post = {v.post_id: v.value for v in votes}
-        for t in threads:
-            t.my_vote = votes_by_post.get(t.id, 0)
+    my_votes = resolve_my_votes(current_user.id, post_ids=[t.id for t in threads_page.items])
     
     # Set breadcrumbs
     if current_user.is_authenticated and username == current_user.username:
@@ -121,4 +110,31 @@ def user_profile(username):
             {'label': username, 'url': ''}
         ]
     
-    return render_template('user.html', user=user, threads=threads, breadcrumbs=breadcrumbs)
\ No newline at end of file
+    return render_template(
+        'user.html',
+        user=user,
+        threads=threads_page.items,
+        threads_page=threads_page,
+        my_votes=my_votes,
+        breadcrumbs=breadcrumbs,
+    )
+
+@bp.route('/user/<username>/threads')
+@login_required
+def user_threads_page(username):
+    """Next page of a profile's threads as an HTML fragment"""
+    user_id = db.session.execute(db.select(User.id).where(User.username == username)).scalar()
+    if user_id is None:
+        return jsonify({"success": False, "reason": "not_found"}), 404
+
+    threads_page = get_user_threads_after(user_id, after=request.args.get('after') or None)
+
+    next_url = None
+    if threads_page.has_next:
+        next_url = url_for('routes.user_threads_page', username=username, after=threads_page.next_cursor)
+    html = render_template(
+        'components/_thread_fragment.html',
+        threads=threads_page.items,
+        my_votes=resolve_my_votes(current_user.id, post_ids=[t.id for t in threads_page.items]),
+    )
+    return jsonify({"html": html, "next_url": next_url})
\ No newline at end of file
@@ -0,0 +1,264 @@
+"""Full-text index over thread titles, thread content and comments.
+
+SQLite: FTS5 external-content tables `post_fts` / `comment_fts` (rowid is
+the row's id), kept in sync by triggers, so the bulk deletes in
+app/deletion.py need nothing extra. Postgres: a generated `search_vector`
+tsvector column on `post` and `comment` with a GIN index.
+
+The add_search_index migration creates both; db.create_all() databases
+(tests, AUTO_CREATE_DB) get them from the metadata event below, and
+include_object() hides them from alembic autogenerate. This module
+only holds the per-dialect SQL; app.services.search() is the entry point.
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from markupsafe import Markup, escape
+from sqlalchemy import DateTime, bindparam, event, text
+
+from app.extensions import db
+
+# text search configuration of the Postgres tsvector columns
+TS_CONFIG = "russian"
+MAX_TERMS = 8
+# SQLite has no stemming: terms this long also match as a prefix ("кот" -> "коты")
+PREFIX_MIN_LEN = 3
+SNIPPET_TOKENS = 24
+
+# kind column of the ranked hits; threads win ties with comments
+THREAD, COMMENT = 1, 0
+
+# highlight markers, swapped for <mark> after the text is escaped; user text
+# goes through strip_markers() on write, so only highlight() / snippet() /
+# ts_headline put them there
+_OPEN, _CLOSE = "\x02", "\x03"
+_STRIP_MARKERS = str.maketrans("", "", _OPEN + _CLOSE)
+_TERM_RE = re.compile(r"\w+")
+
+_FTS_TOKENIZE = "tokenize='unicode61 remove_diacritics 2'"
+
+
+def _fts_sync_triggers(table: str, columns: Sequence[str]) -> List[str]:
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    fts = f"{table}_fts"
+    delete = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END",
+        # only text edits touch the index, not score / counter updates
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN {delete} {insert} END",
+    ]
+
+
+def _tsvector_column(table: str, expression: str) -> List[str]:
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({expression}) STORED",
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING gin (search_vector)",
+    ]
+
+
+SCHEMA: Dict[str, List[str]] = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5("
+        f"title, content, content='post', content_rowid='id', {_FTS_TOKENIZE})",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS comment_fts USING fts5("
+        f"content, content='comment', content_rowid='id', {_FTS_TOKENIZE})",
+        *_fts_sync_triggers("post", ("title", "content")),
+        *_fts_sync_triggers("comment", ("content",)),
+    ],
+    "postgresql": [
+        *_tsvector_column(
+            "post",
+            f"setweight(to_tsvector('{TS_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{TS_CONFIG}', coalesce(content, '')), 'B')",
+        ),
+        *_tsvector_column("comment", f"to_tsvector('{TS_CONFIG}', coalesce(content, ''))"),
+    ],
+}
+
+# the Postgres column and index go away with their tables
+_DROP: Dict[str, List[str]] = {
+    "sqlite": ["DROP TABLE IF EXISTS post_fts", "DROP TABLE IF EXISTS comment_fts"],
+}
+
+
+# FTS5 keeps each index in these shadow tables next to the virtual one
+_FTS_SHADOW_SUFFIXES = ("data", "idx", "docsize", "config", "content")
+_SEARCH_TABLES = {
+    name for fts in ("post_fts", "comment_fts")
+    for name in (fts, *(f"{fts}_{suffix}" for suffix in _FTS_SHADOW_SUFFIXES))
+}
+_SEARCH_INDEXES = {"ix_post_search_vector", "ix_comment_search_vector"}
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """Alembic autogenerate filter (migrations/env.py): SCHEMA is not in the
+    model metadata, so without it every autogenerated revision drops it."""
+    if type_ == "table":
+        return name not in _SEARCH_TABLES
+    if type_ == "column":
+        return name != "search_vector"
+    if type_ == "index":
+        return name not in _SEARCH_INDEXES
+    return True
+
+
+def create_search_schema(connection) -> None:
+    for statement in SCHEMA.get(connection.dialect.name, ()):
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(db.metadata, "after_create")
+def _after_create(target, connection, **kw):
+    create_search_schema(connection)
+
+
+@event.listens_for(db.metadata, "before_drop")
+def _before_drop(target, connection, **kw):
+    for statement in _DROP.get(connection.dialect.name, ()):
+        connection.exec_driver_sql(statement)
+
+
+def rebuild_search_index() -> None:
+    """Re-read the FTS5 tables from post / comment (a no-op on Postgres)."""
+    if db.engine.dialect.name != "sqlite":
+        return
+    for fts in ("post_fts", "comment_fts"):
+        db.session.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+def strip_markers(value: str) -> str:
+    """Drop the highlight marker characters from user text before it is stored."""
+    return value.translate(_STRIP_MARKERS)
+
+
+def search_terms(q: Optional[str]) -> List[str]:
+    """Words of a user query; punctuation and FTS operators are dropped."""
+    return _TERM_RE.findall((q or "").lower())[:MAX_TERMS]
+
+
+def _fts5_match(terms: Sequence[str]) -> str:
+    # every term is quoted, so nothing the user types is FTS5 syntax
+    return " ".join(f'"{t}"*' if len(t) >= PREFIX_MIN_LEN else f'"{t}"' for t in terms)
+
+
+def _marked(value: Optional[str]) -> Markup:
+    return Markup(str(escape(value or "")).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>"))
+
+
+_SQLITE_HITS = """
+    SELECT {thread} AS kind, rowid AS id, -bm25(post_fts, 2.0, 1.0) AS rank
+    FROM post_fts WHERE post_fts MATCH :match
+    UNION ALL
+    SELECT {comment}, rowid, -bm25(comment_fts) FROM comment_fts WHERE comment_fts MATCH :match
+"""
+
+_POSTGRES_HITS = """
+    SELECT {thread} AS kind, p.id, ts_rank_cd(p.search_vector, q.query)::float8 AS rank
+    FROM post p, plainto_tsquery('{config}', :terms) AS q(query) WHERE p.search_vector @@ q.query
+    UNION ALL
+    SELECT {comment}, c.id, ts_rank_cd(c.search_vector, q.query)::float8
+    FROM comment c, plainto_tsquery('{config}', :terms) AS q(query) WHERE c.search_vector @@ q.query
+"""
+
+
+def _params(terms: Sequence[str]) -> Dict[str, object]:
+    return {"match": _fts5_match(terms), "terms": " ".join(terms)}
+
+
+def hits_query(dialect: str, terms: Sequence[str], after: Optional[Sequence], limit: int) -> Tuple[str, dict]:
+    """SQL and params of ranked_hits, best first, strictly after the `after` key."""
+    hits = (_SQLITE_HITS if dialect == "sqlite" else _POSTGRES_HITS).format(
+        thread=THREAD, comment=COMMENT, config=TS_CONFIG
+    )
+    sql = f"SELECT rank, kind, id FROM ({hits}) AS hits"
+    params = {**_params(terms), "limit": int(limit)}
+    if after is not None:
+        sql += " WHERE (rank, kind, id) < (:after_rank, :after_kind, :after_id)"
+        params.update(after_rank=float(after[0]), after_kind=int(after[1]), after_id=int(after[2]))
+    sql += " ORDER BY rank DESC, kind DESC, id DESC LIMIT :limit"
+    return sql, params
+
+
+def ranked_hits(terms: Sequence[str], after: Optional[Sequence], limit: int) -> List[Tuple[float, int, int]]:
+    """(rank, kind, id) of the best matches; higher rank is better on both backends."""
+    sql, params = hits_query(db.engine.dialect.name, terms, after, limit)
+    return [tuple(row) for row in db.session.execute(text(sql), params)]
+
+
+_SQLITE_DETAILS = {
+    THREAD: """
+        SELECT p.id, p.id AS thread_id, p.date_posted, u.username,
+               highlight(post_fts, 0, :open, :close) AS title,
+               snippet(post_fts, 1, :open, :close, '…', :tokens) AS snippet
+        FROM post_fts JOIN post p ON p.id = post_fts.rowid JOIN "user" u ON u.id = p.user_id
+        WHERE post_fts MATCH :match AND post_fts.rowid IN :ids
+    """,
+    COMMENT: """
+        SELECT c.id, c.post_id AS thread_id, c.date_posted, u.username, p.title,
+               snippet(comment_fts, 0, :open, :close, '…', :tokens) AS snippet
+        FROM comment_fts JOIN comment c ON c.id = comment_fts.rowid
+        JOIN post p ON p.id = c.post_id JOIN "user" u ON u.id = c.user_id
+        WHERE comment_fts MATCH :match AND comment_fts.rowid IN :ids
+    """,
+}
+
+_POSTGRES_DETAILS = {
+    THREAD: """
+        SELECT p.id, p.id AS thread_id, p.date_posted, u.username,
+               ts_headline('{config}', p.title, q.query, :title_options) AS title,
+               ts_headline('{config}', p.content, q.query, :options) AS snippet
+        FROM post p JOIN "user" u ON u.id = p.user_id
+        CROSS JOIN plainto_tsquery('{config}', :terms) AS q(query)
+        WHERE p.id IN :ids
+    """,
+    COMMENT: """
+        SELECT c.id, c.post_id AS thread_id, c.date_posted, u.username, p.title,
+               ts_headline('{config}', c.content, q.query, :options) AS snippet
+        FROM comment c JOIN post p ON p.id = c.post_id JOIN "user" u ON u.id = c.user_id
+        CROSS JOIN plainto_tsquery('{config}', :terms) AS q(query)
+        WHERE c.id IN :ids
+    """,
+}
+
+
+def hit_details(terms: Sequence[str], hits: Sequence[Tuple[float, int, int]]) -> Dict[Tuple[int, int], dict]:
+    """Highlighted title/snippet, author and date for one page of hits,
+    keyed by (kind, id). Hits deleted since ranking are missing."""
+    dialect = db.engine.dialect.name
+    statements = _SQLITE_DETAILS if dialect == "sqlite" else _POSTGRES_DETAILS
+    params = {
+        **_params(terms),
+        "open": _OPEN,
+        "close": _CLOSE,
+        "tokens": SNIPPET_TOKENS,
+        "options": f"StartSel={_OPEN}, StopSel={_CLOSE}, MaxWords={SNIPPET_TOKENS}, MinWords=8",
+        "title_options": f"StartSel={_OPEN}, StopSel={_CLOSE}, HighlightAll=true",
+    }
+
+    details = {}
+    for kind, statement in statements.items():
+        ids = [hit_id for _, hit_kind, hit_id in hits if hit_kind == kind]
+        if not ids:
+            continue
+        query = (
+            text(statement.format(config=TS_CONFIG))
+            .bindparams(bindparam("ids", expanding=True))
+            .columns(date_posted=DateTime)
+        )
+        for row in db.session.execute(query, {**params, "ids": ids}).mappings():
+            details[(kind, row["id"])] = {
+                "thread_id": row["thread_id"],
+                "date_posted": row["date_posted"],
+                "author": row["username"],
+                "title": _marked(row["title"]),
+                "snippet": _marked(row["snippet"]),
+            }
+    return details
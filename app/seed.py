@@ -0,0 +1,171 @@
+"""Synthetic data for benchmarks and local testing (`flask seed`).
+
+Everything is generated in Python first (ids, reply chains, vote totals), so
+scores and comment counts are consistent, and then written with executemany
+INSERTs in batches — no ORM objects, no per-row flushes.
+
+Seeded accounts are `seed_<n>` and all share SEED_PASSWORD.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from sqlalchemy import func
+from werkzeug.security import generate_password_hash
+
+from app.extensions import db
+from app.models import User, Thread, Comment, PostVote, CommentVote
+from app.ranking import hot_rank
+from app.rendering import rendered, thread_html
+from app.rollups import rebuild_rollups
+from app.services import content_preview
+
+SEED_PASSWORD = "seed-password"
+BATCH_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class SeedResult:
+    users: int
+    threads: int
+    comments: int
+    post_votes: int
+    comment_votes: int
+    first_user_id: int
+
+
+def _next_id(model) -> int:
+    return (db.session.execute(db.select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _insert(model, rows: List[Dict]) -> None:
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + BATCH_SIZE])
+
+
+def _sync_sequences(*models) -> None:
+    """Explicit ids do not advance Postgres sequences; move them past max(id)."""
+    if db.session.get_bind().dialect.name != "postgresql":
+        return
+    for model in models:
+        table = db.session.get_bind().dialect.identifier_preparer.format_table(model.__table__)
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence(:table, 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        ), {"table": table})
+
+
+def _skewed(rng: random.Random, n: int) -> int:
+    """Index in [0, n) biased towards 0 (a few hot threads, a long tail)."""
+    return min(n - 1, int(n * rng.random() ** 3))
+
+
+def seed_data(users: int, threads: int, comments: int, votes: int, seed: int = 0) -> SeedResult:
+    """Insert synthetic users, threads, comment trees and votes; commits."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    users, threads = max(users, 1), max(threads, 0)
+    password_hash = generate_password_hash(SEED_PASSWORD)  # hashed once for all accounts
+
+    user_id0 = _next_id(User)
+    thread_id0 = _next_id(Thread)
+    comment_id0 = _next_id(Comment)
+    user_ids = list(range(user_id0, user_id0 + users))
+
+    user_rows = [
+        {"id": uid, "username": f"seed_{uid}", "display_name": f"Seed {uid}",
+         "password_hash": password_hash, "is_admin": False}
+        for uid in user_ids
+    ]
+
+    thread_rows = []
+    for i in range(threads):
+        content = f"Synthetic thread body {i}. " * rng.randint(1, 8)
+        preview, has_more = content_preview(content)
+        thread_rows.append({
+            "id": thread_id0 + i,
+            "title": f"Seed thread {i}",
+            "content": content,
+            "content_preview": preview,
+            "content_has_more": has_more,
+            **thread_html(content, preview),
+            "user_id": rng.choice(user_ids),
+            "date_posted": now - timedelta(minutes=threads - i),
+            "comment_count": 0,
+            "score": 0,
+        })
+
+    # Comments cluster on hot threads; ~40% reply to an earlier comment there
+    comment_rows = []
+    by_thread: Dict[int, List[dict]] = {}
+    for i in range(comments if threads else 0):
+        thread = thread_rows[len(thread_rows) - 1 - _skewed(rng, len(thread_rows))]
+        siblings = by_thread.setdefault(thread["id"], [])
+        parent = rng.choice(siblings) if siblings and rng.random() < 0.4 else None
+        content = f"Synthetic comment {i}"
+        row = {
+            "id": comment_id0 + i,
+            "content": content,
+            **rendered(content, mentions=True),
+            "user_id": rng.choice(user_ids),
+            "post_id": thread["id"],
+            "parent_id": parent["id"] if parent else None,
+            "reply_to_user_id": parent["user_id"] if parent else None,
+            "date_posted": thread["date_posted"] + timedelta(seconds=i + 1),
+            "score": 0,
+        }
+        siblings.append(row)
+        comment_rows.append(row)
+        thread["comment_count"] += 1
+
+    # Two thirds of the votes go to threads, the rest to comments; one per (user, target)
+    def make_votes(targets: List[dict], fk: str, n: int) -> List[dict]:
+        rows, seen = [], set()
+        for _ in range(n * 2):
+            if len(rows) >= n or not targets:
+                break
+            target = targets[len(targets) - 1 - _skewed(rng, len(targets))]
+            key = (rng.choice(user_ids), target["id"])
+            if key in seen:
+                continue
+            seen.add(key)
+            value = 1 if rng.random() < 0.7 else -1
+            target["score"] += value
+            # spread over the last month so the day/week/month top feeds differ
+            voted_at = now - timedelta(seconds=rng.randrange(30 * 86400))
+            rows.append({"user_id": key[0], fk: key[1], "value": value, "created_at": voted_at, "updated_at": voted_at})
+        return rows
+
+    post_votes = make_votes(thread_rows, "post_id", votes * 2 // 3)
+    comment_votes = make_votes(comment_rows, "comment_id", votes - votes * 2 // 3)
+    for thread in thread_rows:
+        thread["hot_rank"] = hot_rank(thread["score"], thread["comment_count"], thread["date_posted"])
+
+    by_user = {row["id"]: row for row in user_rows}
+    for row in user_rows:
+        row["thread_count"] = row["comment_count"] = 0
+    for thread in thread_rows:
+        by_user[thread["user_id"]]["thread_count"] += 1
+    for comment in comment_rows:
+        by_user[comment["user_id"]]["comment_count"] += 1
+
+    _insert(User, user_rows)
+    _insert(Thread, thread_rows)
+    # parents always precede their replies, so FK order holds within batches
+    _insert(Comment, comment_rows)
+    _insert(PostVote, post_votes)
+    _insert(CommentVote, comment_votes)
+    _sync_sequences(User, Thread, Comment)
+    db.session.commit()
+    rebuild_rollups()
+
+    return SeedResult(
+        users=len(user_rows),
+        threads=len(thread_rows),
+        comments=len(comment_rows),
+        post_votes=len(post_votes),
+        comment_votes=len(comment_votes),
+        first_user_id=user_id0,
+    )
@@ -1,47 +1,69 @@
 from __future__ import annotations
 
+import base64
+import json
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Optional, Iterable, Any, Dict
 from datetime import datetime, timedelta, timezone
 
-from flask import current_app
-from sqlalchemy import func
+from flask import current_app, g, render_template
+from markupsafe import Markup
+from sqlalchemy import case, func, literal, tuple_, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import aliased, contains_eager, load_only
 import cloudinary.uploader
 
+from app.cache import invalidate_feed_cache
+from app.deletion import purge_comments, purge_threads, purge_user_threads, purge_users
 from app.extensions import db
-from app.models import Thread, User, Update, Comment, PostVote, CommentVote
+from app.identity import invalidate_user
+from app.ranking import hot_rank
+from app.rendering import rendered, thread_html
+from app.rollups import PERIODS, record_post_votes
+from app import search as search_index
+from app.jobs import enqueue_job
+from app.realtime import broadcast, broadcast_throttled
+from app.uploads import content_upload_options, enqueue_upload, placeholder_url
+from app.models import Thread, User, Update, Comment, PostVote, CommentVote, PostPeriodScore
 
 AlLOWED_MIME = {"image/jpeg", "image/png", "image/gif", "image/webp"}
 MAX_BYTES = 10 * 1024 * 1024 # 10MB
 
-def upload_content_image(file, *, folder: str) -> Dict[str, Any]:
-    if not file or getattr(file, "filename", "") == "":
-        return {"ok": True, "url": None, "public_id": None, "error": None}
-
+def validate_content_image(file, max_bytes: int = MAX_BYTES) -> Optional[str]:
+    """None if the file can be uploaded, else "bad_type" | "too_large"."""
     # MIME
     mime = getattr(file, "mimetype", None)
     if mime not in AlLOWED_MIME:
-        return {"ok": False, "url": None, "public_id": None, "error": "bad_type"}
+        return "bad_type"
 
     # SIZE
     file.stream.seek(0, 2)
     size = file.stream.tell()
     file.stream.seek(0)
-    if size > MAX_BYTES:
-        return {"ok": False, "url": None, "public_id": None, "error": "too_large"}
+    if size > max_bytes:
+        return "too_large"
+    return None
+
+def _has_file(file) -> bool:
+    return bool(file) and getattr(file, "filename", "") != ""
+
+def upload_content_image(file, *, folder: str) -> Dict[str, Any]:
+    """Synchronous upload; request handlers enqueue into app.uploads instead."""
+    if not _has_file(file):
+        return {"ok": True, "url": None, "public_id": None, "error": None}
+
+    error = validate_content_image(file)
+    if error is not None:
+        return {"ok": False, "url": None, "public_id": None, "error": error}
     
     try:
         result = cloudinary.uploader.upload(
             file,
-            folder=folder,
             resource_type="image",
-            overwrite=False,
-            unique_filename=True,
-            transformation=[
-                {"quality": "auto:eco"},
-                {"fetch_format": "auto"},
-                {"width": 520, "height": 520, "crop": "limit"},
-            ],
+            **content_upload_options(folder),
         )
         return {
             "ok": True,
@@ -60,13 +82,43 @@ Post = Thread
 # Admin op
 
 def ensure_admin_flag(user: User) -> bool:
+    """Promote one user (at login; accounts registered after startup)."""
     admins = current_app.config.get("ADMIN_USERNAMES", set())
     if user and user.username in admins and not user.is_admin:
         user.is_admin = True
         db.session.commit()
+        invalidate_user(user.id)
         return True
     return False
 
+def promote_configured_admins() -> int:
+    """Set is_admin for every existing ADMIN_USERNAMES account in one UPDATE.
+
+    Runs once per web worker start (app.jobs.start_background_jobs) instead
+    of checking current_user on every request.
+    Returns the number of promoted users.
+    """
+    admins = sorted(current_app.config.get("ADMIN_USERNAMES", set()))
+    if not admins:
+        return 0
+    result = db.session.execute(
+        db.update(User)
+        .where(User.username.in_(admins), User.is_admin.is_(False))
+        .values(is_admin=True)
+    )
+    db.session.commit()
+    return result.rowcount or 0
+
+def _bump_user_count(user_id: int, column: str, delta: int) -> None:
+    """Shift User.thread_count / comment_count in SQL (no read-modify-write). Caller commits."""
+    shifted = getattr(User, column) + delta
+    db.session.execute(
+        db.update(User)
+        .where(User.id == int(user_id))
+        .values({column: case((shifted > 0, shifted), else_=0)})
+        .execution_options(synchronize_session=False)
+    )
+
 @dataclass(frozen=True)
 class DeleteCommentResult:
     deleted: bool
@@ -82,16 +134,11 @@ def delete_comment(thread_id: int, comment_id: int, actor_user_id: int, actor_is
 
     if (not actor_is_admin) and (comment.user_id != int(actor_user_id)):
         return DeleteCommentResult(deleted=False, reason="forbidden")
-    
-    # Update comment count for the thread
-    thread = db.session.get(Thread, int(thread_id))
-    if thread is None:
-        return DeleteCommentResult(deleted=False, reason="not_found")
 
-    thread.comment_count = max(0, (thread.comment_count or 0) - 1)
-    
-    db.session.delete(comment)
-    db.session.commit()
+    # votes and replies go too; the thread's and authors' counters are recounted
+    purge_comments([comment.id])
+    invalidate_feed_cache()
+    broadcast(thread_id, "comment_deleted", {"thread_id": thread_id, "comment_id": int(comment_id)})
     return DeleteCommentResult(deleted=True, reason="ok")
 
 @dataclass
@@ -100,7 +147,7 @@ class DeleteAllPostsFromUserResult:
     deleted_count: int
     reason: str # "ok" | "not_found" | "forbidden"
 
-def admin_delete_all_posts_from_user(target_user_id: int, actor_is_admin: bool) -> DeleteAllPostsFromUserResult:
+def admin_delete_all_posts_from_user(target_user_id: int, actor_is_admin: bool, progress=None) -> DeleteAllPostsFromUserResult:
     if not actor_is_admin:
         return DeleteAllPostsFromUserResult(deleted=False, deleted_count=0, reason="forbidden")
     
@@ -108,13 +155,9 @@ def admin_delete_all_posts_from_user(target_user_id: int, actor_is_admin: bool)
     if user is None:
         return DeleteAllPostsFromUserResult(deleted=False, deleted_count=0, reason="not_found")
     
-    deleted_count = (
-        Thread.query
-        .filter(Thread.user_id == user.id)
-        .delete(synchronize_session=False)
-    )
-    db.session.commit()
-    return DeleteAllPostsFromUserResult(deleted=True, deleted_count=int(deleted_count), reason="ok")
+    stats = purge_user_threads([user.id], progress)
+    invalidate_feed_cache()
+    return DeleteAllPostsFromUserResult(deleted=True, deleted_count=stats.threads, reason="ok")
 
 @dataclass(frozen=True)
 class DeleteUserResult:
@@ -132,10 +175,10 @@ def admin_delete_user(target_user_id: int, actor_user_id: int, actor_is_admin: b
     if user is None:
         return DeleteUserResult(deleted=False, reason="not_found")
     
-    # Сначала удаляю треды, а потом пользователя
-    Thread.query.filter(Thread.user_id == user.id).delete(synchronize_session=False)
-    db.session.delete(user)
-    db.session.commit()
+    # треды, комментарии, голоса и обновления вместе с пользователем
+    purge_users([user.id])
+    invalidate_user(target_user_id)
+    invalidate_feed_cache()
 
     return DeleteUserResult(deleted=True, reason="ok")
 
@@ -149,6 +192,7 @@ def admin_bulk_delete_users(
         target_user_ids: Iterable[int],
         actor_user_id: int,
         actor_is_admin: bool,
+        progress=None,
 ) -> BulkDeleteUsersResult:
     if not actor_is_admin:
         return BulkDeleteUsersResult(deleted=False, deleted_count=0, reason="forbidden")
@@ -168,36 +212,377 @@ def admin_bulk_delete_users(
     if not ids:
         return BulkDeleteUsersResult(deleted=False, deleted_count=0, reason="empty")
 
-    # load targets and delete via ORM (stable for session/tests)
-    users = User.query.filter(User.id.in_(ids)).all()
+    stats = purge_users(ids, progress)
+    invalidate_user(*ids)
+    invalidate_feed_cache()
+    return BulkDeleteUsersResult(deleted=True, deleted_count=stats.users, reason="ok")
 
-    # delete threads first (fast path)
-    Thread.query.filter(Thread.user_id.in_([u.id for u in users])).delete(synchronize_session=False)
+# Background variants for the admin page (app/jobs.py runs them)
+@dataclass(frozen=True)
+class ScheduleJobResult:
+    scheduled: bool
+    job_id: Optional[int]
+    reason: str  # "ok" | "not_found" | "forbidden" | "self_delete_blocked" | "empty"
 
-    for u in users:
-        db.session.delete(u)
+def schedule_delete_all_posts_from_user(target_user_id: int, actor_user_id: int, actor_is_admin: bool) -> ScheduleJobResult:
+    if not actor_is_admin:
+        return ScheduleJobResult(scheduled=False, job_id=None, reason="forbidden")
 
-    db.session.commit()
-    return BulkDeleteUsersResult(deleted=True, deleted_count=len(users), reason="ok")
+    if db.session.get(User, int(target_user_id)) is None:
+        return ScheduleJobResult(scheduled=False, job_id=None, reason="not_found")
 
-# Thread listing (replaces old feed)
-def get_threads_feed(page: int = 1, per_page: int = 20, sort: str = "new"):
-    page = max(int(page), 1)
-    per_page = min(max(int(per_page), 1), 50)
+    job_id = enqueue_job("delete_user_threads", {"user_id": int(target_user_id)}, actor_user_id)
+    return ScheduleJobResult(scheduled=True, job_id=job_id, reason="ok")
+
+def schedule_delete_user(target_user_id: int, actor_user_id: int, actor_is_admin: bool) -> ScheduleJobResult:
+    if not actor_is_admin:
+        return ScheduleJobResult(scheduled=False, job_id=None, reason="forbidden")
+
+    if int(target_user_id) == int(actor_user_id):
+        return ScheduleJobResult(scheduled=False, job_id=None, reason="self_delete_blocked")
+
+    if db.session.get(User, int(target_user_id)) is None:
+        return ScheduleJobResult(scheduled=False, job_id=None, reason="not_found")
+
+    job_id = enqueue_job(
+        "delete_users", {"user_ids": [int(target_user_id)], "actor_id": int(actor_user_id)}, actor_user_id
+    )
+    return ScheduleJobResult(scheduled=True, job_id=job_id, reason="ok")
+
+def schedule_bulk_delete_users(
+        target_user_ids: Iterable[int],
+        actor_user_id: int,
+        actor_is_admin: bool,
+) -> ScheduleJobResult:
+    if not actor_is_admin:
+        return ScheduleJobResult(scheduled=False, job_id=None, reason="forbidden")
+
+    actor_id = int(actor_user_id)
+    ids: list[int] = []
+    for x in target_user_ids:
+        try:
+            ids.append(int(x))
+        except (TypeError, ValueError):
+            continue
+    ids = sorted({x for x in ids if x != actor_id})
+
+    if not ids:
+        return ScheduleJobResult(scheduled=False, job_id=None, reason="empty")
+
+    job_id = enqueue_job("delete_users", {"user_ids": ids, "actor_id": actor_id}, actor_id)
+    return ScheduleJobResult(scheduled=True, job_id=job_id, reason="ok")
+
+# Admin user listing
+ADMIN_USER_SORTS = ("id", "new", "threads", "comments", "votes")
+
+@dataclass(frozen=True)
+class AdminUserRow:
+    id: int
+    username: str
+    display_name: Optional[str]
+    is_admin: bool
+    thread_count: int
+    comment_count: int
+    vote_count: int
+
+@dataclass(frozen=True)
+class AdminUsersPage:
+    items: list  # AdminUserRow
+    sort: str
+    q: str
+    after: Optional[str]
+    next_cursor: Optional[str]
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.after is not None
+
+def _username_prefix_filter(prefix: str):
+    """Case-insensitive prefix match served by ix_user_username_lower."""
+    prefix = prefix.lower()
+    lowered = User.username_lower
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    condition = lowered.like(escaped + "%", escape="\\")
+    if db.session.get_bind().dialect.name != "postgresql" and ord(prefix[-1]) < 0x10FFFF:
+        # SQLite only turns LIKE into an index range on plain columns, so spell the range out
+        condition &= (lowered >= prefix) & (lowered < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+    return condition
+
+def _user_votes(user_ids=None):
+    """Votes per user (posts and comments): one UNION ALL grouped by user_id.
+
+    `user_ids` (a select of ids) limits the scan to one page of users.
+    """
+    def part(column):
+        q = db.select(column.label("user_id"))
+        return q if user_ids is None else q.where(column.in_(user_ids))
+
+    votes = union_all(part(PostVote.user_id), part(CommentVote.user_id)).subquery("votes")
+    return (
+        db.select(votes.c.user_id, func.count().label("votes"))
+        .group_by(votes.c.user_id)
+        .subquery("user_votes")
+    )
+
+# denormalized counters (app.counters) behind the count sorts, each served by
+# its (count DESC, id DESC) index
+_ADMIN_USER_COUNTERS = {"threads": User.thread_count, "comments": User.comment_count}
+
+def list_admin_users(q: str = "", sort: str = "id", after: Optional[str] = None, per_page: int = 50) -> AdminUsersPage:
+    """Keyset-paginated user list with per-user counts, in a single query.
+
+    sort: "id" (oldest first), "new" (newest first), or "threads" | "comments" |
+    "votes" (most active first). Thread and comment counts are the User
+    counters; votes are aggregated for the current page only, except for the
+    "votes" sort, which aggregates the whole vote tables. `q` is a username prefix.
+    """
+    per_page = min(max(int(per_page), 1), 200)
+    if sort not in ADMIN_USER_SORTS:
+        sort = "id"
+    q = (q or "").strip()[:64]
+
+    by_count = sort in ("threads", "comments", "votes")
+    values = _decode_cursor(after, 2 if by_count else 1)
+    if values is not None and not all(isinstance(v, int) for v in values):
+        values = None
+    if values is None:
+        after = None
+
+    if sort == "votes":
+        page_ids = None
+        votes = _user_votes(db.select(User.id).where(_username_prefix_filter(q)) if q else None)
+        order_key = func.coalesce(votes.c.votes, 0)
+        order = [order_key.desc(), User.id.desc()]
+    else:
+        page_ids = db.select(User.id)
+        if sort in _ADMIN_USER_COUNTERS:
+            order_key = _ADMIN_USER_COUNTERS[sort]
+            order = [order_key.desc(), User.id.desc()]
+            if values is not None:
+                page_ids = page_ids.where(tuple_(order_key, User.id) < tuple_(*values))
+        else:
+            order = [User.id.asc() if sort == "id" else User.id.desc()]
+            if values is not None:
+                page_ids = page_ids.where(User.id > values[0] if sort == "id" else User.id < values[0])
+        if q:
+            page_ids = page_ids.where(_username_prefix_filter(q))
+        page_ids = page_ids.order_by(*order).limit(per_page + 1)
+        votes = _user_votes(page_ids.scalar_subquery())
+
+    query = (
+        db.select(
+            User.id,
+            User.username,
+            User.display_name,
+            User.is_admin,
+            User.thread_count,
+            User.comment_count,
+            func.coalesce(votes.c.votes, 0),
+        )
+        .outerjoin(votes, votes.c.user_id == User.id)
+    )
+    if page_ids is None:
+        if values is not None:
+            query = query.where(tuple_(order_key, User.id) < tuple_(*values))
+        if q:
+            query = query.where(_username_prefix_filter(q))
+    else:
+        query = query.where(User.id.in_(page_ids.scalar_subquery()))
+    rows = db.session.execute(query.order_by(*order).limit(per_page + 1)).all()
 
-    query = Thread.query
+    items = [
+        AdminUserRow(
+            id=row[0], username=row[1], display_name=row[2], is_admin=bool(row[3]),
+            thread_count=int(row[4]), comment_count=int(row[5]), vote_count=int(row[6]),
+        )
+        for row in rows[:per_page]
+    ]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        key = {"threads": last.thread_count, "comments": last.comment_count, "votes": last.vote_count}.get(sort)
+        next_cursor = _encode_cursor([key, last.id] if by_count else [last.id])
+    return AdminUsersPage(items=items, sort=sort, q=q, after=after, next_cursor=next_cursor)
+
+CONTENT_PREVIEW_LEN = 220
+
+def _card_text(content: Optional[str]) -> str:
+    # trimmed so textarea indentation/newlines do not lead the card
+    return (content or "").replace("\r\n", "\n").lstrip()
+
+def content_preview(content: Optional[str]) -> tuple[str, bool]:
+    """(card preview, whether the body goes on) for Thread.content_preview / content_has_more."""
+    text = _card_text(content)
+    return text[:CONTENT_PREVIEW_LEN], len(text) > CONTENT_PREVIEW_LEN
+
+def get_thread_content_rest(thread_id: int) -> Optional[str]:
+    """The part of a thread body after its card preview; None if there is no such thread."""
+    content = db.session.execute(db.select(Thread.content).where(Thread.id == int(thread_id))).scalar()
+    if content is None:
+        return None
+    return _card_text(content)[CONTENT_PREVIEW_LEN:].strip()
+
+# What components/_post_card.html reads (plus the feed cursor keys). Listings
+# load just these, with the author joined in, so a page is one SELECT
+# instead of one more per distinct author.
+CARD_THREAD_COLUMNS = (
+    Thread.id, Thread.user_id, Thread.title, Thread.content_preview, Thread.content_preview_html,
+    Thread.content_has_more, Thread.image_url, Thread.date_posted, Thread.score, Thread.comment_count, Thread.hot_rank,
+)
+CARD_AUTHOR_COLUMNS = (User.id, User.username, User.display_name, User.avatar_url)
+
+def with_card_fields(query):
+    """Restrict a Thread query to the card columns and eager-load the author's."""
+    return query.join(Thread.author).options(
+        load_only(*CARD_THREAD_COLUMNS),
+        contains_eager(Thread.author).load_only(*CARD_AUTHOR_COLUMNS),
+    )
+
+# Keyset (cursor) pagination
+def _encode_cursor(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
 
+def _decode_cursor(cursor: Optional[str], size: int) -> Optional[list]:
+    """Returns decoded cursor values or None for an empty/broken cursor."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+FEED_SORTS = ("new", "top", "discussed", "hot")
+# feeds ordered by score or hot_rank; a vote leaves "new" / "discussed" cached
+# (their cards may show a score up to FEED_CACHE_TTL old, open pages get
+# post_score_updated live)
+VOTE_FEED_SORTS = ("top", "hot")
+# ?t= of the top sort; all-time when missing
+TOP_WINDOWS = tuple(PERIODS)
+
+def _feed_sort_key(sort: str):
     if sort == "top":
-        query = query.order_by(Thread.score.desc(), Thread.date_posted.desc())
-    elif sort == "discussed":
-        query = query.order_by(Thread.comment_count.desc(), Thread.date_posted.desc())
-    else: # new
-        query = query.order_by(Thread.date_posted.desc())
-        
-    return query.paginate(page=page, per_page=per_page, error_out=False)
+        return Thread.score
+    if sort == "discussed":
+        return Thread.comment_count
+    return None
+
+def _feed_columns(sort: str) -> list:
+    """ORDER BY columns (all DESC) of a feed sort; they match its index."""
+    if sort == "hot":
+        # hot_rank already folds in the age, so id is enough as a tiebreaker
+        return [Thread.hot_rank, Thread.id]
+    key = _feed_sort_key(sort)
+    return [Thread.date_posted, Thread.id] if key is None else [key, Thread.date_posted, Thread.id]
 
-# Backward compatibility alias
-get_main_feed = get_threads_feed
+@dataclass(frozen=True)
+class ThreadsFeedPage:
+    items: list
+    sort: str
+    after: Optional[str]
+    next_cursor: Optional[str]
+    window: Optional[str] = None  # day | week | month for sort="top"
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.after is not None
+
+def _feed_cursor_for(thread: Thread, sort: str) -> str:
+    if sort == "hot":
+        return _encode_cursor([float(thread.hot_rank or 0), thread.id])
+    key = _feed_sort_key(sort)
+    values = [thread.date_posted.isoformat(), thread.id]
+    if key is not None:
+        values.insert(0, int(getattr(thread, key.key) or 0))
+    return _encode_cursor(values)
+
+def _parse_feed_cursor(after: Optional[str], sort: str) -> Optional[list]:
+    if sort == "hot":
+        values = _decode_cursor(after, 2)
+        try:
+            return None if values is None else [float(values[0]), int(values[1])]
+        except (TypeError, ValueError):
+            return None
+    has_key = _feed_sort_key(sort) is not None
+    values = _decode_cursor(after, 3 if has_key else 2)
+    if values is None:
+        return None
+    try:
+        parsed = [datetime.fromisoformat(values[-2]), int(values[-1])]
+        if has_key:
+            parsed.insert(0, int(values[0]))
+    except (TypeError, ValueError):
+        return None
+    return parsed
+
+def _window_feed_page(after: Optional[str], per_page: int, window: str) -> ThreadsFeedPage:
+    """Top threads by net votes within the window, read from post_period_scores (app.rollups)."""
+    columns = [PostPeriodScore.score, PostPeriodScore.post_id]
+    query = (
+        with_card_fields(db.session.query(Thread, PostPeriodScore.score))
+        .join(PostPeriodScore, PostPeriodScore.post_id == Thread.id)
+        .filter(PostPeriodScore.period == window)
+        .order_by(*[c.desc() for c in columns])
+    )
+    values = _decode_cursor(after, 2)
+    try:
+        values = None if values is None else [int(values[0]), int(values[1])]
+    except (TypeError, ValueError):
+        values = None
+    if values is not None:
+        query = query.filter(tuple_(*columns) < tuple_(*values))
+    else:
+        after = None
+
+    rows = query.limit(per_page + 1).all()
+    items = [thread for thread, _ in rows[:per_page]]
+    next_cursor = None
+    if len(rows) > per_page:
+        last, score = rows[per_page - 1]
+        next_cursor = _encode_cursor([score, last.id])
+    return ThreadsFeedPage(items=items, sort="top", after=after, next_cursor=next_cursor, window=window)
+
+def get_threads_feed_after(after: Optional[str] = None, per_page: int = 20, sort: str = "new",
+                           window: Optional[str] = None) -> ThreadsFeedPage:
+    """Cursor-based feed page: no OFFSET and no COUNT(*), so deep pages cost the same as the first one.
+
+    `after` is an opaque cursor from a previous page's `next_cursor`;
+    it encodes (score|comment_count, date_posted, id) of the last seen thread,
+    (hot_rank, id) for the hot sort, or (period score, id) for the top sort
+    with a `window` (one of TOP_WINDOWS).
+    """
+    per_page = min(max(int(per_page), 1), 50)
+    if sort not in FEED_SORTS:
+        sort = "new"
+    if sort == "top" and window in TOP_WINDOWS:
+        return _window_feed_page(after, per_page, window)
+
+    columns = _feed_columns(sort)
+
+    query = with_card_fields(Thread.query).order_by(*[c.desc() for c in columns])
+
+    values = _parse_feed_cursor(after, sort)
+    if values is not None:
+        query = query.filter(tuple_(*columns) < tuple_(*values))
+    else:
+        after = None
+
+    rows = query.limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = _feed_cursor_for(items[-1], sort) if len(rows) > per_page else None
+    return ThreadsFeedPage(items=items, sort=sort, after=after, next_cursor=next_cursor)
 
 # Threads of a specific user
 def list_user_threads(user_id: int, limit: int = 50):
@@ -205,7 +590,7 @@ def list_user_threads(user_id: int, limit: int = 50):
     limit = min(max(int(limit), 1), 100)
 
     return (
-        Thread.query
+        with_card_fields(Thread.query)
         .filter(Thread.user_id == user_id)
         .order_by(Thread.date_posted.desc())
         .limit(limit)
@@ -215,6 +600,97 @@ def list_user_threads(user_id: int, limit: int = 50):
 # Backward compatibility alias
 list_user_posts = list_user_threads
 
+PROFILE_PAGE_SIZE = 20
+
+def get_user_threads_after(user_id: int, after: Optional[str] = None, per_page: int = PROFILE_PAGE_SIZE) -> ThreadsFeedPage:
+    """A user's threads, newest first, keyset-paginated by (date_posted, id).
+
+    Walks ix_post_user_id_date_posted_id, so any page of a prolific
+    author's profile costs the same; the cursor is the "new" feed's.
+    """
+    per_page = min(max(int(per_page), 1), 50)
+    columns = [Thread.date_posted, Thread.id]
+    query = (
+        with_card_fields(Thread.query)
+        .filter(Thread.user_id == int(user_id))
+        .order_by(*[c.desc() for c in columns])
+    )
+    values = _parse_feed_cursor(after, "new")
+    if values is not None:
+        query = query.filter(tuple_(*columns) < tuple_(*values))
+    else:
+        after = None
+
+    rows = query.limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = _feed_cursor_for(items[-1], "new") if len(rows) > per_page else None
+    return ThreadsFeedPage(items=items, sort="new", after=after, next_cursor=next_cursor)
+
+# Full-text search (index and per-dialect SQL in app/search.py)
+SEARCH_PAGE_SIZE = 20
+
+@dataclass(frozen=True)
+class SearchHit:
+    kind: str  # "thread" | "comment"
+    id: int
+    thread_id: int
+    title: Markup  # highlighted for thread hits, the parent thread's for comments
+    snippet: Markup
+    author: str
+    date_posted: datetime
+
+@dataclass(frozen=True)
+class SearchPage:
+    q: str
+    items: list
+    after: Optional[str]
+    next_cursor: Optional[str]
+    reason: str  # "ok" | "empty_query"
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.after is not None
+
+def _parse_search_cursor(after: Optional[str]) -> Optional[list]:
+    values = _decode_cursor(after, 3)
+    try:
+        return None if values is None else [float(values[0]), int(values[1]), int(values[2])]
+    except (TypeError, ValueError):
+        return None
+
+def search(q: Optional[str], after: Optional[str] = None, per_page: int = SEARCH_PAGE_SIZE) -> SearchPage:
+    """Threads (title + content) and comments matching every word of `q`.
+
+    Best match first, keyset-paginated by (rank, kind, id). Matching and
+    ranking run on the FTS5 tables (SQLite) or the GIN-indexed tsvector
+    columns (Postgres); snippets are built for the returned page only.
+    """
+    q = (q or "").strip()
+    terms = search_index.search_terms(q)
+    if not terms:
+        return SearchPage(q=q, items=[], after=None, next_cursor=None, reason="empty_query")
+
+    per_page = min(max(int(per_page), 1), 50)
+    values = _parse_search_cursor(after)
+    if values is None:
+        after = None
+
+    hits = search_index.ranked_hits(terms, values, per_page + 1)
+    page = hits[:per_page]
+    details = search_index.hit_details(terms, page)
+    kinds = {search_index.THREAD: "thread", search_index.COMMENT: "comment"}
+    items = [
+        SearchHit(kind=kinds[kind], id=hit_id, **details[(kind, hit_id)])
+        for _, kind, hit_id in page
+        if (kind, hit_id) in details
+    ]
+    next_cursor = _encode_cursor(list(page[-1])) if len(hits) > per_page else None
+    return SearchPage(q=q, items=items, after=after, next_cursor=next_cursor, reason="ok")
+
 # Thread deletion
 @dataclass(frozen=True)
 class DeleteThreadResult:
@@ -233,11 +709,9 @@ def delete_thread(thread_id: int, actor_user_id: int, actor_is_admin: bool) -> D
     if not can_delete:
         return DeleteThreadResult(deleted=False, reason="forbidden")
 
-    # delete comments first
-    db.session.query(Comment).filter(Comment.post_id == thread_id).delete(synchronize_session=False)
-
-    db.session.delete(thread)
-    db.session.commit()
+    # comments and votes go with the thread
+    purge_threads([thread.id])
+    invalidate_feed_cache()
     return DeleteThreadResult(deleted=True, reason="ok")
 
 # Backward compatibility alias
@@ -258,8 +732,8 @@ def create_thread(user_id: int, title: str, content: str, image_file=None) -> Cr
     MAX_CONTENT_LEN = 2000
     THREADS_PER_MINUTE = 5
 
-    content = (content or "").strip()
-    title = (title or "").strip()
+    content = search_index.strip_markers(content or "").strip()
+    title = search_index.strip_markers(title or "").strip()
 
     if len(title) > MAX_TITLE_LEN:
         return CreateThreadResult(created=False, thread_id=None, reason="too_long_title")
@@ -290,23 +764,35 @@ def create_thread(user_id: int, title: str, content: str, image_file=None) -> Cr
     if count >= THREADS_PER_MINUTE:
         return CreateThreadResult(created=False, thread_id=None, reason="rate_limited")
 
-    # Upload image if provided
-    image_url = None
-    if image_file:
-        upload_result = upload_content_image(image_file, folder="threads")
-        if not upload_result["ok"]:
-            error = upload_result.get("error", "upload_failed")
-            if error == "bad_type":
-                return CreateThreadResult(created=False, thread_id=None, reason="bad_image_type")
-            elif error == "too_large":
-                return CreateThreadResult(created=False, thread_id=None, reason="image_too_large")
-            else:
-                return CreateThreadResult(created=False, thread_id=None, reason="image_upload_failed")
-        image_url = upload_result.get("url")
-
-    thread = Thread(title=title, content=content, user_id=user_id, image_url=image_url)
+    # Image is validated here and uploaded in the background
+    has_image = _has_file(image_file)
+    if has_image:
+        error = validate_content_image(image_file)
+        if error == "bad_type":
+            return CreateThreadResult(created=False, thread_id=None, reason="bad_image_type")
+        elif error == "too_large":
+            return CreateThreadResult(created=False, thread_id=None, reason="image_too_large")
+
+    image_url = placeholder_url() if has_image else None
+    preview, has_more = content_preview(content)
+    thread = Thread(
+        title=title, content=content, user_id=user_id, image_url=image_url,
+        content_preview=preview, content_has_more=has_more, **thread_html(content, preview),
+        date_posted=now, hot_rank=hot_rank(0, 0, now),
+    )
     db.session.add(thread)
+    _bump_user_count(user_id, "thread_count", 1)
     db.session.commit()
+    invalidate_feed_cache()
+
+    if has_image:
+        enqueue_upload(
+            image_file,
+            kind="thread",
+            target_id=thread.id,
+            options=content_upload_options("threads"),
+            room=f"thread_{thread.id}",
+        )
 
     return CreateThreadResult(created=True, thread_id=thread.id, reason="ok")
 
@@ -342,24 +828,31 @@ def create_update(actor_user_id: int, actor_is_admin: bool, title: str, content:
     if not title:
         return CreateUpdateResult(created=False, update_id=None, reason="empty_content")
 
-    # Upload image if provided
-    image_path = None
-    if image_file:
-        upload_result = upload_content_image(image_file, folder="updates")
-        if not upload_result["ok"]:
-            error = upload_result.get("error", "upload_failed")
-            if error == "bad_type":
-                return CreateUpdateResult(created=False, update_id=None, reason="bad_image_type")
-            elif error == "too_large":
-                return CreateUpdateResult(created=False, update_id=None, reason="image_too_large")
-            else:
-                return CreateUpdateResult(created=False, update_id=None, reason="image_upload_failed")
-        image_path = upload_result.get("url")
-
-    update = Update(title=title, content=content, author_id=actor_user_id, image_path=image_path)
+    # Image is validated here and uploaded in the background
+    has_image = _has_file(image_file)
+    if has_image:
+        error = validate_content_image(image_file)
+        if error == "bad_type":
+            return CreateUpdateResult(created=False, update_id=None, reason="bad_image_type")
+        elif error == "too_large":
+            return CreateUpdateResult(created=False, update_id=None, reason="image_too_large")
+
+    image_path = placeholder_url() if has_image else None
+    update = Update(
+        title=title, content=content, author_id=actor_user_id, image_path=image_path, **rendered(content),
+    )
     db.session.add(update)
     db.session.commit()
 
+    if has_image:
+        enqueue_upload(
+            image_file,
+            kind="update",
+            target_id=update.id,
+            options=content_upload_options("updates"),
+            room="updates",
+        )
+
     return CreateUpdateResult(created=True, update_id=update.id, reason="ok")
 
 def list_updates(page: int = 1, per_page: int = 20):
@@ -379,7 +872,7 @@ def create_comment(
     reply_to_user_id: Optional[int] = None,
     image_file=None,
     ):
-    content = (content or "").strip()
+    content = search_index.strip_markers(content or "").strip()
     if not content:
         return {"ok": False, "error": "empty", "comment_id": None}
 
@@ -401,16 +894,26 @@ def create_comment(
         if reply_to_user is None:
             return {"ok": False, "error": "reply_to_user_not_found", "comment_id": None}
 
-    # Upload image if provided
-    image_url = None
-    if image_file:
-        upload_result = upload_content_image(image_file, folder="comments")
-        if not upload_result["ok"]:
-            return {"ok": False, "error": upload_result.get("error", "upload_failed"), "comment_id": None}
-        image_url = upload_result.get("url")
-
-    # Update comment count for the thread
-    thread.comment_count = (thread.comment_count or 0) + 1
+    # Image is validated here and uploaded in the background
+    has_image = _has_file(image_file)
+    if has_image:
+        error = validate_content_image(image_file)
+        if error is not None:
+            return {"ok": False, "error": error, "comment_id": None}
+
+    # Shift the thread's comment count in SQL and rank from the returned row,
+    # so concurrent comments and votes (vote_post) never lose updates
+    score, comment_count, date_posted = db.session.execute(
+        db.update(Post)
+        .where(Post.id == int(thread_id))
+        .values(comment_count=func.coalesce(Post.comment_count, 0) + 1)
+        .returning(Post.score, Post.comment_count, Post.date_posted)
+    ).one()
+    db.session.execute(
+        db.update(Post)
+        .where(Post.id == int(thread_id))
+        .values(hot_rank=hot_rank(score, comment_count, date_posted))
+    )
 
     # Thread.__tablename__ == 'post', so use post_id FK
     comment = Comment(
@@ -419,12 +922,331 @@ def create_comment(
         post_id=thread_id, 
         parent_id=parent_id,
         reply_to_user_id=reply_to_user_id,
-        image_url=image_url,
+        image_url=placeholder_url() if has_image else None,
+        **rendered(content, mentions=True),
     )
     db.session.add(comment)
+    _bump_user_count(author_id, "comment_count", 1)
     db.session.commit()
+    invalidate_feed_cache()
+
+    if has_image:
+        enqueue_upload(
+            image_file,
+            kind="comment",
+            target_id=comment.id,
+            options=content_upload_options("comments"),
+            room=f"thread_{thread_id}",
+        )
+
+    _broadcast_comment_created(thread_id, comment.id, parent_id)
     return {"ok": True, "error": None, "comment_id": comment.id}
 
+def _broadcast_comment_created(thread_id: int, comment_id: int, parent_id: Optional[int]) -> None:
+    try:
+        html = render_comment_html(comment_id)
+    except Exception:
+        # e.g. called outside a request (CLI), where url_for cannot build URLs
+        current_app.logger.exception("Could not render comment %s for broadcast", comment_id)
+        return
+    broadcast(thread_id, "comment_created", {
+        "thread_id": thread_id,
+        "comment_id": comment_id,
+        "parent_id": parent_id,
+        "html": html,
+    })
+
+
+# Comment tree (thread page)
+COMMENTS_PAGE_SIZE = 20   # top-level comments per page
+REPLIES_PAGE_SIZE = 3     # replies rendered inline under each comment
+MAX_INLINE_DEPTH = 3      # deeper replies are fetched on demand
+
+class CommentAuthor:
+    """Lightweight author snapshot shared by all comments of the same user."""
+    __slots__ = ("id", "username", "display_name", "avatar_url")
+
+    def __init__(self, id: int, username: str, display_name: Optional[str], avatar_url: Optional[str]):
+        self.id = id
+        self.username = username
+        self.display_name = display_name
+        self.avatar_url = avatar_url
+
+class CommentNode:
+    __slots__ = (
+        "id", "content", "content_html", "date_posted", "image_url", "score",
+        "user_id", "post_id", "parent_id", "reply_to_user_id",
+        "author", "reply_to_user", "replies",
+        "has_more_replies", "replies_cursor",
+    )
+
+    def __init__(self, row, author: CommentAuthor, reply_to_user: Optional[CommentAuthor]):
+        self.id = row.id
+        self.content = row.content
+        self.content_html = row.content_html
+        self.date_posted = row.date_posted
+        self.image_url = row.image_url
+        self.score = row.score
+        self.user_id = row.user_id
+        self.post_id = row.post_id
+        self.parent_id = row.parent_id
+        self.reply_to_user_id = row.reply_to_user_id
+        self.author = author
+        self.reply_to_user = reply_to_user
+        self.replies = []
+        self.has_more_replies = False
+        self.replies_cursor = None  # `after` for the next replies page
+
+class _CommentNodeBuilder:
+    """Turns comment rows into nodes, sharing one CommentAuthor per user."""
+
+    def __init__(self):
+        self.authors: Dict[int, CommentAuthor] = {}
+        self.by_id: Dict[int, CommentNode] = {}
+
+    def _author(self, user_id, username, display_name, avatar_url) -> CommentAuthor:
+        author = self.authors.get(user_id)
+        if author is None:
+            author = self.authors[user_id] = CommentAuthor(user_id, username, display_name, avatar_url)
+        return author
+
+    def node(self, row) -> CommentNode:
+        reply_to = None
+        if row.reply_to_user_id is not None and row.reply_to_username is not None:
+            reply_to = self._author(
+                row.reply_to_user_id, row.reply_to_username, row.reply_to_display_name, row.reply_to_avatar_url
+            )
+        node = CommentNode(row, self._author(row.user_id, row.username, row.display_name, row.avatar_url), reply_to)
+        self.by_id[node.id] = node
+        return node
+
+def _comment_select():
+    reply_user = aliased(User)
+    return (
+        db.select(
+            Comment.id, Comment.content, Comment.content_html, Comment.date_posted, Comment.image_url,
+            Comment.score, Comment.user_id, Comment.post_id, Comment.parent_id, Comment.reply_to_user_id,
+            User.username, User.display_name, User.avatar_url,
+            reply_user.username.label("reply_to_username"),
+            reply_user.display_name.label("reply_to_display_name"),
+            reply_user.avatar_url.label("reply_to_avatar_url"),
+        )
+        .join(User, User.id == Comment.user_id)
+        .outerjoin(reply_user, reply_user.id == Comment.reply_to_user_id)
+    )
+
+def render_comment_html(comment_id: int) -> str:
+    """Viewer-agnostic HTML of one comment (no replies) for Socket.IO broadcasts."""
+    row = db.session.execute(_comment_select().where(Comment.id == int(comment_id))).first()
+    if row is None:
+        return ""
+    node = _CommentNodeBuilder().node(row)
+    return render_template(
+        "components/_comment_fragment.html",
+        comments=[node],
+        depth=0 if node.parent_id is None else 1,
+        shared_render=True,
+    )
+
+def _comment_cursor_for(node: CommentNode) -> str:
+    return _encode_cursor([node.date_posted.isoformat(), node.id])
+
+def _parse_comment_cursor(after: Optional[str]) -> Optional[list]:
+    values = _decode_cursor(after, 2)
+    if values is None:
+        return None
+    try:
+        return [datetime.fromisoformat(values[0]), int(values[1])]
+    except (TypeError, ValueError):
+        return None
+
+@dataclass(frozen=True)
+class CommentPage:
+    items: list               # [CommentNode], oldest first, with inline replies attached
+    by_id: dict               # every node on the page, replies included
+    next_cursor: Optional[str]
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+def _attach_replies(builder: _CommentNodeBuilder, parents: list, replies_limit: int) -> None:
+    """Attach the first `replies_limit` replies to every parent, level by level.
+
+    One windowed query per level (ROW_NUMBER() OVER (PARTITION BY parent_id)),
+    so the page size stays bounded no matter how large the thread is.
+    Below MAX_INLINE_DEPTH only the "has more replies" flag is resolved.
+    """
+    level, depth = parents, 1
+    while level:
+        limit = replies_limit if depth < MAX_INLINE_DEPTH else 0
+        by_parent = {n.id: n for n in level}
+
+        rn = func.row_number().over(
+            partition_by=Comment.parent_id, order_by=(Comment.date_posted, Comment.id)
+        ).label("rn")
+        ranked = _comment_select().add_columns(rn).where(Comment.parent_id.in_(list(by_parent))).subquery()
+        rows = db.session.execute(
+            db.select(ranked)
+            .where(ranked.c.rn <= limit + 1)
+            .order_by(ranked.c.parent_id, ranked.c.date_posted, ranked.c.id)
+        )
+
+        next_level = []
+        for row in rows:
+            parent = by_parent[row.parent_id]
+            if len(parent.replies) < limit:
+                node = builder.node(row)
+                parent.replies.append(node)
+                next_level.append(node)
+            else:
+                parent.has_more_replies = True
+                if parent.replies:
+                    parent.replies_cursor = _comment_cursor_for(parent.replies[-1])
+
+        level, depth = next_level, depth + 1
+
+def _load_comment_page(where, after: Optional[str], limit: int, replies_limit: int) -> CommentPage:
+    limit = min(max(int(limit), 1), 100)
+    replies_limit = min(max(int(replies_limit), 0), 20)
+
+    query = _comment_select().where(*where)
+    values = _parse_comment_cursor(after)
+    if values is not None:
+        query = query.where(tuple_(Comment.date_posted, Comment.id) > tuple_(*values))
+    rows = db.session.execute(query.order_by(Comment.date_posted, Comment.id).limit(limit + 1)).all()
+
+    builder = _CommentNodeBuilder()
+    items = [builder.node(row) for row in rows[:limit]]
+    _attach_replies(builder, items, replies_limit)
+
+    next_cursor = _comment_cursor_for(items[-1]) if len(rows) > limit else None
+    return CommentPage(items=items, by_id=builder.by_id, next_cursor=next_cursor)
+
+def load_comments_page(
+    thread_id: int,
+    after: Optional[str] = None,
+    limit: int = COMMENTS_PAGE_SIZE,
+    replies_limit: int = REPLIES_PAGE_SIZE,
+) -> CommentPage:
+    """Top-level comments of a thread, keyset-paginated by (date_posted, id)."""
+    where = (Comment.post_id == int(thread_id), Comment.parent_id.is_(None))
+    return _load_comment_page(where, after, limit, replies_limit)
+
+def load_replies_page(
+    comment_id: int,
+    after: Optional[str] = None,
+    limit: int = COMMENTS_PAGE_SIZE,
+    replies_limit: int = REPLIES_PAGE_SIZE,
+) -> CommentPage:
+    """Direct replies of a comment, keyset-paginated by (date_posted, id)."""
+    return _load_comment_page((Comment.parent_id == int(comment_id),), after, limit, replies_limit)
+
+# Current user's votes ("my votes") for listing and thread pages
+@dataclass(frozen=True)
+class MyVotes:
+    posts: dict     # post_id -> 1 | -1
+    comments: dict  # comment_id -> 1 | -1
+
+    def post(self, post_id: int) -> int:
+        return self.posts.get(post_id, 0)
+
+    def comment(self, comment_id: int) -> int:
+        return self.comments.get(comment_id, 0)
+
+NO_VOTES = MyVotes(posts={}, comments={})
+
+class _MyVotesLRU:
+    """Per-process LRU of resolved vote states, one entry per user.
+
+    Entries hold what has been resolved so far (0 included, so misses are
+    cached too); vote writes drop the user's entry.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._data: "OrderedDict[int, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> dict:
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                entry = self._data[user_id] = {}
+                while len(self._data) > self.max_users:
+                    self._data.popitem(last=False)
+            else:
+                self._data.move_to_end(user_id)
+            return entry
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._data.pop(user_id, None)
+
+def _my_votes_lru() -> Optional[_MyVotesLRU]:
+    size = int(current_app.config.get("MY_VOTES_CACHE_SIZE", 0) or 0)
+    if size <= 0:
+        return None
+    lru = current_app.extensions.get("my_votes_lru")
+    if lru is None or lru.max_users != size:
+        lru = current_app.extensions["my_votes_lru"] = _MyVotesLRU(size)
+    return lru
+
+def _my_votes_store(user_id: int) -> dict:
+    """Resolved votes for `user_id`: the per-user LRU when enabled, else per request."""
+    lru = _my_votes_lru()
+    if lru is not None:
+        return lru.get(user_id)
+
+    per_request = g.setdefault("_my_votes", {})
+    return per_request.setdefault(user_id, {})
+
+def invalidate_my_votes(user_id: int) -> None:
+    lru = _my_votes_lru()
+    if lru is not None:
+        lru.invalidate(int(user_id))
+    g.pop("_my_votes", None)
+
+def resolve_my_votes(user_id: Optional[int], post_ids: Iterable[int] = (), comment_ids: Iterable[int] = ()) -> MyVotes:
+    """Votes of one user for many posts and comments in a single round trip.
+
+    Only ids that are not cached yet hit the database (one UNION ALL over
+    post_votes and comment_votes).
+    """
+    if user_id is None:
+        return NO_VOTES
+    user_id = int(user_id)
+    store = _my_votes_store(user_id)
+
+    post_ids = {int(x) for x in post_ids}
+    comment_ids = {int(x) for x in comment_ids}
+    missing_posts = [x for x in post_ids if ("p", x) not in store]
+    missing_comments = [x for x in comment_ids if ("c", x) not in store]
+
+    if missing_posts or missing_comments:
+        parts = []
+        if missing_posts:
+            parts.append(
+                db.select(literal("p").label("kind"), PostVote.post_id.label("target_id"), PostVote.value)
+                .where(PostVote.user_id == user_id, PostVote.post_id.in_(missing_posts))
+            )
+        if missing_comments:
+            parts.append(
+                db.select(literal("c").label("kind"), CommentVote.comment_id.label("target_id"), CommentVote.value)
+                .where(CommentVote.user_id == user_id, CommentVote.comment_id.in_(missing_comments))
+            )
+        stmt = parts[0] if len(parts) == 1 else union_all(*parts)
+
+        found = {(kind, target_id): value for kind, target_id, value in db.session.execute(stmt)}
+        for x in missing_posts:
+            store[("p", x)] = found.get(("p", x), 0)
+        for x in missing_comments:
+            store[("c", x)] = found.get(("c", x), 0)
+
+    return MyVotes(
+        posts={x: store[("p", x)] for x in post_ids if store[("p", x)]},
+        comments={x: store[("c", x)] for x in comment_ids if store[("c", x)]},
+    )
 
 @dataclass(frozen=True)
 class VotePostResult:
@@ -442,58 +1264,120 @@ class VoteCommentResult:
     my_vote: Optional[int] = None  # 1, -1, or 0 (removed)
 
 
-def vote_post(post_id: int, user_id: int, value: int) -> VotePostResult:
-    post = db.session.get(Post, int(post_id))
+def _upsert(model):
+    """Dialect-specific INSERT that supports ON CONFLICT (Postgres and SQLite)."""
+    if db.session.get_bind().dialect.name == "sqlite":
+        return sqlite_insert(model)
+    return pg_insert(model)
+
+def _lock_target(target_model, target_id: int) -> bool:
+    """Row-lock the vote target for the rest of the transaction; False if missing.
+
+    SQLite ignores FOR UPDATE (and pysqlite only opens the transaction on the
+    first write), so there a no-op UPDATE takes the database write lock instead.
+    """
+    if db.session.get_bind().dialect.name == "sqlite":
+        return db.session.execute(
+            db.update(target_model).where(target_model.id == target_id).values(score=target_model.score)
+        ).rowcount > 0
+    return db.session.execute(
+        db.select(target_model.id).where(target_model.id == target_id).with_for_update()
+    ).first() is not None
+
+def _apply_vote(vote_model, target_model, target_fk: str, target_id: int, user_id: int, value: int,
+                also_return=None):
+    """Toggle/replace a user's vote and shift the target's score in SQL.
+
+    The score is moved with `UPDATE ... SET score = score + :delta RETURNING score`
+    and the vote row is written with an upsert, all under a lock on the target
+    row, so concurrent votes (including a user's own double clicks) never lose
+    updates and no ORM objects are loaded. Returns (score, my_vote, extra, delta)
+    or None if the target does not exist; `extra` is the `also_return` column
+    (or a tuple for a tuple of columns) from the same RETURNING row (None if
+    not given), `delta` the change applied to the score. Caller commits.
+    """
+    # Lock the target before reading the previous vote: a user's first vote has
+    # no vote row to lock, and two concurrent first votes would both see old=0
+    if not _lock_target(target_model, target_id):
+        db.session.rollback()
+        return None
+    fk_col = getattr(vote_model, target_fk)
+    old = db.session.execute(
+        db.select(vote_model.value).where(vote_model.user_id == user_id, fk_col == target_id)
+    ).scalar()
+    old = old or 0
+    new = 0 if old == value else value
+
+    extras = list(also_return) if isinstance(also_return, tuple) else [also_return] if also_return is not None else []
+    updated = db.session.execute(
+        db.update(target_model)
+        .where(target_model.id == target_id)
+        .values(score=target_model.score + (new - old))
+        .returning(target_model.score, *extras)
+    ).first()
+    if updated is None:
+        db.session.rollback()
+        return None
+    score = updated[0]
+    extra = tuple(updated[1:]) if isinstance(also_return, tuple) else updated[1] if extras else None
+
+    if new == 0:
+        db.session.execute(
+            db.delete(vote_model).where(vote_model.user_id == user_id, fk_col == target_id)
+        )
+    else:
+        now = datetime.now(timezone.utc)
+        stmt = _upsert(vote_model).values(
+            user_id=user_id, value=new, created_at=now, updated_at=now, **{target_fk: target_id}
+        )
+        db.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["user_id", target_fk],
+                set_={"value": stmt.excluded.value, "updated_at": now},
+            )
+        )
+    return score, new, extra, new - old
 
-    if post is None:
-        return VotePostResult(success=False, reason="not_found")
+def vote_post(post_id: int, user_id: int, value: int) -> VotePostResult:
     if value not in [-1, 1]:
         return VotePostResult(success=False, reason="invalid_value")
 
-    post_vote = (
-        PostVote.query
-        .filter_by(user_id=user_id, post_id=post_id)
-        .first()
+    applied = _apply_vote(
+        PostVote, Post, "post_id", int(post_id), int(user_id), value,
+        also_return=(Post.comment_count, Post.date_posted),
     )
-    old = post_vote.value if post_vote else 0
-
-    if post_vote and post_vote.value == value:
-        db.session.delete(post_vote)
-        new = 0
-    else:
-        new = value
-        if post_vote is None:
-            post_vote = PostVote(user_id=user_id, post_id=post_id, value=value)
-            db.session.add(post_vote)
-        else:
-            post_vote.value = value
+    if applied is None:
+        return VotePostResult(success=False, reason="not_found")
 
-    post.score += (new - old)
+    score, new, (comment_count, date_posted), delta = applied
+    db.session.execute(
+        db.update(Post)
+        .where(Post.id == int(post_id))
+        .values(hot_rank=hot_rank(score, comment_count, date_posted))
+    )
+    record_post_votes({int(post_id): delta})
     db.session.commit()
-    return VotePostResult(success=True, reason="ok", score=post.score, my_vote=new)
+    invalidate_my_votes(user_id)
+    invalidate_feed_cache(VOTE_FEED_SORTS)
+    broadcast_throttled(post_id, "post_score_updated", {"thread_id": int(post_id), "score": score}, key=int(post_id))
+    return VotePostResult(success=True, reason="ok", score=score, my_vote=new)
 
 def vote_comment(comment_id: int, user_id: int, value: int) -> VoteCommentResult:
-    comment = db.session.get(Comment, int(comment_id))
-    if comment is None:
-        return VoteCommentResult(success=False, reason="not_found")
     if value not in [-1, 1]:
         return VoteCommentResult(success=False, reason="invalid_value")
-    comment_vote = (
-        CommentVote.query
-        .filter_by(user_id=user_id, comment_id=comment_id)
-        .first()
+
+    applied = _apply_vote(
+        CommentVote, Comment, "comment_id", int(comment_id), int(user_id), value, also_return=Comment.post_id
     )
-    old = comment_vote.value if comment_vote else 0
-    if comment_vote and comment_vote.value == value:
-        db.session.delete(comment_vote)
-        new = 0
-    else:
-        new = value
-        if comment_vote is None:
-            comment_vote = CommentVote(user_id=user_id, comment_id=comment_id, value=value)
-            db.session.add(comment_vote)
-        else:
-            comment_vote.value = value
-    comment.score += (new - old)
+    if applied is None:
+        return VoteCommentResult(success=False, reason="not_found")
+
     db.session.commit()
-    return VoteCommentResult(success=True, reason="ok", score=comment.score, my_vote=new)
\ No newline at end of file
+    invalidate_my_votes(user_id)
+    score, new, thread_id, _ = applied
+    broadcast_throttled(
+        thread_id, "comment_score_updated",
+        {"thread_id": thread_id, "comment_id": int(comment_id), "score": score},
+        key=int(comment_id),
+    )
+    return VoteCommentResult(success=True, reason="ok", score=score, my_vote=new)
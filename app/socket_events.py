@@ -2,6 +2,13 @@ from flask_login import current_user
 from flask_socketio import join_room, leave_room
 from . import socketio
 
+@socketio.on('connect')
+def on_connect(auth=None):
+    # personal room (avatar uploads etc.) and the changelog room
+    if current_user.is_authenticated:
+        join_room(f'user_{current_user.id}')
+    join_room('updates')
+
 @socketio.on('join_thread')
 def on_join_thread(data):
     thread_id = int(data.get('thread_id'))
@@ -0,0 +1,275 @@
+"""Background image uploads.
+
+Requests validate the file, store a placeholder and enqueue the bytes here;
+a small worker pool pushes them to Cloudinary (with retry + backoff), writes
+the final URL into the row and notifies open pages over Socket.IO.
+
+UPLOAD_QUEUE_MODE = "thread" (default) runs jobs in a thread pool (green
+threads under eventlet); "inline" runs them right away in the caller, which
+is what tests use together with a fake `uploader`.
+
+The bytes only live in process memory: if the worker dies before the upload
+finishes, the row keeps its placeholder. The clear_upload_placeholders
+periodic job (app.jobs) drops placeholders older than UPLOAD_PLACEHOLDER_TTL.
+"""
+from __future__ import annotations
+
+import io
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+
+import cloudinary.uploader
+from flask import current_app
+
+from app.extensions import db
+from app.models import Thread, Comment, Update, User
+
+CONTENT_TRANSFORMATION = [
+    {"quality": "auto:eco"},
+    {"fetch_format": "auto"},
+    {"width": 520, "height": 520, "crop": "limit"},
+]
+
+AVATAR_TRANSFORMATION = [
+    {"width": 256, "height": 256, "crop": "fill", "gravity": "auto"},
+    {"quality": "auto"},
+    {"fetch_format": "auto"},
+]
+
+# kind -> (model, column that receives the final URL)
+TARGETS = {
+    "thread": (Thread, "image_url"),
+    "comment": (Comment, "image_url"),
+    "update": (Update, "image_path"),
+    "avatar": (User, "avatar_url"),
+}
+
+# kinds stored with placeholder_url() until the upload lands -> row timestamp
+PLACEHOLDER_TARGETS = {
+    "thread": Thread.date_posted,
+    "comment": Comment.date_posted,
+    "update": Update.created_at,
+}
+
+
+@dataclass
+class UploadJob:
+    kind: str                 # key of TARGETS
+    target_id: int
+    data: bytes
+    filename: str
+    options: Dict[str, Any]   # passed to the uploader
+    room: Optional[str] = None  # Socket.IO room to notify
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def image_key(self) -> str:
+        """Matches data-image-key on the <img> that shows this upload."""
+        return f"{self.kind}-{self.target_id}"
+
+
+def cloudinary_upload(data: bytes, filename: str, options: Dict[str, Any]) -> str:
+    stream = io.BytesIO(data)
+    stream.name = filename
+    result = cloudinary.uploader.upload(stream, resource_type="image", **options)
+    return result["secure_url"]
+
+
+class UploadQueue:
+    def __init__(
+        self,
+        app,
+        uploader: Callable[[bytes, str, Dict[str, Any]], str] = cloudinary_upload,
+        mode: str = "thread",
+        workers: int = 2,
+        max_attempts: int = 3,
+        backoff: float = 1.0,
+    ):
+        self.app = app
+        self.uploader = uploader
+        self.mode = mode
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff = float(backoff)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload") if mode == "thread" else None
+
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._retries = 0
+        self._latencies = deque(maxlen=500)  # seconds, enqueue -> URL stored
+
+    def submit(self, job: UploadJob) -> None:
+        with self._lock:
+            self._queued += 1
+        if self._executor is None:
+            self._run(job)
+        else:
+            self._executor.submit(self._run, job)
+
+    def _run(self, job: UploadJob) -> None:
+        with self._lock:
+            self._queued -= 1
+            self._in_flight += 1
+        try:
+            with self.app.app_context():
+                url = self._upload_with_retry(job)
+                self._store(job, url)
+        except Exception:
+            self.app.logger.exception("Background upload crashed: %s", job.image_key)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _upload_with_retry(self, job: UploadJob) -> Optional[str]:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                url = self.uploader(job.data, job.filename, job.options)
+            except Exception:
+                current_app.logger.warning(
+                    "Upload %s failed (attempt %s/%s)", job.image_key, attempt, self.max_attempts, exc_info=True
+                )
+                if attempt < self.max_attempts:
+                    with self._lock:
+                        self._retries += 1
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+                continue
+
+            latency = time.monotonic() - job.enqueued_at
+            with self._lock:
+                self._completed += 1
+                self._latencies.append(latency)
+            current_app.logger.info("Upload %s done in %.0f ms", job.image_key, latency * 1000)
+            return url
+
+        with self._lock:
+            self._failed += 1
+        current_app.logger.error("Upload %s gave up after %s attempts", job.image_key, self.max_attempts)
+        return None
+
+    def _store(self, job: UploadJob, url: Optional[str]) -> None:
+        model, column = TARGETS[job.kind]
+        col = getattr(model, column)
+        if url is not None:
+            stmt = db.update(model).where(model.id == job.target_id).values({column: url})
+        else:
+            # drop the placeholder, keep whatever else is there (e.g. an old avatar)
+            stmt = (
+                db.update(model)
+                .where(model.id == job.target_id, col == placeholder_url())
+                .values({column: None})
+            )
+        db.session.execute(stmt)
+        db.session.commit()
+
+        if job.kind in ("thread", "comment"):
+            from app.cache import invalidate_feed_cache
+            invalidate_feed_cache()
+        elif job.kind == "avatar":
+            from app.identity import invalidate_user
+            invalidate_user(job.target_id)
+
+        if job.room:
+            from app import socketio
+            socketio.emit(
+                "image_uploaded",
+                {"key": job.image_key, "url": url, "ok": url is not None},
+                to=job.room,
+            )
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "queue_depth": self._queued,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "retries": self._retries,
+            }
+
+        def pct(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        stats["latency_ms"] = {"p50": pct(0.50), "p95": pct(0.95), "max": pct(1.0)}
+        return stats
+
+
+def init_upload_queue(app) -> None:
+    if "upload_queue" not in app.extensions:
+        app.extensions["upload_queue"] = UploadQueue(
+            app,
+            mode=app.config.get("UPLOAD_QUEUE_MODE", "thread"),
+            workers=int(app.config.get("UPLOAD_QUEUE_WORKERS", 2)),
+            max_attempts=int(app.config.get("UPLOAD_MAX_ATTEMPTS", 3)),
+            backoff=float(app.config.get("UPLOAD_RETRY_BACKOFF", 1.0)),
+        )
+
+
+def upload_queue() -> UploadQueue:
+    return current_app.extensions["upload_queue"]
+
+
+def placeholder_url() -> str:
+    return current_app.config.get("UPLOAD_PLACEHOLDER_URL", "/static/uploading.svg")
+
+
+def clear_stale_placeholders(max_age: float) -> Dict[str, int]:
+    """Drop placeholders of uploads that never finished (the process died with
+    the bytes in memory); returns the number of cleared rows per kind."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age)
+    cleared = {}
+    for kind, created_at in PLACEHOLDER_TARGETS.items():
+        model, column = TARGETS[kind]
+        col = getattr(model, column)
+        cleared[kind] = db.session.execute(
+            db.update(model)
+            .where(col == placeholder_url(), created_at < cutoff)
+            .values({column: None})
+            .execution_options(synchronize_session=False)
+        ).rowcount or 0
+    db.session.commit()
+    if cleared["thread"] or cleared["comment"]:
+        from app.cache import invalidate_feed_cache
+        invalidate_feed_cache()
+    return cleared
+
+
+def content_upload_options(folder: str) -> Dict[str, Any]:
+    return {
+        "folder": folder,
+        "overwrite": False,
+        "unique_filename": True,
+        "transformation": CONTENT_TRANSFORMATION,
+    }
+
+
+def avatar_upload_options(user_id: int) -> Dict[str, Any]:
+    return {
+        "public_id": f"avatar_{int(user_id)}",
+        "overwrite": True,
+        "invalidate": True,
+        "transformation": AVATAR_TRANSFORMATION,
+    }
+
+
+def enqueue_upload(file, *, kind: str, target_id: int, options: Dict[str, Any], room: Optional[str] = None) -> None:
+    """Read the (already validated) file into memory and hand it to the queue."""
+    file.stream.seek(0)
+    data = file.stream.read()
+    upload_queue().submit(UploadJob(
+        kind=kind,
+        target_id=int(target_id),
+        data=data,
+        filename=getattr(file, "filename", "") or "upload",
+        options=options,
+        room=room,
+    ))
@@ -58,4 +58,60 @@ class Config:
     )
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    AUTO_CREATE_DB = os.environ.get("AUTO_CREATE_DB", "0") == "1"
\ No newline at end of file
+    AUTO_CREATE_DB = os.environ.get("AUTO_CREATE_DB", "0") == "1"
+
+    # Per-process LRU of users' vote states (0 = cache per request only)
+    MY_VOTES_CACHE_SIZE = int(os.environ.get("MY_VOTES_CACHE_SIZE", "0"))
+
+    # Shared cache for rendered /threads pages: "memory://" or "redis://host:6379/0"
+    FEED_CACHE_ENABLED = os.environ.get("FEED_CACHE_ENABLED", "1") == "1"
+    FEED_CACHE_URL = os.environ.get("FEED_CACHE_URL", "memory://")
+    FEED_CACHE_TTL = int(os.environ.get("FEED_CACHE_TTL", "30"))
+    FEED_CACHE_MAX_ENTRIES = int(os.environ.get("FEED_CACHE_MAX_ENTRIES", "256"))
+
+    # Background image uploads: "thread" (worker pool) or "inline" (tests)
+    UPLOAD_QUEUE_MODE = os.environ.get("UPLOAD_QUEUE_MODE", "thread")
+    UPLOAD_QUEUE_WORKERS = int(os.environ.get("UPLOAD_QUEUE_WORKERS", "2"))
+    UPLOAD_MAX_ATTEMPTS = int(os.environ.get("UPLOAD_MAX_ATTEMPTS", "3"))
+    UPLOAD_RETRY_BACKOFF = float(os.environ.get("UPLOAD_RETRY_BACKOFF", "1.0"))
+    UPLOAD_PLACEHOLDER_URL = "/static/uploading.svg"
+    # placeholders older than this (s) belong to uploads lost with their worker;
+    # cleared every UPLOAD_PLACEHOLDER_SWEEP_INTERVAL seconds (0 = off)
+    UPLOAD_PLACEHOLDER_TTL = int(os.environ.get("UPLOAD_PLACEHOLDER_TTL", "3600"))
+    UPLOAD_PLACEHOLDER_SWEEP_INTERVAL = int(os.environ.get("UPLOAD_PLACEHOLDER_SWEEP_INTERVAL", "3600"))
+
+    # Coalescing window for score updates pushed over Socket.IO (0 = emit each one)
+    REALTIME_THROTTLE_MS = int(os.environ.get("REALTIME_THROTTLE_MS", "500"))
+
+    # Admin deletes run in chunks of this many ids, one transaction each
+    DELETE_CHUNK_SIZE = int(os.environ.get("DELETE_CHUNK_SIZE", "1000"))
+    # Background admin jobs: "thread" (worker pool) or "inline" (tests)
+    JOB_QUEUE_MODE = os.environ.get("JOB_QUEUE_MODE", "thread")
+    JOB_QUEUE_WORKERS = int(os.environ.get("JOB_QUEUE_WORKERS", "1"))
+    # a running job without progress for this long is picked up again at startup
+    JOB_STALE_SECONDS = int(os.environ.get("JOB_STALE_SECONDS", "300"))
+
+    # Recompute post.score / comment_count / hot_rank, comment.score and
+    # user.thread_count / comment_count every N seconds (0 = off)
+    COUNTER_RECONCILE_INTERVAL = int(os.environ.get("COUNTER_RECONCILE_INTERVAL", "21600"))
+    COUNTER_RECONCILE_CHUNK = int(os.environ.get("COUNTER_RECONCILE_CHUNK", "5000"))
+    # Fold vote buckets and rebuild the day/week/month top feeds every N seconds (0 = off)
+    VOTE_ROLLUP_INTERVAL = int(os.environ.get("VOTE_ROLLUP_INTERVAL", "3600"))
+    # finished scheduled jobs are pruned after this many days
+    PERIODIC_JOB_RETENTION_DAYS = int(os.environ.get("PERIODIC_JOB_RETENTION_DAYS", "7"))
+
+    # Socket.IO fan-out between workers/nodes: "" (single process),
+    # "redis://host:6379/0", "amqp://..." (Kombu) or "memory://" (in-process)
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get("SOCKETIO_MESSAGE_QUEUE", "")
+    SOCKETIO_CHANNEL = os.environ.get("SOCKETIO_CHANNEL", "flask-socketio")
+    # Without sticky sessions the client must skip the long-polling transport
+    SOCKETIO_WEBSOCKET_ONLY = os.environ.get("SOCKETIO_WEBSOCKET_ONLY", "0") == "1"
+
+    # Per-process TTL + LRU of logged-in user snapshots (0 = query every request)
+    USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "2048"))
+    USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", "60"))
+
+    # Per-request SQL stats: Server-Timing header + one log line per request
+    QUERY_STATS_ENABLED = os.environ.get("QUERY_STATS_ENABLED", "0") == "1"
+    QUERY_STATS_N_PLUS_ONE = int(os.environ.get("QUERY_STATS_N_PLUS_ONE", "5"))  # same shape more than N times
+    QUERY_STATS_SLOWEST = int(os.environ.get("QUERY_STATS_SLOWEST", "3"))
@@ -0,0 +1,8 @@
+"""gunicorn reads this file from the working directory (start.sh, Procfile, Dockerfile)."""
+
+
+def post_worker_init(worker):
+    # admins are promoted and admin jobs resumed and scheduled by web workers only, never by `flask ...` commands
+    from app.jobs import start_background_jobs
+
+    start_background_jobs(worker.wsgi)
@@ -0,0 +1,68 @@
+"""add post.content_preview / content_has_more for the feed cards
+
+Revision ID: 0b5d9e2f7a14
+Revises: f3a8c6e1b207
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b5d9e2f7a14'
+down_revision = 'f3a8c6e1b207'
+branch_labels = None
+depends_on = None
+
+# frozen copy of app.services.content_preview at the time of this migration
+PREVIEW_LEN = 220
+BATCH = 1000
+
+post = sa.table(
+    'post',
+    sa.column('id', sa.Integer),
+    sa.column('content', sa.Text),
+    sa.column('content_preview', sa.String),
+    sa.column('content_has_more', sa.Boolean),
+)
+
+
+def _preview(content):
+    text = (content or '').replace('\r\n', '\n').lstrip()
+    return text[:PREVIEW_LEN], len(text) > PREVIEW_LEN
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = {c['name'] for c in sa.inspect(bind).get_columns('post')}
+    # AUTO_CREATE_DB databases already got the columns from db.create_all()
+    if 'content_preview' not in columns:
+        op.add_column('post', sa.Column('content_preview', sa.String(length=256), nullable=False, server_default=''))
+    if 'content_has_more' not in columns:
+        op.add_column('post', sa.Column('content_has_more', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+    # backfill in id batches; the preview rule lives in Python, not SQL
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(post.c.id, post.c.content).where(post.c.id > last_id).order_by(post.c.id).limit(BATCH)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            preview, has_more = _preview(row.content)
+            updates.append({'row_id': row.id, 'preview': preview, 'has_more': has_more})
+        bind.execute(
+            post.update()
+            .where(post.c.id == sa.bindparam('row_id'))
+            .values(content_preview=sa.bindparam('preview'), content_has_more=sa.bindparam('has_more')),
+            updates,
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    op.drop_column('post', 'content_has_more')
+    op.drop_column('post', 'content_preview')
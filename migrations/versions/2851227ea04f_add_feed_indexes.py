@@ -0,0 +1,54 @@
+"""add composite indexes for feed sorts and per-user queries
+
+Revision ID: 2851227ea04f
+Revises: d339a62ffea9
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2851227ea04f'
+down_revision = 'd339a62ffea9'
+branch_labels = None
+depends_on = None
+
+
+# name -> (table, columns); keep in sync with __table_args__ in app/models.py
+INDEXES = {
+    'ix_post_score_date_posted': ('post', ['score DESC', 'date_posted DESC', 'id DESC']),
+    'ix_post_comment_count_date_posted': ('post', ['comment_count DESC', 'date_posted DESC', 'id DESC']),
+    'ix_post_date_posted': ('post', ['date_posted DESC', 'id DESC']),
+    'ix_post_user_id_date_posted': ('post', ['user_id', 'date_posted DESC']),
+    'ix_comment_post_id_parent_id_date_posted': ('comment', ['post_id', 'parent_id', 'date_posted']),
+}
+
+
+def _has_index(bind, table_name: str, index_name: str) -> bool:
+    # AUTO_CREATE_DB databases already got these indexes from db.create_all()
+    return any(ix['name'] == index_name for ix in sa.inspect(bind).get_indexes(table_name))
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    for name, (table, columns) in INDEXES.items():
+        if not _has_index(bind, table, name):
+            op.create_index(name, table, [sa.text(c) for c in columns], unique=False)
+
+    # refresh planner statistics so the new indexes are picked up right away
+    if bind.dialect.name == 'postgresql':
+        op.execute('ANALYZE post')
+        op.execute('ANALYZE comment')
+    elif bind.dialect.name == 'sqlite':
+        op.execute('ANALYZE')
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    for name, (table, _columns) in reversed(list(INDEXES.items())):
+        if _has_index(bind, table, name):
+            op.drop_index(name, table_name=table)
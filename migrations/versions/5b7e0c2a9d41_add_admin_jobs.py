@@ -0,0 +1,45 @@
+"""add admin_jobs table for background admin operations
+
+Revision ID: 5b7e0c2a9d41
+Revises: 2851227ea04f
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e0c2a9d41'
+down_revision = '2851227ea04f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # AUTO_CREATE_DB databases already got the table from db.create_all()
+    if sa.inspect(op.get_bind()).has_table('admin_jobs'):
+        return
+
+    op.create_table(
+        'admin_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column('params', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('done', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('summary', sa.String(length=256), nullable=True),
+        sa.Column('error', sa.String(length=512), nullable=True),
+        sa.Column('actor_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_admin_jobs_status_updated_at', 'admin_jobs', ['status', 'updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_admin_jobs_status_updated_at', table_name='admin_jobs')
+    op.drop_table('admin_jobs')
@@ -0,0 +1,42 @@
+"""add content_html / content_html_version to post, comment and updates
+
+Revision ID: 5c1e8a3d9f26
+Revises: 0b5d9e2f7a14
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e8a3d9f26'
+down_revision = '0b5d9e2f7a14'
+branch_labels = None
+depends_on = None
+
+# no backfill here: NULL versions are picked up by the rerender_content job,
+# which create_app enqueues on the next start
+TABLES = {
+    'post': ('content_html', 'content_preview_html', 'content_html_version'),
+    'comment': ('content_html', 'content_html_version'),
+    'updates': ('content_html', 'content_html_version'),
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, names in TABLES.items():
+        # AUTO_CREATE_DB databases already got the columns from db.create_all()
+        existing = {c['name'] for c in inspector.get_columns(table)}
+        for name in names:
+            if name in existing:
+                continue
+            type_ = sa.SmallInteger() if name == 'content_html_version' else sa.Text()
+            op.add_column(table, sa.Column(name, type_, nullable=True))
+
+
+def downgrade():
+    for table, names in TABLES.items():
+        for name in reversed(names):
+            op.drop_column(table, name)
@@ -0,0 +1,30 @@
+"""add lower(username) index for admin user search
+
+Revision ID: 8c1f4d7b2e90
+Revises: 5b7e0c2a9d41
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1f4d7b2e90'
+down_revision = '5b7e0c2a9d41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    # AUTO_CREATE_DB databases already got the index from db.create_all()
+    if any(ix['name'] == 'ix_user_username_lower' for ix in sa.inspect(bind).get_indexes('user')):
+        return
+
+    ops = ' text_pattern_ops' if bind.dialect.name == 'postgresql' else ''
+    op.create_index('ix_user_username_lower', 'user', [sa.text(f'lower(username){ops}')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_user_username_lower', table_name='user')
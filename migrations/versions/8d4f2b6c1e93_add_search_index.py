@@ -0,0 +1,73 @@
+"""add full-text search: FTS5 tables on SQLite, tsvector + GIN on Postgres
+
+Revision ID: 8d4f2b6c1e93
+Revises: 5c1e8a3d9f26
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4f2b6c1e93'
+down_revision = '5c1e8a3d9f26'
+branch_labels = None
+depends_on = None
+
+# frozen copy of app.search.SCHEMA at the time of this migration
+TOKENIZE = "tokenize='unicode61 remove_diacritics 2'"
+FTS_TABLES = {'post': ('title', 'content'), 'comment': ('content',)}
+
+
+def _sqlite_upgrade():
+    for table, columns in FTS_TABLES.items():
+        fts = f'{table}_fts'
+        cols = ', '.join(columns)
+        new = ', '.join(f'new.{c}' for c in columns)
+        old = ', '.join(f'old.{c}' for c in columns)
+        delete = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+        insert = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});"
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{cols}, content='{table}', content_rowid='id', {TOKENIZE})"
+        )
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN {delete} {insert} END")
+        # index the rows that are already there
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _postgres_upgrade():
+    vectors = {
+        'post': "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('russian', coalesce(content, '')), 'B')",
+        'comment': "to_tsvector('russian', coalesce(content, ''))",
+    }
+    for table, expression in vectors.items():
+        # a stored generated column: filled for existing rows by this ALTER (a table rewrite)
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({expression}) STORED"
+        )
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING gin (search_vector)")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _sqlite_upgrade()
+    elif dialect == 'postgresql':
+        _postgres_upgrade()
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in FTS_TABLES:
+        if dialect == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {table}_fts")
+        elif dialect == 'postgresql':
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_vector")
+            op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
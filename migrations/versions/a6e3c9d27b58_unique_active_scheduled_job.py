@@ -0,0 +1,38 @@
+"""one queued/running scheduled admin job per kind
+
+Revision ID: a6e3c9d27b58
+Revises: 8d4f2b6c1e93
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6e3c9d27b58'
+down_revision = '8d4f2b6c1e93'
+branch_labels = None
+depends_on = None
+
+ACTIVE = "actor_id IS NULL AND status IN ('queued', 'running')"
+
+
+def upgrade():
+    indexes = {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes('admin_jobs')}
+    # AUTO_CREATE_DB databases already got the index from db.create_all()
+    if 'uq_admin_jobs_scheduled_active' in indexes:
+        return
+    # duplicates enqueued by several workers before this index: keep the oldest
+    op.execute(
+        "UPDATE admin_jobs SET status = 'failed', error = 'duplicate scheduled job' "
+        f"WHERE {ACTIVE} AND id NOT IN (SELECT min(id) FROM admin_jobs WHERE {ACTIVE} GROUP BY kind)"
+    )
+    op.create_index(
+        'uq_admin_jobs_scheduled_active', 'admin_jobs', ['kind'], unique=True,
+        sqlite_where=sa.text(ACTIVE), postgresql_where=sa.text(ACTIVE),
+    )
+
+
+def downgrade():
+    op.drop_index('uq_admin_jobs_scheduled_active', table_name='admin_jobs')
@@ -0,0 +1,66 @@
+"""store user.username_lower for the admin prefix search
+
+lower(username) folds only ASCII on SQLite, so usernames with uppercase
+Cyrillic were unreachable there. The folded value is now computed in Python
+and indexed as a plain column.
+
+Revision ID: b2f7d4e8c190
+Revises: a6e3c9d27b58
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2f7d4e8c190'
+down_revision = 'a6e3c9d27b58'
+branch_labels = None
+depends_on = None
+
+BATCH = 1000
+
+user = sa.table(
+    'user',
+    sa.column('id', sa.Integer),
+    sa.column('username', sa.String),
+    sa.column('username_lower', sa.String),
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    # AUTO_CREATE_DB databases already got the column and index from db.create_all()
+    if 'username_lower' in {c['name'] for c in sa.inspect(bind).get_columns('user')}:
+        return
+
+    op.drop_index('ix_user_username_lower', table_name='user')
+    op.add_column('user', sa.Column('username_lower', sa.String(length=64), nullable=True))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(user.c.id, user.c.username).where(user.c.id > last_id).order_by(user.c.id).limit(BATCH)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            user.update().where(user.c.id == sa.bindparam('row_id')).values(username_lower=sa.bindparam('folded')),
+            [{'row_id': row.id, 'folded': row.username.lower()} for row in rows],
+        )
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('username_lower', existing_type=sa.String(length=64), nullable=False)
+    op.create_index(
+        'ix_user_username_lower', 'user', ['username_lower'], unique=False,
+        postgresql_ops={'username_lower': 'text_pattern_ops'},
+    )
+
+
+def downgrade():
+    op.drop_index('ix_user_username_lower', table_name='user')
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('username_lower')
+    ops = ' text_pattern_ops' if op.get_bind().dialect.name == 'postgresql' else ''
+    op.create_index('ix_user_username_lower', 'user', [sa.text(f'lower(username){ops}')], unique=False)
@@ -0,0 +1,31 @@
+"""add post.hot_rank and its index for the hot feed
+
+Revision ID: c4a9e3f5b612
+Revises: 8c1f4d7b2e90
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a9e3f5b612'
+down_revision = '8c1f4d7b2e90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    # AUTO_CREATE_DB databases already got both from db.create_all()
+    if not any(c['name'] == 'hot_rank' for c in inspector.get_columns('post')):
+        # existing threads start at 0; `flask reconcile-counters` fills in the real ranks
+        op.add_column('post', sa.Column('hot_rank', sa.Float(), nullable=False, server_default='0'))
+    if not any(ix['name'] == 'ix_post_hot_rank' for ix in inspector.get_indexes('post')):
+        op.create_index('ix_post_hot_rank', 'post', [sa.text('hot_rank DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_post_hot_rank', table_name='post')
+    op.drop_column('post', 'hot_rank')
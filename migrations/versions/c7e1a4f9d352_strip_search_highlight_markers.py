@@ -0,0 +1,154 @@
+"""strip the search highlight markers from thread and comment text
+
+app.search wraps matches in \\x02 / \\x03 and swaps them for <mark> after
+escaping, so the same characters typed by a user produced stray <mark> tags
+in search results. The services now strip them on write; this cleans the
+rows written before and re-renders their HTML with a frozen copy of the
+version 1 renderer: the scheduled rerender_content job only runs once per
+RENDERER_VERSION, so rows left without HTML would never be rendered again.
+
+Revision ID: c7e1a4f9d352
+Revises: b2f7d4e8c190
+Create Date: 2026-10-17
+
+"""
+import re
+
+from alembic import op
+from markupsafe import Markup, escape
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e1a4f9d352'
+down_revision = 'b2f7d4e8c190'
+branch_labels = None
+depends_on = None
+
+BATCH = 1000
+MARKERS = ('\x02', '\x03')
+STRIP = str.maketrans('', '', ''.join(MARKERS))
+# frozen copy of app.services.content_preview
+PREVIEW_LEN = 220
+# frozen copy of app.rendering at RENDERER_VERSION 1
+RENDERER_VERSION = 1
+URL_RE = re.compile(r'(?P<url>https?://[^\s]+)', re.IGNORECASE)
+MENTION_RE = re.compile(r'@([a-zA-Z0-9_]{1,64})')
+
+post = sa.table(
+    'post',
+    sa.column('id', sa.Integer),
+    sa.column('title', sa.String),
+    sa.column('content', sa.Text),
+    sa.column('content_preview', sa.String),
+    sa.column('content_has_more', sa.Boolean),
+    sa.column('content_html', sa.Text),
+    sa.column('content_preview_html', sa.Text),
+    sa.column('content_html_version', sa.SmallInteger),
+)
+
+comment = sa.table(
+    'comment',
+    sa.column('id', sa.Integer),
+    sa.column('content', sa.Text),
+    sa.column('content_html', sa.Text),
+    sa.column('content_html_version', sa.SmallInteger),
+)
+
+
+def _preview(content):
+    text = (content or '').replace('\r\n', '\n').lstrip()
+    return text[:PREVIEW_LEN], len(text) > PREVIEW_LEN
+
+
+def _render_links(text):
+    if not text:
+        return ''
+    s = escape(text)
+
+    def repl(m):
+        url = m.group('url')
+        href = url if url.lower().startswith(('http://', 'https://')) else f'https://{url}'
+        return Markup(f'<a href="{href}" target="_blank" rel="nofollow noopener noreferrer">{url}</a>')
+
+    return str(Markup(URL_RE.sub(repl, s)).replace('\n', Markup('<br>')))
+
+
+def _urls_to_links(text_part):
+    def url_repl(m):
+        url = m.group('url')
+        return Markup(f'<a href="{url}" target="_blank" rel="nofollow noopener noreferrer">{escape(url)}</a>')
+    return Markup(URL_RE.sub(url_repl, escape(text_part)))
+
+
+def _render_mentions(text):
+    if not text:
+        return ''
+    parts = []
+    last_end = 0
+    for match in MENTION_RE.finditer(text):
+        if match.start() > last_end:
+            parts.append(_urls_to_links(text[last_end:match.start()]))
+        username = match.group(1)
+        parts.append(Markup(f'<a href="/user/{username}" class="mention">@{escape(username)}</a>'))
+        last_end = match.end()
+    if last_end < len(text):
+        parts.append(_urls_to_links(text[last_end:]))
+    return str(Markup(''.join(parts)).replace('\n', Markup('<br>')))
+
+
+def _clean(value):
+    return value.translate(STRIP) if value is not None else None
+
+
+def _marked(*columns):
+    return sa.or_(*(column.contains(marker) for column in columns for marker in MARKERS))
+
+
+def _post_values(row):
+    content = _clean(row.content)
+    preview, has_more = _preview(content)
+    return {
+        'title': _clean(row.title), 'content': content,
+        'content_preview': preview, 'content_has_more': has_more,
+        'content_html': _render_links(content), 'content_preview_html': _render_links(preview),
+        'content_html_version': RENDERER_VERSION,
+    }
+
+
+def _comment_values(row):
+    content = _clean(row.content)
+    return {
+        'content': content,
+        'content_html': _render_mentions(content), 'content_html_version': RENDERER_VERSION,
+    }
+
+
+def _strip_table(bind, table, columns, values):
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, *columns)
+            .where(table.c.id > last_id, _marked(*columns))
+            .order_by(table.c.id).limit(BATCH)
+        ).all()
+        if not rows:
+            break
+        changes = [values(row) for row in rows]
+        bind.execute(
+            table.update().where(table.c.id == sa.bindparam('row_id'))
+            .values({key: sa.bindparam(f'new_{key}') for key in changes[0]}),
+            [{'row_id': row.id, **{f'new_{k}': v for k, v in c.items()}} for row, c in zip(rows, changes)],
+        )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    bind = op.get_bind()
+    _strip_table(bind, post, [post.c.title, post.c.content], _post_values)
+    _strip_table(bind, comment, [comment.c.content], _comment_values)
+
+
+def downgrade():
+    # the stripped characters are not kept anywhere
+    pass
@@ -0,0 +1,37 @@
+"""index user.thread_count / comment_count for the admin list sorts
+
+The "threads" / "comments" sorts of /admin/users read the denormalized
+counters instead of aggregating post and comment on every page.
+
+Revision ID: d4b8f2a6e013
+Revises: c7e1a4f9d352
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4b8f2a6e013'
+down_revision = 'c7e1a4f9d352'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_user_thread_count_id': 'thread_count',
+    'ix_user_comment_count_id': 'comment_count',
+}
+
+
+def upgrade():
+    # AUTO_CREATE_DB databases already got the indexes from db.create_all()
+    existing = {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes('user')}
+    for name, column in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'user', [sa.text(f'{column} DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name='user')
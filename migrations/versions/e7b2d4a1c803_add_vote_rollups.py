@@ -0,0 +1,54 @@
+"""add post_vote_rollups and post_period_scores for the day/week/month top feeds
+
+Revision ID: e7b2d4a1c803
+Revises: c4a9e3f5b612
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b2d4a1c803'
+down_revision = 'c4a9e3f5b612'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    # AUTO_CREATE_DB databases already got the tables from db.create_all();
+    # `flask rebuild-vote-rollups` fills them from the existing votes
+    if not inspector.has_table('post_vote_rollups'):
+        op.create_table(
+            'post_vote_rollups',
+            sa.Column('post_id', sa.Integer(), nullable=False),
+            sa.Column('bucket_hours', sa.SmallInteger(), nullable=False),
+            sa.Column('bucket_start', sa.DateTime(), nullable=False),
+            sa.Column('delta', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['post_id'], ['post.id']),
+            sa.PrimaryKeyConstraint('post_id', 'bucket_hours', 'bucket_start'),
+        )
+        op.create_index('ix_post_vote_rollups_bucket', 'post_vote_rollups', ['bucket_hours', 'bucket_start'], unique=False)
+
+    if not inspector.has_table('post_period_scores'):
+        op.create_table(
+            'post_period_scores',
+            sa.Column('period', sa.String(length=8), nullable=False),
+            sa.Column('post_id', sa.Integer(), nullable=False),
+            sa.Column('score', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['post_id'], ['post.id']),
+            sa.PrimaryKeyConstraint('period', 'post_id'),
+        )
+        op.create_index(
+            'ix_post_period_scores_rank', 'post_period_scores',
+            ['period', sa.text('score DESC'), sa.text('post_id DESC')], unique=False,
+        )
+
+
+def downgrade():
+    op.drop_index('ix_post_period_scores_rank', table_name='post_period_scores')
+    op.drop_table('post_period_scores')
+    op.drop_index('ix_post_vote_rollups_bucket', table_name='post_vote_rollups')
+    op.drop_table('post_vote_rollups')
@@ -0,0 +1,47 @@
+"""add user.thread_count / comment_count and the (user_id, date_posted, id) profile index
+
+Revision ID: f3a8c6e1b207
+Revises: e7b2d4a1c803
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c6e1b207'
+down_revision = 'e7b2d4a1c803'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    # AUTO_CREATE_DB databases already got the columns and index from db.create_all()
+    columns = {c['name'] for c in inspector.get_columns('user')}
+    for name in ('thread_count', 'comment_count'):
+        if name not in columns:
+            op.add_column('user', sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+    op.execute(
+        'UPDATE "user" SET '
+        'thread_count = (SELECT count(*) FROM post WHERE post.user_id = "user".id), '
+        'comment_count = (SELECT count(*) FROM comment WHERE comment.user_id = "user".id)'
+    )
+
+    indexes = {ix['name'] for ix in inspector.get_indexes('post')}
+    # keyset pagination of a profile needs id as the tiebreaker
+    if 'ix_post_user_id_date_posted_id' not in indexes:
+        op.create_index(
+            'ix_post_user_id_date_posted_id', 'post',
+            ['user_id', sa.text('date_posted DESC'), sa.text('id DESC')], unique=False,
+        )
+    if 'ix_post_user_id_date_posted' in indexes:
+        op.drop_index('ix_post_user_id_date_posted', table_name='post')
+
+
+def downgrade():
+    op.create_index('ix_post_user_id_date_posted', 'post', ['user_id', sa.text('date_posted DESC')], unique=False)
+    op.drop_index('ix_post_user_id_date_posted_id', table_name='post')
+    op.drop_column('user', 'comment_count')
+    op.drop_column('user', 'thread_count')
@@ -31,4 +31,6 @@ def make_shell_context():
 
 if __name__ == "__main__":
     # Для локального запуска python run.py (не хостинг)
+    from app.jobs import start_background_jobs
+    start_background_jobs(app)
     socketio.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "5000")), debug=debug_mode)
\ No newline at end of file
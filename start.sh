@@ -11,4 +11,4 @@ export SOCKETIO_ASYNC_MODE="${SOCKETIO_ASYNC_MODE:-eventlet}"
 python -m flask --app run:app db upgrade
 
 # запуск
-exec gunicorn -k eventlet -w 1 -b 0.0.0.0:${PORT:-8000} --timeout 120 run:app
\ No newline at end of file
+exec gunicorn -k eventlet -w ${WEB_CONCURRENCY:-1} -b 0.0.0.0:${PORT:-8000} --timeout 120 run:app
\ No newline at end of file
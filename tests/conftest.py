@@ -1,3 +1,5 @@
+from contextlib import contextmanager
+
 import pytest
 
 from app import create_app
@@ -9,9 +11,14 @@ from werkzeug.security import generate_password_hash
 
 class TestConfig(Config):
     TESTING = True
+    SECRET_KEY = "test-secret-key"
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     WTF_CSRF_ENABLED = False
+    UPLOAD_QUEUE_MODE = "inline"
+    JOB_QUEUE_MODE = "inline"
+    UPLOAD_RETRY_BACKOFF = 0
+    REALTIME_THROTTLE_MS = 0
 
 
 @pytest.fixture
@@ -44,4 +51,19 @@ def user_id(app):
         db.session.commit()
 
         uid = u.id  # сохранить до выхода из контекста/сессии
-        return uid
\ No newline at end of file
+        return uid
+
+
+@pytest.fixture
+def query_budget():
+    """`with query_budget(5): client.get(...)` fails if more than 5 queries run."""
+    from app.query_stats import count_queries
+
+    @contextmanager
+    def budget(max_queries: int, n_plus_one_threshold: int = 5):
+        with count_queries(n_plus_one_threshold) as stats:
+            yield stats
+        assert stats.count <= max_queries, f"query budget {max_queries} exceeded:\n{stats.report()}"
+        assert not stats.repeated(), f"N+1 pattern:\n{stats.report()}"
+
+    return budget
@@ -23,6 +23,25 @@ def test_ensure_admin_flag_promotes_user(app):
         assert refreshed.is_admin is True
 
 
+def test_promote_configured_admins_is_one_bulk_update(app):
+    from app.services import promote_configured_admins
+
+    with app.app_context():
+        app.config["ADMIN_USERNAMES"] = {"admin", "boss", "ghost"}
+        db.session.add_all([
+            User(username="admin", password_hash=generate_password_hash("x")),
+            User(username="boss", is_admin=True, password_hash=generate_password_hash("x")),
+            User(username="someone", password_hash=generate_password_hash("x")),
+        ])
+        db.session.commit()
+
+        assert promote_configured_admins() == 1
+        assert promote_configured_admins() == 0
+        db.session.expire_all()
+        admins = {u.username for u in User.query.filter_by(is_admin=True)}
+        assert admins == {"admin", "boss"}
+
+
 def test_admin_delete_user_removes_posts(app):
     from app.services import admin_delete_user
 
@@ -37,9 +56,10 @@ def test_admin_delete_user_removes_posts(app):
             Post(title="b", content="2", user_id=victim.id),
         ])
         db.session.commit()
+        victim_id = victim.id
 
         res = admin_delete_user(
-            target_user_id=victim.id,
+            target_user_id=victim_id,
             actor_user_id=admin.id,
             actor_is_admin=True,
         )
@@ -47,8 +67,8 @@ def test_admin_delete_user_removes_posts(app):
         assert res.deleted is True
         assert res.reason == "ok"
         db.session.expire_all()
-        assert db.session.get(User, victim.id) is None
-        assert Post.query.filter_by(user_id=victim.id).count() == 0
+        assert db.session.get(User, victim_id) is None
+        assert Post.query.filter_by(user_id=victim_id).count() == 0
 
 
 def test_admin_bulk_delete_users_skips_actor(app):
@@ -60,18 +80,271 @@ def test_admin_bulk_delete_users_skips_actor(app):
         u2 = User(username="u2", password_hash=generate_password_hash("x"))
         db.session.add_all([admin, u1, u2])
         db.session.commit()
+        admin_id, u1_id, u2_id = admin.id, u1.id, u2.id
 
         res = admin_bulk_delete_users(
-            target_user_ids=[admin.id, u1.id, u2.id],
-            actor_user_id=admin.id,
+            target_user_ids=[admin_id, u1_id, u2_id],
+            actor_user_id=admin_id,
             actor_is_admin=True,
         )
 
         assert res.deleted is True
         assert res.reason == "ok"
+        assert res.deleted_count == 2
         db.session.expire_all()
         # actor жив
-        assert db.session.get(User, admin.id) is not None
+        assert db.session.get(User, admin_id) is not None
         # остальные удалены
-        assert db.session.get(User, u1.id) is None
-        assert db.session.get(User, u2.id) is None
+        assert db.session.get(User, u1_id) is None
+        assert db.session.get(User, u2_id) is None
+
+
+def _fk_violations():
+    return db.session.execute(db.text("PRAGMA foreign_key_check")).all()
+
+
+def test_admin_delete_user_cascades_and_recounts(app):
+    from app.models import Comment, PostVote, CommentVote, Update
+    from app.services import admin_delete_user
+
+    with app.app_context():
+        app.config["DELETE_CHUNK_SIZE"] = 2
+        admin = User(username="root", is_admin=True, password_hash="x")
+        victim = User(username="victim", password_hash="x")
+        other = User(username="other", password_hash="x")
+        db.session.add_all([admin, victim, other])
+        db.session.commit()
+
+        own = Post(title="own", content="x", user_id=victim.id, comment_count=1)
+        kept = Post(title="kept", content="x", user_id=other.id, comment_count=4, score=2)
+        db.session.add_all([own, kept])
+        db.session.commit()
+
+        on_own = Comment(content="on own", user_id=other.id, post_id=own.id)
+        mine = Comment(content="mine", user_id=victim.id, post_id=kept.id)
+        theirs = Comment(content="theirs", user_id=other.id, post_id=kept.id, score=1)
+        db.session.add_all([on_own, mine, theirs])
+        db.session.commit()
+        # a reply under the victim's comment and a reply addressed to the victim
+        reply = Comment(content="reply", user_id=other.id, post_id=kept.id, parent_id=mine.id)
+        addressed = Comment(content="@victim", user_id=other.id, post_id=kept.id,
+                            parent_id=theirs.id, reply_to_user_id=victim.id)
+        db.session.add_all([reply, addressed])
+        db.session.add(Update(title="u", content="x", author_id=victim.id))
+        db.session.add_all([
+            PostVote(user_id=victim.id, post_id=kept.id, value=1),
+            PostVote(user_id=other.id, post_id=kept.id, value=1),
+            PostVote(user_id=other.id, post_id=own.id, value=1),
+            CommentVote(user_id=victim.id, comment_id=theirs.id, value=1),
+            CommentVote(user_id=other.id, comment_id=mine.id, value=1),
+        ])
+        db.session.commit()
+        victim_id, kept_id, theirs_id, addressed_id = victim.id, kept.id, theirs.id, addressed.id
+
+        res = admin_delete_user(target_user_id=victim_id, actor_user_id=admin.id, actor_is_admin=True)
+
+        assert res.deleted is True
+        assert db.session.get(User, victim_id) is None
+        assert Post.query.count() == 1
+        assert {c.id for c in Comment.query} == {theirs_id, addressed_id}
+        assert db.session.get(Comment, addressed_id).reply_to_user_id is None
+        assert Update.query.count() == 0
+        assert PostVote.query.count() == 1
+        assert CommentVote.query.count() == 0
+
+        kept = db.session.get(Post, kept_id)
+        assert (kept.score, kept.comment_count) == (1, 2)
+        assert db.session.get(Comment, theirs_id).score == 0
+        assert _fk_violations() == []
+
+
+def test_delete_thread_removes_comments_and_votes(app):
+    from app.models import Comment, PostVote, CommentVote
+    from app.services import delete_thread
+
+    with app.app_context():
+        author = User(username="author", password_hash="x")
+        db.session.add(author)
+        db.session.commit()
+        thread = Post(title="t", content="x", user_id=author.id)
+        db.session.add(thread)
+        db.session.commit()
+        parent = Comment(content="p", user_id=author.id, post_id=thread.id)
+        db.session.add(parent)
+        db.session.commit()
+        child = Comment(content="c", user_id=author.id, post_id=thread.id, parent_id=parent.id)
+        db.session.add(child)
+        db.session.add(PostVote(user_id=author.id, post_id=thread.id, value=1))
+        db.session.commit()
+        db.session.add(CommentVote(user_id=author.id, comment_id=child.id, value=-1))
+        db.session.commit()
+        thread_id, author_id = thread.id, author.id
+
+        res = delete_thread(thread_id, actor_user_id=author_id, actor_is_admin=False)
+
+        assert res.deleted is True
+        assert Post.query.count() == 0
+        assert Comment.query.count() == 0
+        assert PostVote.query.count() == 0
+        assert CommentVote.query.count() == 0
+        assert _fk_violations() == []
+
+
+def test_delete_comment_removes_replies_and_votes(app):
+    from app.models import Comment, CommentVote
+    from app.services import create_comment, delete_comment
+
+    with app.app_context():
+        author, voter = User(username="author", password_hash="x"), User(username="voter", password_hash="x")
+        db.session.add_all([author, voter])
+        db.session.commit()
+        thread = Post(title="t", content="x", user_id=author.id)
+        db.session.add(thread)
+        db.session.commit()
+        thread_id, author_id, voter_id = thread.id, author.id, voter.id
+
+        parent = create_comment(thread_id=thread_id, author_id=author_id, content="p")["comment_id"]
+        reply = create_comment(thread_id=thread_id, author_id=voter_id, content="r", parent_id=parent)["comment_id"]
+        kept = create_comment(thread_id=thread_id, author_id=voter_id, content="k")["comment_id"]
+        db.session.add_all([
+            CommentVote(user_id=voter_id, comment_id=parent, value=1),
+            CommentVote(user_id=author_id, comment_id=reply, value=-1),
+            CommentVote(user_id=author_id, comment_id=kept, value=1),
+        ])
+        db.session.commit()
+
+        res = delete_comment(thread_id, parent, actor_user_id=author_id, actor_is_admin=False)
+
+        assert res.deleted is True
+        assert [c.id for c in Comment.query] == [kept]
+        assert [v.comment_id for v in CommentVote.query] == [kept]
+        assert _fk_violations() == []
+        db.session.expire_all()
+        assert db.session.get(Post, thread_id).comment_count == 1
+        assert db.session.get(User, author_id).comment_count == 0
+        assert db.session.get(User, voter_id).comment_count == 1
+
+
+def _seed_listing(app):
+    from app.counters import reconcile_counters
+    from app.models import Comment, PostVote
+
+    with app.app_context():
+        users = [User(username=name, password_hash="x") for name in ("alice", "Alfred", "bob", "al_x", "carol")]
+        db.session.add_all(users)
+        db.session.commit()
+        alice, alfred, bob = users[:3]
+        threads = [Post(title=f"t{i}", content="x", user_id=bob.id) for i in range(3)]
+        threads.append(Post(title="a", content="x", user_id=alice.id))
+        db.session.add_all(threads)
+        db.session.commit()
+        db.session.add_all([Comment(content="c", user_id=alfred.id, post_id=threads[0].id) for _ in range(2)])
+        db.session.add_all([PostVote(user_id=alice.id, post_id=t.id, value=1) for t in threads])
+        db.session.commit()
+        # rows were added without the services: fill User.thread_count / comment_count
+        reconcile_counters()
+        return {u.username: u.id for u in users}
+
+
+def test_list_admin_users_counts_in_one_query(app):
+    from app.query_stats import count_queries
+    from app.services import list_admin_users
+
+    ids = _seed_listing(app)
+    with app.app_context():
+        with count_queries() as stats:
+            page = list_admin_users(sort="threads")
+        assert stats.count == 1
+
+        rows = {r.username: (r.thread_count, r.comment_count, r.vote_count) for r in page.items}
+        assert rows["bob"] == (3, 0, 0)
+        assert rows["alice"] == (1, 0, 4)
+        assert rows["Alfred"] == (0, 2, 0)
+        assert [r.username for r in page.items][:2] == ["bob", "alice"]
+
+        assert [r.id for r in list_admin_users(sort="votes").items][0] == ids["alice"]
+        assert [r.id for r in list_admin_users(sort="new").items][0] == ids["carol"]
+
+
+def test_list_admin_users_keyset_pages_and_prefix_search(app):
+    from app.services import list_admin_users
+
+    ids = _seed_listing(app)
+    with app.app_context():
+        for sort in ("id", "new", "threads", "comments"):
+            seen, after = [], None
+            while True:
+                page = list_admin_users(sort=sort, after=after, per_page=2)
+                seen += [r.id for r in page.items]
+                if not page.has_next:
+                    break
+                after = page.next_cursor
+            assert sorted(seen) == sorted(ids.values()), sort
+            assert len(seen) == len(set(seen)), sort
+
+        found = list_admin_users(q="AL")
+        assert [r.username for r in found.items] == ["alice", "Alfred", "al_x"]
+        # LIKE wildcards in the query are literal
+        assert [r.username for r in list_admin_users(q="al_").items] == ["al_x"]
+        assert [r.username for r in list_admin_users(q="al", sort="votes").items][0] == "alice"
+        # a broken cursor starts from the top
+        assert list_admin_users(after="garbage").after is None
+
+
+def test_prefix_search_folds_non_ascii_usernames(app):
+    from app.services import list_admin_users
+
+    with app.app_context():
+        db.session.add_all([User(username="Иван", password_hash="x"), User(username="ивонна", password_hash="x")])
+        db.session.commit()
+
+        for sort in ("id", "threads"):
+            for q in ("Иван", "иван", "ИВАН"):
+                assert [r.username for r in list_admin_users(q=q, sort=sort).items] == ["Иван"], (q, sort)
+            assert {r.username for r in list_admin_users(q="Ив", sort=sort).items} == {"Иван", "ивонна"}
+
+        user = User.query.filter_by(username="Иван").one()
+        user.username = "Пётр"
+        db.session.commit()
+        assert [r.username for r in list_admin_users(q="пЁ").items] == ["Пётр"]
+
+
+def test_username_prefix_search_uses_index(app):
+    from app.services import _username_prefix_filter
+
+    with app.app_context():
+        query = db.select(User.id).where(_username_prefix_filter("al"))
+        compiled = query.compile(dialect=db.engine.dialect)
+        params = [compiled.params[k] for k in compiled.positiontup]
+        plan = db.session.connection().exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + str(compiled), tuple(params)
+        ).fetchall()
+        assert "INDEX ix_user_username_lower" in " | ".join(r[-1] for r in plan)
+
+
+def test_count_sorts_read_the_user_counters(app):
+    from app.services import _ADMIN_USER_COUNTERS
+
+    with app.app_context():
+        for sort, column in _ADMIN_USER_COUNTERS.items():
+            query = db.select(User.id).order_by(column.desc(), User.id.desc()).limit(51)
+            plan = db.session.connection().exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + str(query.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}))
+            ).fetchall()
+            details = " | ".join(r[-1] for r in plan)
+            assert f"INDEX ix_user_{column.key}_id" in details and "TEMP B-TREE" not in details, sort
+
+
+def test_admin_users_page_renders_search_and_counts(app, client, user_id):
+    from tests.test_posts import login
+
+    _seed_listing(app)
+    with app.app_context():
+        db.session.get(User, user_id).is_admin = True
+        db.session.commit()
+    login(client)
+
+    html = client.get("/admin/users?q=bo&sort=threads").get_data(as_text=True)
+    assert ">bob<" in html.replace("\n", "").replace(" ", "")
+    assert "alice" not in html
+    assert '<td class="text-end">3</td>' in html
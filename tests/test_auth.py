@@ -5,3 +5,42 @@ def test_login_works(client, user_id):
         follow_redirects=False
     )
     assert resp.status_code in (302, 200)
+
+
+def test_current_user_comes_from_cached_snapshot(app, client, user_id):
+    import re
+
+    from sqlalchemy import event
+
+    from app.extensions import db
+
+    client.post("/login", data={"username": "testuser", "password": "password123"})
+    client.get("/threads")  # warm the identity cache
+
+    user_selects = []
+
+    def count(conn, cursor, statement, *args):
+        if re.search(r'\bFROM "?user"?\s', statement):
+            user_selects.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        assert client.get("/threads").status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert user_selects == []
+
+
+def test_settings_update_invalidates_identity_cache(app, client, user_id):
+    client.post("/login", data={"username": "testuser", "password": "password123"})
+    client.get("/threads")
+
+    client.post("/settings", data={"display_name": "New Name", "bio": "hi"})
+
+    with client.application.test_request_context():
+        from app.identity import get_user_snapshot
+        assert get_user_snapshot(user_id).display_name == "New Name"
+    resp = client.get("/settings")
+    assert "New Name" in resp.get_data(as_text=True)
@@ -0,0 +1,48 @@
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models import User, Post, Comment, PostVote, CommentVote
+
+
+def test_seed_data_is_consistent(app):
+    from app.seed import seed_data
+
+    with app.app_context():
+        result = seed_data(users=10, threads=30, comments=200, votes=150, seed=1)
+        assert (result.users, result.threads, result.comments) == (10, 30, 200)
+        assert User.query.count() == 10 and Comment.query.count() == 200
+
+        # denormalized counters match the rows that were inserted
+        for post in Post.query:
+            assert post.comment_count == Comment.query.filter_by(post_id=post.id).count()
+            votes = db.session.query(func.coalesce(func.sum(PostVote.value), 0)).filter_by(post_id=post.id).scalar()
+            assert post.score == votes
+        comment_votes = db.session.query(func.coalesce(func.sum(CommentVote.value), 0)).scalar()
+        assert db.session.query(func.sum(Comment.score)).scalar() == comment_votes
+
+        # replies stay inside their thread
+        parent = db.aliased(Comment)
+        mismatched = (
+            db.session.query(Comment)
+            .join(parent, parent.id == Comment.parent_id)
+            .filter(parent.post_id != Comment.post_id)
+            .count()
+        )
+        assert mismatched == 0
+
+
+def test_run_benchmarks_reports_every_scenario(app):
+    from app.bench import run_benchmarks
+    from app.seed import seed_data
+
+    with app.app_context():
+        seed_data(users=5, threads=60, comments=80, votes=50)
+
+    report = run_benchmarks(app, iterations=3, deep_pages=2)
+    scenarios = report["scenarios"]
+    assert {"threads_new", "threads_top_deep", "thread_detail", "user_profile",
+            "vote_post", "vote_comment", "create_thread"} <= set(scenarios)
+    for name, stats in scenarios.items():
+        assert stats["errors"] == 0, name
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+        assert stats["queries_per_request"] > 0, name
@@ -0,0 +1,84 @@
+from app.counters import reconcile_counters
+from app.jobs import schedule_due
+from app.ranking import hot_rank
+from app.extensions import db
+from app.models import AdminJob, Comment, CommentVote, Post, PostVote, User
+
+
+def _seed_drift(app, user_id):
+    with app.app_context():
+        other = User(username="other", password_hash="x")
+        db.session.add(other)
+        db.session.commit()
+        threads = [Post(title=f"t{i}", content="x", user_id=user_id) for i in range(5)]
+        db.session.add_all(threads)
+        db.session.commit()
+        comment = Comment(content="c", user_id=user_id, post_id=threads[0].id)
+        db.session.add(comment)
+        db.session.commit()
+        db.session.add_all([
+            PostVote(user_id=user_id, post_id=threads[0].id, value=1),
+            PostVote(user_id=other.id, post_id=threads[0].id, value=1),
+            CommentVote(user_id=other.id, comment_id=comment.id, value=-1),
+        ])
+        # counters as if the incremental updates were lost / doubled
+        threads[0].score = 0
+        threads[0].comment_count = 0
+        threads[3].score = 7
+        threads[4].comment_count = 2
+        comment.score = 5
+        db.session.commit()
+        return [t.id for t in threads], comment.id
+
+
+def test_reconcile_counters_reports_and_fixes_drift(app, user_id):
+    thread_ids, comment_id = _seed_drift(app, user_id)
+    with app.app_context():
+        dry = reconcile_counters(chunk_size=2, dry_run=True)
+        counters = dry.to_dict()["counters"]
+        assert counters["post.score"] == {"rows": 2, "total": 9}
+        assert counters["post.comment_count"] == {"rows": 2, "total": 3}
+        assert counters["comment.score"] == {"rows": 1, "total": 6}
+        # created through the ORM, so none of them has a hot rank yet
+        assert counters["post.hot_rank"]["rows"] == 5
+        # same for the author's thread / comment counts
+        assert counters["user.thread_count"] == {"rows": 1, "total": 5}
+        assert counters["user.comment_count"] == {"rows": 1, "total": 1}
+        db.session.expire_all()
+        assert db.session.get(Post, thread_ids[3]).score == 7  # untouched
+
+        progress = []
+        report = reconcile_counters(chunk_size=2, progress=lambda done, total: progress.append((done, total)))
+        assert report.rows == 12
+        # 3 post chunks x 3 counters + 1 comment chunk + 1 user chunk x 2 counters
+        assert progress[0] == (0, 12) and progress[-1] == (12, 12)
+
+        db.session.expire_all()
+        scores = [(t.score, t.comment_count) for t in Post.query.order_by(Post.id)]
+        assert scores == [(2, 1), (0, 0), (0, 0), (0, 0), (0, 0)]
+        assert db.session.get(Comment, comment_id).score == -1
+        top = db.session.get(Post, thread_ids[0])
+        assert top.hot_rank == hot_rank(2, 1, top.date_posted)
+        author = db.session.get(User, user_id)
+        assert (author.thread_count, author.comment_count) == (5, 1)
+
+        assert reconcile_counters().rows == 0
+
+
+def test_reconcile_counters_cli(app, user_id):
+    _seed_drift(app, user_id)
+    result = app.test_cli_runner().invoke(args=["reconcile-counters", "--chunk-size", "3"])
+    assert result.exit_code == 0, result.output
+    assert "post.score: 2 rows off by 9 in total" in result.output
+    assert "Fixed 12 rows" in result.output
+
+
+def test_periodic_reconcile_is_enqueued_once_per_interval(app, user_id):
+    _seed_drift(app, user_id)
+    assert schedule_due(app, "reconcile_counters", interval=3600) is not None
+    assert schedule_due(app, "reconcile_counters", interval=3600) is None
+
+    with app.app_context():
+        (job,) = AdminJob.query.all()
+        assert (job.kind, job.status, job.actor_id) == ("reconcile_counters", "done", None)
+        assert job.summary.startswith("Исправлено: post.score: 2 (Σ9)")
@@ -22,3 +22,32 @@ def test_create_post_from_index(app, client, user_id):
         post = db.session.query(Post).filter_by(user_id=user_id, title="T").first()
         assert post is not None
         assert post.content == "Hello"
+
+
+def test_feed_cards_carry_only_the_preview(app, client, user_id):
+    from app.extensions import db
+    from app.models import Post
+    from app.query_stats import count_queries
+    from app.services import CONTENT_PREVIEW_LEN, create_thread
+
+    body = "\r\n  " + "a" * (CONTENT_PREVIEW_LEN - 1) + "b" + " tail https://example.com/x"
+    with app.app_context():
+        long_id = create_thread(user_id, "long", body).thread_id
+        short_id = create_thread(user_id, "short", "  short body\n").thread_id
+        long_post, short_post = db.session.get(Post, long_id), db.session.get(Post, short_id)
+        assert long_post.content == body.strip()
+        assert long_post.content_preview == "a" * (CONTENT_PREVIEW_LEN - 1) + "b"
+        assert long_post.content_has_more is True
+        assert (short_post.content_preview, short_post.content_has_more) == ("short body", False)
+
+    login(client)
+    app.config["FEED_CACHE_ENABLED"] = False
+    with count_queries() as stats:
+        page = client.get("/threads").get_data(as_text=True)
+    feed_sql = next(sql for _, sql in stats.queries if "FROM post JOIN" in sql)
+    assert "post.content_preview" in feed_sql and "post.content," not in feed_sql
+    assert "tail" not in page and f"/thread/{long_id}/content" in page
+
+    rest = client.get(f"/thread/{long_id}/content").get_json()
+    assert rest["html"] == 'tail <a href="https://example.com/x" target="_blank" rel="nofollow noopener noreferrer">https://example.com/x</a>'
+    assert client.get("/thread/999999/content").status_code == 404
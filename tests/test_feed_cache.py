@@ -0,0 +1,115 @@
+from app.cache import MemoryCache, RedisCache
+
+
+def login(client):
+    return client.post(
+        "/login",
+        data={"username": "testuser", "password": "password123"},
+        follow_redirects=False
+    )
+
+
+class FakeRedis:
+    """Just enough of the redis-py API for RedisCache."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = str(value)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.incr("n") == 1 and cache.incr("n") == 2
+
+
+def test_feed_page_is_cached_until_invalidated(app, client, user_id):
+    login(client)
+
+    from app.extensions import db
+    from app.models import Post
+    from app.services import create_thread
+
+    with app.app_context():
+        db.session.add(Post(title="first-thread", content="x", user_id=user_id))
+        db.session.commit()
+
+    assert b"first-thread" in client.get("/threads").data
+
+    # written behind the service layer: the cached page is still served
+    with app.app_context():
+        db.session.add(Post(title="sneaky-thread", content="x", user_id=user_id))
+        db.session.commit()
+    assert b"sneaky-thread" not in client.get("/threads").data
+
+    # going through the service invalidates the feed
+    with app.app_context():
+        assert create_thread(user_id=user_id, title="new-thread", content="y").created
+    data = client.get("/threads").data
+    assert b"sneaky-thread" in data and b"new-thread" in data
+
+
+def test_feed_cache_with_redis_backend_overlays_votes(app, client, user_id):
+    app.extensions["feed_cache"] = RedisCache(FakeRedis())
+    login(client)
+
+    from app.extensions import db
+    from app.models import Post
+    from app.services import vote_post
+
+    with app.app_context():
+        post = Post(title="voted", content="x", user_id=user_id)
+        db.session.add(post)
+        db.session.commit()
+        vote_post(post.id, user_id, 1)
+        post_id = post.id
+
+    client.get("/threads")
+    resp = client.get("/threads")
+    assert resp.status_code == 200
+    # shared html has no per-user highlight; the overlay carries it
+    assert b"vote-btn-active\"" not in resp.data
+    assert f'{{"{post_id}": 1}}'.encode() in resp.data
+
+
+def test_votes_only_invalidate_score_ordered_feeds(app, client, user_id):
+    login(client)
+
+    from app.extensions import db
+    from app.models import Post
+    from app.services import vote_post
+
+    with app.app_context():
+        post = Post(title="first-thread", content="x", user_id=user_id)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+
+    for sort in ("new", "top", "hot"):
+        assert b"first-thread" in client.get(f"/threads?sort={sort}").data
+
+    with app.app_context():
+        db.session.add(Post(title="sneaky-thread", content="x", user_id=user_id))
+        db.session.commit()
+        vote_post(post_id, user_id, 1)
+
+    assert b"sneaky-thread" not in client.get("/threads?sort=new").data
+    assert b"sneaky-thread" in client.get("/threads?sort=top").data
+    assert b"sneaky-thread" in client.get("/threads?sort=hot").data
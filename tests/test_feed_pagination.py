@@ -21,3 +21,103 @@ def test_feed_paginates(app, client, user_id):
 
     r2 = client.get("/feed?page=2")
     assert r2.status_code == 200
+
+
+def test_threads_keyset_pages_cover_feed_without_duplicates(app, user_id):
+    from datetime import datetime, timedelta
+    from app.extensions import db
+    from app.models import Post
+    from app.services import get_threads_feed_after
+
+    with app.app_context():
+        base = datetime(2026, 1, 1, 12, 0, 0)
+        for i in range(25):
+            db.session.add(Post(
+                title=f"T{i}",
+                content="x",
+                user_id=user_id,
+                # ties on score/comment_count and on date_posted on purpose
+                score=i % 3,
+                comment_count=i % 4,
+                date_posted=base + timedelta(minutes=i // 2),
+                hot_rank=float(i % 5),
+            ))
+        db.session.commit()
+
+        for sort in ("new", "top", "discussed", "hot"):
+            seen = []
+            after = None
+            while True:
+                page = get_threads_feed_after(after=after, per_page=7, sort=sort)
+                seen.extend(t.id for t in page.items)
+                if not page.has_next:
+                    break
+                after = page.next_cursor
+
+            expected = _expected_order(sort, 25)
+            assert seen == expected
+            assert len(set(seen)) == 25
+
+
+def _expected_order(sort, limit):
+    from app.models import Post
+
+    order = {
+        "new": [Post.date_posted.desc(), Post.id.desc()],
+        "top": [Post.score.desc(), Post.date_posted.desc(), Post.id.desc()],
+        "discussed": [Post.comment_count.desc(), Post.date_posted.desc(), Post.id.desc()],
+        "hot": [Post.hot_rank.desc(), Post.id.desc()],
+    }[sort]
+    return [t.id for t in Post.query.order_by(*order).limit(limit).all()]
+
+
+def test_threads_route_accepts_after_cursor(app, client, user_id):
+    login(client)
+
+    from app.extensions import db
+    from app.models import Post
+
+    with app.app_context():
+        for i in range(30):
+            db.session.add(Post(title=f"T{i}", content="x", user_id=user_id))
+        db.session.commit()
+
+    r1 = client.get("/threads?sort=top")
+    assert r1.status_code == 200
+    assert b"after=" in r1.data
+
+    # broken cursor falls back to the first page
+    r2 = client.get("/threads?sort=top&after=not-a-cursor")
+    assert r2.status_code == 200
+
+
+def test_hot_rank_follows_votes_comments_and_age(app, user_id):
+    from datetime import datetime, timedelta, timezone
+    from app.extensions import db
+    from app.models import Post, User
+    from app.ranking import HOT_DECAY_SECONDS, hot_rank
+    from app.services import create_comment, create_thread, get_threads_feed_after, vote_post
+
+    with app.app_context():
+        voters = [User(username=f"v{i}", password_hash="x") for i in range(10)]
+        db.session.add_all(voters)
+        db.session.commit()
+
+        fresh = create_thread(user_id, "fresh", "x").thread_id
+        # an older thread needs 10x the activity per HOT_DECAY_SECONDS of age
+        old_date = datetime.now(timezone.utc) - timedelta(seconds=HOT_DECAY_SECONDS * 0.9)
+        old = Post(title="old", content="x", user_id=user_id, date_posted=old_date, hot_rank=hot_rank(0, 0, old_date))
+        db.session.add(old)
+        db.session.commit()
+        old_id = old.id
+
+        assert [t.id for t in get_threads_feed_after(sort="hot").items] == [fresh, old_id]
+
+        for voter in voters:
+            vote_post(old_id, voter.id, 1)
+        assert create_comment(thread_id=old_id, author_id=user_id, content="c")["ok"]
+
+        db.session.expire_all()
+        old = db.session.get(Post, old_id)
+        assert old.hot_rank == hot_rank(10, 1, old.date_posted)
+        assert [t.id for t in get_threads_feed_after(sort="hot").items] == [old_id, fresh]
@@ -0,0 +1,185 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app import create_app
+from app.extensions import db
+from app.jobs import JOB_HANDLERS, enqueue_scheduled, job_runner, schedule_due, start_background_jobs
+from tests.conftest import TestConfig
+from app.models import AdminJob, User, Post
+from tests.test_posts import login
+
+
+def _make_admin(app, user_id):
+    with app.app_context():
+        db.session.get(User, user_id).is_admin = True
+        db.session.commit()
+
+
+def test_bulk_delete_runs_as_job_with_progress(app, client, user_id):
+    _make_admin(app, user_id)
+    with app.app_context():
+        app.config["DELETE_CHUNK_SIZE"] = 2
+        spammer = User(username="spammer", password_hash="x")
+        db.session.add(spammer)
+        db.session.commit()
+        db.session.add_all([Post(title=f"s{i}", content="x", user_id=spammer.id) for i in range(5)])
+        db.session.commit()
+        spammer_id = spammer.id
+
+    login(client)
+    resp = client.post("/admin/users/delete", data={"user_ids": [str(spammer_id), str(user_id)]})
+    assert resp.status_code == 302
+
+    with app.app_context():
+        job = AdminJob.query.one()
+        assert (job.kind, job.status) == ("delete_users", "done")
+        assert job.params == {"user_ids": [spammer_id], "actor_id": user_id}
+        assert (job.done, job.total, job.percent) == (5, 5, 100)
+        assert job.summary == "Удалено аккаунтов: 1"
+        assert job.finished_at is not None
+        assert db.session.get(User, spammer_id) is None
+        assert Post.query.count() == 0
+
+    page = client.get("/admin/users").get_data(as_text=True)
+    assert 'data-job-status="done"' in page
+    (listed,) = client.get("/admin/jobs").get_json()
+    assert listed["status"] == "done" and listed["percent"] == 100
+
+
+def test_delete_posts_job_keeps_account(app, client, user_id):
+    _make_admin(app, user_id)
+    with app.app_context():
+        author = User(username="author", password_hash="x")
+        db.session.add(author)
+        db.session.commit()
+        db.session.add(Post(title="t", content="x", user_id=author.id))
+        db.session.commit()
+        author_id = author.id
+
+    login(client)
+    client.post(f"/admin/user/{author_id}/posts/delete")
+
+    with app.app_context():
+        job = AdminJob.query.one()
+        assert (job.kind, job.status, job.summary) == ("delete_user_threads", "done", "Удалено тредов: 1")
+        assert db.session.get(User, author_id) is not None
+        assert Post.query.count() == 0
+
+
+def test_failed_job_records_error(app, monkeypatch):
+    def boom(params, progress):
+        progress(1, 3)
+        raise RuntimeError("disk on fire")
+
+    monkeypatch.setitem(JOB_HANDLERS, "boom", boom)
+    with app.app_context():
+        from app.jobs import enqueue_job
+        job_id = enqueue_job("boom", {}, actor_id=1)
+
+        db.session.expire_all()  # the job ran in its own app context
+        job = db.session.get(AdminJob, job_id)
+        assert (job.status, job.error) == ("failed", "disk on fire")
+        assert (job.done, job.total) == (1, 3)
+
+
+def test_resume_picks_up_queued_and_stale_jobs(app, monkeypatch):
+    seen = []
+    monkeypatch.setitem(JOB_HANDLERS, "noop", lambda params, progress: seen.append(params["n"]) or "ok")
+
+    with app.app_context():
+        now = datetime.now(timezone.utc)
+        db.session.add_all([
+            AdminJob(kind="noop", params={"n": 1}, actor_id=1, status="queued"),
+            # died mid-way: no progress for an hour
+            AdminJob(kind="noop", params={"n": 2}, actor_id=1, status="running", updated_at=now - timedelta(hours=1)),
+            # still alive in another worker
+            AdminJob(kind="noop", params={"n": 3}, actor_id=1, status="running", updated_at=now),
+            AdminJob(kind="noop", params={"n": 4}, actor_id=1, status="done"),
+        ])
+        db.session.commit()
+
+        assert job_runner().resume() == 2
+
+        assert seen == [1, 2]
+        statuses = [j.status for j in AdminJob.query.order_by(AdminJob.id)]
+        assert statuses == ["done", "done", "running", "done"]
+
+
+def _file_app(tmp_path):
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'jobs.db'}"
+        SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"timeout": 30}}
+
+    return create_app(FileConfig)
+
+
+def test_only_the_web_server_resumes_jobs(tmp_path, monkeypatch):
+    seen = []
+    monkeypatch.setitem(JOB_HANDLERS, "noop", lambda params, progress: seen.append(1) or "ok")
+    monkeypatch.setattr(TestConfig, "ADMIN_USERNAMES", {"boss"})
+    app = _file_app(tmp_path)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="boss", password_hash="x"))
+        db.session.add(AdminJob(kind="noop", params={}, actor_id=1, status="queued"))
+        db.session.commit()
+
+    # what every `flask ...` command does: no job runs, no row is written
+    cli_app = _file_app(tmp_path)
+    assert seen == []
+    with cli_app.app_context():
+        assert User.query.filter_by(is_admin=True).count() == 0
+
+    start_background_jobs(cli_app)
+    assert seen == [1]
+    with cli_app.app_context():
+        assert User.query.filter_by(username="boss").one().is_admin is True
+    with app.app_context():
+        db.drop_all()
+
+
+def test_scheduled_jobs_are_enqueued_once(tmp_path, monkeypatch):
+    monkeypatch.setitem(JOB_HANDLERS, "noop", lambda params, progress: "ok")
+    app = _file_app(tmp_path)
+    with app.app_context():
+        db.create_all()
+
+    errors = []
+
+    def worker():
+        try:
+            schedule_due(app, "noop", interval=3600)
+        except Exception as exc:  # pragma: no cover - surfaced by the assert below
+            errors.append(exc)
+
+    # one scheduler thread per web worker, all due at the same moment
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    with app.app_context():
+        assert AdminJob.query.filter_by(kind="noop").count() == 1
+        db.drop_all()
+
+
+def test_active_scheduled_job_is_unique_per_kind(app, monkeypatch):
+    monkeypatch.setitem(JOB_HANDLERS, "noop", lambda params, progress: "ok")
+    with app.app_context():
+        db.session.add(AdminJob(kind="noop", params={}, status="running"))
+        db.session.commit()
+        assert enqueue_scheduled("noop", {}) is None
+
+        # an admin's own job of the same kind is not a scheduled one
+        db.session.add(AdminJob(kind="noop", params={}, actor_id=1, status="queued"))
+        db.session.commit()
+
+        db.session.add(AdminJob(kind="noop", params={}, status="queued"))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+
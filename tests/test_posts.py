@@ -26,4 +26,98 @@ def test_owner_can_delete_post(app, client, user_id):
 
     with app.app_context():
         deleted = db.session.get(Post, post_id)
-        assert deleted is None
\ No newline at end of file
+        assert deleted is None
+
+def test_thread_detail_renders_comment_tree(app, client, user_id):
+    login(client)
+
+    from app.extensions import db
+    from app.models import Post, Comment
+
+    with app.app_context():
+        post = Post(title="Tree", content="hello", user_id=user_id)
+        db.session.add(post)
+        db.session.commit()
+        parent = Comment(content="parent-comment", user_id=user_id, post_id=post.id)
+        db.session.add(parent)
+        db.session.commit()
+        db.session.add(Comment(content="child-comment", user_id=user_id, post_id=post.id, parent_id=parent.id))
+        db.session.commit()
+        post_id = post.id
+
+    resp = client.get(f"/thread/{post_id}")
+    assert resp.status_code == 200
+    assert b"parent-comment" in resp.data
+    assert b"child-comment" in resp.data
+
+
+def test_comments_page_limits_top_level_and_inline_replies(app, user_id):
+    from datetime import datetime, timedelta
+    from app.extensions import db
+    from app.models import Post, Comment
+    from app.services import load_comments_page, load_replies_page
+
+    with app.app_context():
+        post = Post(title="t", content="x", user_id=user_id)
+        db.session.add(post)
+        db.session.commit()
+
+        base = datetime(2026, 1, 1)
+        roots = [Comment(content=f"root{i}", user_id=user_id, post_id=post.id,
+                         date_posted=base + timedelta(minutes=i)) for i in range(5)]
+        db.session.add_all(roots)
+        db.session.commit()
+        replies = [Comment(content=f"reply{i}", user_id=user_id, post_id=post.id, parent_id=roots[0].id,
+                           date_posted=base + timedelta(hours=1, minutes=i)) for i in range(4)]
+        db.session.add_all(replies)
+        db.session.commit()
+
+        page = load_comments_page(post.id, limit=2, replies_limit=2)
+        assert [c.content for c in page.items] == ["root0", "root1"]
+        assert page.has_next
+        first = page.items[0]
+        assert [r.content for r in first.replies] == ["reply0", "reply1"]
+        assert first.has_more_replies and not page.items[1].has_more_replies
+
+        rest = load_replies_page(first.id, after=first.replies_cursor, limit=10)
+        assert [r.content for r in rest.items] == ["reply2", "reply3"]
+        assert not rest.has_next
+
+        seen = []
+        after = None
+        while True:
+            page = load_comments_page(post.id, after=after, limit=2)
+            seen.extend(c.content for c in page.items)
+            if not page.has_next:
+                break
+            after = page.next_cursor
+        assert seen == [f"root{i}" for i in range(5)]
+
+
+def test_load_more_comment_endpoints_return_fragments(app, client, user_id):
+    login(client)
+
+    from app.extensions import db
+    from app.models import Post, Comment
+
+    with app.app_context():
+        post = Post(title="t", content="x", user_id=user_id)
+        db.session.add(post)
+        db.session.commit()
+        root = Comment(content="root-comment", user_id=user_id, post_id=post.id)
+        db.session.add(root)
+        db.session.commit()
+        db.session.add(Comment(content="nested-reply", user_id=user_id, post_id=post.id, parent_id=root.id))
+        db.session.commit()
+        post_id, root_id = post.id, root.id
+
+    resp = client.get(f"/thread/{post_id}/comments")
+    assert resp.status_code == 200
+    assert "root-comment" in resp.json["html"]
+    assert resp.json["next_url"] is None
+
+    resp = client.get(f"/comment/{root_id}/replies")
+    assert resp.status_code == 200
+    assert "nested-reply" in resp.json["html"]
+
+    assert client.get("/comment/9999/replies").status_code == 404
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Post, User
+from app.services import create_comment, create_thread, delete_comment, delete_thread
+from tests.test_posts import login
+
+CARD = 'class="card bg-black border border-secondary shadow-sm mb-3 post-card"'
+
+
+def _counts(user_id):
+    db.session.expire_all()
+    user = db.session.get(User, user_id)
+    return user.thread_count, user.comment_count
+
+
+def test_profile_timeline_pages_with_load_more(app, client, user_id):
+    with app.app_context():
+        base = datetime(2026, 1, 1, 12, 0, 0)
+        # pairs share date_posted, so the id tiebreaker matters
+        db.session.add_all([
+            Post(title=f"P{i:02d}", content="x", user_id=user_id, date_posted=base + timedelta(minutes=i // 2))
+            for i in range(25)
+        ])
+        db.session.commit()
+
+    login(client)
+    page = client.get("/user/testuser").get_data(as_text=True)
+    assert page.count(CARD) == 20
+    assert "P24" in page and "P05" in page and "P04" not in page
+    assert "js-load-more" in page and "/user/testuser/threads?after=" in page
+
+    next_url = page.split('data-url="')[1].split('"')[0].replace("&amp;", "&")
+    data = client.get(next_url).get_json()
+    assert data["next_url"] is None
+    assert data["html"].count(CARD) == 5
+    assert [f"P{i:02d}" in data["html"] for i in range(5)] == [True] * 5
+
+    assert client.get("/user/nobody/threads").status_code == 404
+
+
+def test_profile_header_uses_denormalized_counts(app, client, user_id):
+    with app.app_context():
+        other = User(username="other", password_hash="x")
+        db.session.add(other)
+        db.session.commit()
+        other_id = other.id
+
+        thread_id = create_thread(user_id, "t", "body").thread_id
+        create_thread(user_id, "t2", "body")
+        first = create_comment(thread_id=thread_id, author_id=other_id, content="c1")["comment_id"]
+        create_comment(thread_id=thread_id, author_id=other_id, content="c2")
+        create_comment(thread_id=thread_id, author_id=user_id, content="mine")
+        assert _counts(user_id) == (2, 1)
+        assert _counts(other_id) == (0, 2)
+
+        delete_comment(thread_id, first, actor_user_id=other_id, actor_is_admin=False)
+        assert _counts(other_id) == (0, 1)
+
+    login(client)
+    page = client.get("/user/testuser").get_data(as_text=True)
+    assert '<span class="fw-bold text-light">2</span> тредов' in page
+    assert '<span class="fw-bold text-light">1</span> комментариев' in page
+
+    with app.app_context():
+        # the thread goes with the other user's remaining comment on it
+        delete_thread(thread_id, actor_user_id=user_id, actor_is_admin=False)
+        assert _counts(user_id) == (1, 0)
+        assert _counts(other_id) == (0, 0)
@@ -0,0 +1,136 @@
+"""Query plan checks for the feed / profile / comment / search indexes.
+
+SQLite runs everywhere. The Postgres part only runs when TEST_POSTGRES_URL
+points at a scratch database (it creates and drops its own tables there).
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text, tuple_
+
+from app.extensions import db
+from app.models import Thread, Comment, User
+from app.search import hits_query
+
+
+def _feed_queries(user_id=1, thread_id=1):
+    cursor_date = datetime(2026, 1, 1)
+    return {
+        "new": Thread.query.order_by(Thread.date_posted.desc(), Thread.id.desc()).limit(21),
+        "top_after": (
+            Thread.query
+            .filter(tuple_(Thread.score, Thread.date_posted, Thread.id) < tuple_(5, cursor_date, 100))
+            .order_by(Thread.score.desc(), Thread.date_posted.desc(), Thread.id.desc())
+            .limit(21)
+        ),
+        "discussed": (
+            Thread.query
+            .order_by(Thread.comment_count.desc(), Thread.date_posted.desc(), Thread.id.desc())
+            .limit(21)
+        ),
+        "hot_after": (
+            Thread.query
+            .filter(tuple_(Thread.hot_rank, Thread.id) < tuple_(1500.5, 100))
+            .order_by(Thread.hot_rank.desc(), Thread.id.desc())
+            .limit(21)
+        ),
+        "user_threads_after": (
+            Thread.query
+            .filter(Thread.user_id == user_id)
+            .filter(tuple_(Thread.date_posted, Thread.id) < tuple_(cursor_date, 100))
+            .order_by(Thread.date_posted.desc(), Thread.id.desc())
+            .limit(21)
+        ),
+        "top_level_comments": (
+            Comment.query
+            .filter(Comment.post_id == thread_id, Comment.parent_id.is_(None))
+            .order_by(Comment.date_posted)
+        ),
+    }
+
+
+def _explain_sqlite(query) -> str:
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = [compiled.params[k] for k in compiled.positiontup]
+    params = [p.isoformat(" ") if isinstance(p, datetime) else p for p in params]
+    rows = db.session.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + str(compiled), tuple(params)
+    ).fetchall()
+    return " | ".join(r[-1] for r in rows)
+
+
+def _feed_indexes():
+    return [ix for table in (Thread.__table__, Comment.__table__) for ix in table.indexes
+            if ix.name.startswith(("ix_post_", "ix_comment_post_id_"))]
+
+
+def test_sqlite_plans_switch_from_sort_to_index_scan(app):
+    with app.app_context():
+        queries = _feed_queries()
+        indexes = _feed_indexes()
+
+        for ix in indexes:
+            ix.drop(db.engine)
+        try:
+            before = {name: _explain_sqlite(q) for name, q in queries.items()}
+        finally:
+            for ix in indexes:
+                ix.create(db.engine)
+        after = {name: _explain_sqlite(q) for name, q in queries.items()}
+
+        for name in queries:
+            assert "TEMP B-TREE" in before[name], (name, before[name])
+            assert "TEMP B-TREE" not in after[name], (name, after[name])
+            assert "INDEX ix_" in after[name], (name, after[name])
+
+
+def test_sqlite_search_reads_only_the_fts_tables(app):
+    with app.app_context():
+        sql, params = hits_query("sqlite", ["болото", "жаба"], [1.5, 1, 100], 21)
+        rows = db.session.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+        plan = " | ".join(r[-1] for r in rows)
+        assert "SCAN post_fts VIRTUAL TABLE" in plan and "SCAN comment_fts VIRTUAL TABLE" in plan, plan
+        assert "SCAN post " not in plan and "SCAN comment " not in plan, plan
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL is not set")
+def test_postgres_plans_use_index_scans(app):
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    tables = [User.__table__, Thread.__table__, Comment.__table__]
+    db.metadata.create_all(engine, tables=tables)
+    try:
+        with engine.begin() as conn:
+            conn.execute(User.__table__.insert(), [{"id": i, "username": f"u{i}"} for i in range(1, 51)])
+            base = datetime(2025, 1, 1)
+            conn.execute(Thread.__table__.insert(), [
+                {
+                    "id": i, "title": "t", "content": "x", "user_id": i % 50 + 1,
+                    "score": i % 97, "comment_count": i % 31,
+                    "date_posted": base + timedelta(minutes=i),
+                }
+                for i in range(1, 20001)
+            ])
+            conn.execute(Comment.__table__.insert(), [
+                {"id": i, "content": "c", "user_id": 1, "post_id": i % 200 + 1,
+                 "date_posted": base + timedelta(minutes=i)}
+                for i in range(1, 20001)
+            ])
+            conn.exec_driver_sql("ANALYZE")
+
+        with engine.connect() as conn:
+            for name, query in _feed_queries().items():
+                compiled = query.statement.compile(dialect=engine.dialect)
+                plan = conn.exec_driver_sql("EXPLAIN " + str(compiled), compiled.params).fetchall()
+                plan = " | ".join(r[0] for r in plan)
+                assert "Index" in plan, (name, plan)
+                assert "Seq Scan" not in plan, (name, plan)
+                assert "Sort" not in plan, (name, plan)
+
+            sql, params = hits_query("postgresql", ["болото"], None, 21)
+            plan = " | ".join(r[0] for r in conn.execute(text("EXPLAIN " + sql), params))
+            assert "ix_post_search_vector" in plan and "ix_comment_search_vector" in plan, plan
+            assert "Seq Scan on post" not in plan and "Seq Scan on comment" not in plan, plan
+    finally:
+        db.metadata.drop_all(engine, tables=list(reversed(tables)))
+        engine.dispose()
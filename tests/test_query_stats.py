@@ -0,0 +1,99 @@
+import logging
+
+from app.extensions import db
+from app.models import User, Post, Comment
+from app.query_stats import count_queries, statement_shape
+from tests.test_posts import login
+
+
+def _seed(app, user_id, posts=6, comments=8):
+    with app.app_context():
+        authors = [User(username=f"a{i}", password_hash="x") for i in range(3)]
+        db.session.add_all(authors)
+        db.session.commit()
+        threads = [Post(title=f"t{i}", content="x", user_id=authors[i % 3].id) for i in range(posts)]
+        db.session.add_all(threads)
+        db.session.commit()
+        db.session.add_all([
+            Comment(content=f"c{i}", user_id=authors[i % 3].id, post_id=threads[0].id) for i in range(comments)
+        ])
+        db.session.commit()
+        return threads[0].id
+
+
+def test_statement_shape_folds_in_lists_and_literals():
+    a = statement_shape("SELECT * FROM post WHERE id IN (?, ?, ?)  LIMIT 20")
+    b = statement_shape("SELECT *\nFROM post WHERE id IN (?, ?) LIMIT 50")
+    assert a == b == "SELECT * FROM post WHERE id IN (?) LIMIT N"
+
+
+def test_count_queries_flags_repeated_statements(app, user_id):
+    with app.app_context():
+        with count_queries(n_plus_one_threshold=3) as stats:
+            db.session.execute(db.select(Post.id)).all()
+            for uid in range(user_id, user_id + 5):
+                db.session.execute(db.select(User.username).where(User.id == uid)).all()
+        assert stats.count == 6
+        (repeated,) = stats.repeated()
+        assert repeated["count"] == 5
+        assert "FROM user" in repeated["sql"]
+
+
+def test_route_query_budgets(app, client, user_id, query_budget):
+    thread_id = _seed(app, user_id)
+    login(client)
+    client.get("/threads")  # warm the identity cache
+
+    with query_budget(4):
+        assert client.get(f"/thread/{thread_id}").status_code == 200
+    with query_budget(3):
+        assert client.get("/user/a0").status_code == 200
+    # cold render: page with the authors joined in + my votes
+    app.config["FEED_CACHE_ENABLED"] = False
+    with query_budget(2):
+        assert client.get("/threads").status_code == 200
+
+
+def test_threads_query_count_does_not_grow_with_page(app, client, user_id, query_budget):
+    login(client)
+    app.config["FEED_CACHE_ENABLED"] = False
+    with app.app_context():
+        db.session.add(Post(title="only", content="x", user_id=user_id))
+        db.session.commit()
+    client.get("/threads")  # warm the identity cache
+    with count_queries() as one_card:
+        client.get("/threads")
+
+    with app.app_context():
+        authors = [User(username=f"author{i}", password_hash="x") for i in range(25)]
+        db.session.add_all(authors)
+        db.session.commit()
+        db.session.add_all([Post(title=f"t{i}", content="x", user_id=a.id) for i, a in enumerate(authors)])
+        db.session.commit()
+    for url in ("/threads", "/threads?sort=hot", "/user/author0"):
+        with query_budget(one_card.count + (1 if url.startswith("/user/") else 0)):
+            assert client.get(url).status_code == 200
+
+
+def test_server_timing_header_and_log_line(caplog):
+    from app import create_app
+    from tests.conftest import TestConfig
+
+    class StatsConfig(TestConfig):
+        QUERY_STATS_ENABLED = True
+
+    stats_app = create_app(StatsConfig)
+    with stats_app.app_context():
+        db.create_all()
+    stats_client = stats_app.test_client()
+
+    with caplog.at_level(logging.INFO, logger=stats_app.logger.name):
+        resp = stats_client.get("/healthz")
+
+    timing = resp.headers.getlist("Server-Timing")
+    assert timing[0].startswith("db;dur=") and 'desc="1 queries"' in timing[0]
+    assert timing[1].startswith("app;dur=")
+    assert any('"path": "/healthz"' in r.getMessage() and '"queries": 1' in r.getMessage() for r in caplog.records)
+
+    with stats_app.app_context():
+        db.drop_all()
@@ -0,0 +1,135 @@
+from app import socketio
+from app.extensions import db
+from app.models import Post, Comment
+from app.realtime import EventThrottle
+from tests.test_posts import login
+
+
+def test_throttle_coalesces_updates_per_room():
+    sent, scheduled = [], []
+    throttle = EventThrottle(
+        lambda event, payload, to: sent.append((to, event, payload)),
+        interval=0.5,
+        spawn=lambda fn, room: scheduled.append(room),
+        sleep=lambda s: None,
+    )
+
+    for score in range(1, 51):
+        throttle.push("thread_1", "post_score_updated", {"score": score}, key=1)
+    throttle.push("thread_1", "comment_score_updated", {"comment_id": 7, "score": 2}, key=7)
+    throttle.push("thread_2", "post_score_updated", {"score": 9}, key=2)
+
+    # one flush per room is scheduled, nothing is sent before it runs
+    assert scheduled == ["thread_1", "thread_2"]
+    assert sent == []
+
+    assert throttle.flush("thread_1") == 2
+    assert sent == [
+        ("thread_1", "post_score_updated", {"score": 50}),
+        ("thread_1", "comment_score_updated", {"comment_id": 7, "score": 2}),
+    ]
+
+    # the next update after a flush opens a new window
+    throttle.push("thread_1", "post_score_updated", {"score": 51}, key=1)
+    assert scheduled == ["thread_1", "thread_2", "thread_1"]
+    assert throttle.flush() == 2
+
+
+def _socket(app, client, thread_id):
+    sock = socketio.test_client(app, flask_test_client=client)
+    sock.emit("join_thread", {"thread_id": thread_id})
+    sock.get_received()
+    return sock
+
+
+def test_thread_room_receives_comment_and_vote_events(app, client, user_id):
+    login(client)
+    with app.app_context():
+        post = Post(title="t", content="x", user_id=user_id)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+
+    sock = _socket(app, client, post_id)
+
+    client.post(f"/thread/{post_id}/comment", data={"content": "live hello"})
+    with app.app_context():
+        comment_id = Comment.query.one().id
+    client.post(f"/thread/{post_id}/vote", json={"value": 1})
+    client.post(f"/thread/{post_id}/comment/{comment_id}/vote", json={"value": -1})
+    client.post(f"/thread/{post_id}/comment/{comment_id}/delete")
+
+    events = {e["name"]: e["args"][0] for e in sock.get_received()}
+    created = events["comment_created"]
+    assert (created["thread_id"], created["comment_id"], created["parent_id"]) == (post_id, comment_id, None)
+    assert "live hello" in created["html"]
+    assert "js-owner-only" in created["html"]
+    assert events["post_score_updated"] == {"thread_id": post_id, "score": 1}
+    assert events["comment_score_updated"] == {"thread_id": post_id, "comment_id": comment_id, "score": -1}
+    assert events["comment_deleted"] == {"thread_id": post_id, "comment_id": comment_id}
+    sock.disconnect()
+
+
+def test_healthz_reports_db_and_queue(client):
+    resp = client.get("/healthz")
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["status"] == "ok"
+    assert data["checks"]["db"]["ok"] is True
+    assert data["checks"]["message_queue"]["backend"] == "local"
+
+
+class _FakeServer:
+    """Just enough of socketio.Server for a manager to deliver packets."""
+
+    def __init__(self):
+        import itertools
+        import types
+        import socketio as python_socketio
+        ids = itertools.count()
+        self.eio = types.SimpleNamespace(generate_id=lambda: f"sid-{next(ids)}")
+        self.packet_class = python_socketio.packet.Packet
+        self.sent = []
+
+    def _send_eio_packet(self, eio_sid, pkt):
+        self.sent.append((eio_sid, pkt.data))
+
+
+def test_loopback_queue_fans_out_between_workers():
+    from app.realtime import LoopbackManager
+
+    workers = []
+    for n in range(2):
+        manager = LoopbackManager(channel="test-fanout")
+        manager.set_server(_FakeServer())
+        manager.initialize()
+        sid = manager.connect(f"eio-{n}", "/")
+        manager.enter_room(sid, "/", "thread_42")
+        workers.append(manager)
+
+    try:
+        # worker 0 handles the vote; the client on worker 1 must see it too
+        workers[0].emit("post_score_updated", {"thread_id": 42, "score": 7}, namespace="/", room="thread_42")
+        workers[0].emit("post_score_updated", {"thread_id": 43, "score": 1}, namespace="/", room="thread_43")
+        for n, manager in enumerate(workers):
+            assert len(manager.server.sent) == 1
+            eio_sid, data = manager.server.sent[0]
+            assert eio_sid == f"eio-{n}"
+            assert '"score":7' in data
+    finally:
+        for manager in workers:
+            manager.unsubscribe()
+
+
+def test_create_app_wires_the_configured_message_queue():
+    from app import create_app, socketio
+    from app.realtime import LoopbackManager
+    from tests.conftest import TestConfig
+
+    class QueueConfig(TestConfig):
+        SOCKETIO_MESSAGE_QUEUE = "memory://"
+
+    create_app(QueueConfig)
+    assert socketio.server.manager.name == "loopback"
+    create_app(TestConfig)
+    assert not isinstance(socketio.server.manager, LoopbackManager)
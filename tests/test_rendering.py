@@ -0,0 +1,118 @@
+from app import create_app
+from app.extensions import db
+from app.jobs import start_background_jobs
+from app.models import AdminJob, Comment, Post, Update, User
+from app.services import create_comment, create_thread, create_update
+import app.rendering as rendering
+from tests.conftest import TestConfig
+from tests.test_posts import login
+
+
+def test_writes_store_rendered_html(app, user_id):
+    with app.app_context():
+        thread_id = create_thread(user_id, "t", "see https://example.com\n<b>hi</b>").thread_id
+        comment_id = create_comment(thread_id=thread_id, author_id=user_id, content="@testuser ok")["comment_id"]
+        update_id = create_update(user_id, True, "u", "news https://example.org").update_id
+
+        thread = db.session.get(Post, thread_id)
+        assert '<a href="https://example.com"' in thread.content_html
+        assert "<br>&lt;b&gt;hi&lt;/b&gt;" in thread.content_html
+        assert thread.content_preview_html == thread.content_html  # short body: preview is the whole text
+        assert thread.content_html_version == rendering.RENDERER_VERSION
+
+        comment = db.session.get(Comment, comment_id)
+        assert comment.content_html == '<a href="/user/testuser" class="mention">@testuser</a> ok'
+        update = db.session.get(Update, update_id)
+        assert '<a href="https://example.org"' in update.content_html
+
+
+def test_pages_use_stored_html_and_fall_back(app, client, user_id):
+    with app.app_context():
+        thread_id = create_thread(user_id, "t", "body").thread_id
+        thread = db.session.get(Post, thread_id)
+        # the stored HTML wins over the raw text...
+        thread.content_html = "<em>stored</em>"
+        # ...and rows the job has not reached yet still render through the filter
+        db.session.add(Comment(content="raw https://example.net", user_id=user_id, post_id=thread_id))
+        db.session.commit()
+
+    login(client)
+    page = client.get(f"/thread/{thread_id}").get_data(as_text=True)
+    assert "<em>stored</em>" in page
+    assert '<a href="https://example.net"' in page
+
+
+def test_version_bump_rerenders_stale_rows(app, user_id, monkeypatch):
+    with app.app_context():
+        thread_id = create_thread(user_id, "t", "https://example.com").thread_id
+        db.session.add(Comment(content="@testuser", user_id=user_id, post_id=thread_id))
+        db.session.commit()
+
+        # only the comment without stored HTML is stale
+        assert rendering.rerender_stale() == 1
+        assert rendering.rerender_stale() == 0
+
+        monkeypatch.setattr(rendering, "RENDERER_VERSION", rendering.RENDERER_VERSION + 1)
+        progress = []
+        assert rendering.rerender_stale(chunk_size=1, progress=lambda d, t: progress.append((d, t))) == 2
+        assert progress[0] == (0, 2) and progress[-1] == (2, 2)
+
+        db.session.expire_all()
+        comment = Comment.query.one()
+        assert comment.content_html == '<a href="/user/testuser" class="mention">@testuser</a>'
+        assert comment.content_html_version == rendering.RENDERER_VERSION
+
+
+def test_schedule_rerender_once_per_version(app, user_id, monkeypatch):
+    with app.app_context():
+        thread_id = create_thread(user_id, "t", "body").thread_id
+        db.session.execute(db.update(Post).values(content_html=None, content_html_version=None))
+        db.session.commit()
+
+        job_id = rendering.schedule_rerender()
+        db.session.expire_all()
+        job = db.session.get(AdminJob, job_id)
+        assert job.status == "done" and job.summary == "Перерисовано записей: 1"
+        assert db.session.get(Post, thread_id).content_html == "body"
+        assert rendering.schedule_rerender() is None
+
+        monkeypatch.setattr(rendering, "RENDERER_VERSION", rendering.RENDERER_VERSION + 1)
+        assert rendering.schedule_rerender() is not None
+
+
+def test_rerender_runs_from_web_startup_or_command_only(tmp_path):
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'render.db'}"
+
+    file_app = create_app(FileConfig)
+    with file_app.app_context():
+        db.create_all()
+        author = User(username="author", password_hash="x")
+        db.session.add(author)
+        db.session.commit()
+        db.session.add(Post(title="t", content="https://example.com", user_id=author.id))
+        db.session.commit()
+
+    # building the app (every `flask ...` command does) enqueues nothing
+    cli_app = create_app(FileConfig)
+    with cli_app.app_context():
+        assert AdminJob.query.count() == 0
+
+    result = cli_app.test_cli_runner().invoke(args=["rerender-content"])
+    assert result.exit_code == 0, result.output
+    assert "Re-rendered 1 rows" in result.output
+    with cli_app.app_context():
+        assert AdminJob.query.count() == 0
+        assert Post.query.one().content_html_version == rendering.RENDERER_VERSION
+
+    # web workers: one job per renderer version, however many start
+    with file_app.app_context():
+        db.session.execute(db.update(Post).values(content_html_version=None))
+        db.session.commit()
+    start_background_jobs(file_app)
+    start_background_jobs(cli_app)
+    with file_app.app_context():
+        (job,) = AdminJob.query.all()
+        assert (job.kind, job.status, job.summary) == ("rerender_content", "done", "Перерисовано записей: 1")
+        db.drop_all()
+
@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta, timezone
+
+from app.extensions import db
+from app.jobs import enqueue_job
+from app.models import AdminJob, Post, PostPeriodScore, PostVote, PostVoteRollup, User
+from app.rollups import compact_rollups, rebuild_rollups, record_post_votes
+from app.services import delete_thread, get_threads_feed_after, vote_post, admin_delete_user
+from tests.test_posts import login
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _period_scores(period):
+    return dict(db.session.execute(
+        db.select(PostPeriodScore.post_id, PostPeriodScore.score).where(PostPeriodScore.period == period)
+    ).all())
+
+
+def _voters(n):
+    users = [User(username=f"voter{i}", password_hash="x") for i in range(n)]
+    db.session.add_all(users)
+    db.session.commit()
+    return [u.id for u in users]
+
+
+def test_votes_feed_every_window(app, user_id):
+    with app.app_context():
+        thread = Post(title="t", content="x", user_id=user_id)
+        db.session.add(thread)
+        db.session.commit()
+        thread_id = thread.id
+
+        vote_post(thread_id, user_id, 1)
+        vote_post(thread_id, user_id, -1)  # flip: net -1
+
+        for period in ("day", "week", "month"):
+            assert _period_scores(period) == {thread_id: -1}
+        (bucket,) = PostVoteRollup.query.all()
+        assert (bucket.bucket_hours, bucket.delta) == (1, -1)
+
+
+def test_compaction_expires_old_votes_from_windows(app, user_id):
+    with app.app_context():
+        threads = [Post(title=f"t{i}", content="x", user_id=user_id) for i in range(3)]
+        db.session.add_all(threads)
+        db.session.commit()
+        fresh, last_week, last_month = [t.id for t in threads]
+
+        now = datetime(2026, 3, 15, 12, 30)
+        record_post_votes({fresh: 3}, now=now)
+        record_post_votes({last_week: 5}, now=now - timedelta(days=3, hours=2))
+        record_post_votes({last_week: 1}, now=now - timedelta(days=3, hours=1))
+        record_post_votes({last_month: 7}, now=now - timedelta(days=20))
+        record_post_votes({fresh: 9}, now=now - timedelta(days=45))
+        db.session.commit()
+
+        report = compact_rollups(now=now)
+
+        assert _period_scores("day") == {fresh: 3}
+        assert _period_scores("week") == {fresh: 3, last_week: 6}
+        assert _period_scores("month") == {fresh: 3, last_week: 6, last_month: 7}
+        assert (report["day"], report["week"], report["month"]) == (1, 2, 3)
+        # hourly buckets older than two days became daily ones, the 45-day-old one is gone
+        buckets = {(b.post_id, b.bucket_hours): b.delta for b in PostVoteRollup.query}
+        assert buckets == {(fresh, 1): 3, (last_week, 24): 6, (last_month, 24): 7}
+        assert report["expired"] == 1
+
+
+def test_window_feed_orders_and_paginates(app, user_id):
+    with app.app_context():
+        threads = [Post(title=f"t{i}", content="x", user_id=user_id, score=100 - i) for i in range(5)]
+        db.session.add_all(threads)
+        db.session.commit()
+        ids = [t.id for t in threads]
+        # all-time order is by score; this week's is by recent votes
+        record_post_votes({ids[0]: -1, ids[1]: 4, ids[2]: 4, ids[3]: 2})
+        db.session.commit()
+
+        seen, after = [], None
+        while True:
+            page = get_threads_feed_after(after=after, per_page=2, sort="top", window="week")
+            assert page.window == "week"
+            seen.extend(t.id for t in page.items)
+            if not page.has_next:
+                break
+            after = page.next_cursor
+        # ties on the period score are broken by newest id; unvoted threads are not listed
+        assert seen == [ids[2], ids[1], ids[3], ids[0]]
+
+        # unknown windows fall back to the all-time top
+        page = get_threads_feed_after(per_page=2, sort="top", window="year")
+        assert page.window is None and [t.id for t in page.items] == ids[:2]
+
+
+def test_window_route_and_cache_key(app, client, user_id):
+    with app.app_context():
+        old, new = Post(title="old-favourite", content="x", user_id=user_id, score=50), \
+            Post(title="rising", content="x", user_id=user_id)
+        db.session.add_all([old, new])
+        db.session.commit()
+        new_id = new.id
+
+    login(client)
+    client.get("/threads?sort=top")  # warm the all-time page in the feed cache
+    client.post(f"/thread/{new_id}/vote", json={"value": 1})
+
+    page = client.get("/threads?sort=top&t=day").get_data(as_text=True)
+    assert "rising" in page and "old-favourite" not in page
+    assert "За неделю" in page
+    all_time = client.get("/threads?sort=top").get_data(as_text=True)
+    assert all_time.index("old-favourite") < all_time.index("rising")
+
+
+def test_deletes_keep_windows_consistent(app, user_id):
+    with app.app_context():
+        voter_id, = _voters(1)
+        threads = [Post(title=f"t{i}", content="x", user_id=user_id) for i in range(2)]
+        db.session.add_all(threads)
+        db.session.commit()
+        kept, doomed = [t.id for t in threads]
+        for thread_id in (kept, doomed):
+            vote_post(thread_id, user_id, 1)
+            vote_post(thread_id, voter_id, 1)
+
+        delete_thread(doomed, actor_user_id=user_id, actor_is_admin=True)
+        assert PostVoteRollup.query.filter_by(post_id=doomed).count() == 0
+        assert _period_scores("week") == {kept: 2}
+
+        admin_delete_user(voter_id, actor_user_id=user_id, actor_is_admin=True)
+        assert _period_scores("week") == {kept: 1}
+        assert {b.post_id: b.delta for b in PostVoteRollup.query} == {kept: 1}
+
+
+def test_rebuild_from_votes_and_job(app, user_id):
+    with app.app_context():
+        voter_ids = _voters(2)
+        thread = Post(title="t", content="x", user_id=user_id)
+        db.session.add(thread)
+        db.session.commit()
+        now = _now()
+        db.session.add_all([
+            PostVote(user_id=voter_ids[0], post_id=thread.id, value=1, created_at=now, updated_at=now),
+            PostVote(user_id=voter_ids[1], post_id=thread.id, value=1,
+                     created_at=now - timedelta(days=10), updated_at=now - timedelta(days=10)),
+        ])
+        db.session.commit()
+        thread_id = thread.id
+
+        report = rebuild_rollups()
+        assert (report["day"], report["week"], report["month"]) == (1, 1, 1)
+        assert _period_scores("day") == {thread_id: 1}
+        assert _period_scores("month") == {thread_id: 2}
+
+        job_id = enqueue_job("compact_vote_rollups", {}, actor_id=None)
+        db.session.expire_all()
+        job = db.session.get(AdminJob, job_id)
+        assert job.status == "done"
+        assert job.summary.endswith("в топе: день 1, неделя 1, месяц 1")
@@ -0,0 +1,130 @@
+from sqlalchemy import text
+
+from app.extensions import db
+from app.models import Comment, Post
+from app.search import rebuild_search_index
+from app.services import create_comment, create_thread, delete_thread, search
+from tests.test_posts import login
+
+
+def _hits(page):
+    return [(hit.kind, hit.id) for hit in page.items]
+
+
+def test_search_matches_titles_content_and_comments(app, user_id):
+    with app.app_context():
+        in_title = create_thread(user_id, "Болото и лягушки", "ничего особенного").thread_id
+        in_body = create_thread(user_id, "Про погоду", "Вчера видел лягушку у пруда").thread_id
+        other = create_thread(user_id, "Другое", "совсем не про то").thread_id
+        comment_id = create_comment(thread_id=other, author_id=user_id, content="Лягушки <b>квакали</b>")["comment_id"]
+
+        page = search("лягушк")
+        assert page.reason == "ok"
+        # the title column weighs more than the body
+        assert _hits(page)[0] == ("thread", in_title)
+        assert set(_hits(page)) == {("thread", in_title), ("thread", in_body), ("comment", comment_id)}
+
+        by_id = {(hit.kind, hit.id): hit for hit in page.items}
+        assert str(by_id[("thread", in_title)].title) == "Болото и <mark>лягушки</mark>"
+        assert "<mark>лягушку</mark>" in by_id[("thread", in_body)].snippet
+        hit = by_id[("comment", comment_id)]
+        assert hit.thread_id == other and hit.title == "Другое" and hit.author == "testuser"
+        # user text is escaped, only the highlight is markup
+        assert str(hit.snippet) == "<mark>Лягушки</mark> &lt;b&gt;квакали&lt;/b&gt;"
+
+        # every word must match
+        assert _hits(search("лягушку пруд")) == [("thread", in_body)]
+
+
+def test_typed_highlight_markers_are_stripped(app, user_id):
+    with app.app_context():
+        thread_id = create_thread(user_id, "\x03Жабы\x02", "про \x02жаб\x03 и \x03пруд").thread_id
+        comment_id = create_comment(thread_id=thread_id, author_id=user_id, content="\x02ква\x03кают жабы")["comment_id"]
+        assert db.session.get(Post, thread_id).content == "про жаб и пруд"
+        assert db.session.get(Comment, comment_id).content == "квакают жабы"
+
+        by_id = {(hit.kind, hit.id): hit for hit in search("жабы").items}
+        assert str(by_id[("thread", thread_id)].title) == "<mark>Жабы</mark>"
+        assert str(by_id[("comment", comment_id)].snippet) == "квакают <mark>жабы</mark>"
+        assert str(search("пруд").items[0].snippet) == "про жаб и <mark>пруд</mark>"
+
+
+def test_search_index_follows_edits_and_deletes(app, user_id):
+    with app.app_context():
+        thread_id = create_thread(user_id, "Старое", "текст").thread_id
+        create_comment(thread_id=thread_id, author_id=user_id, content="комментарий про кактус")
+
+        thread = db.session.get(Post, thread_id)
+        thread.title = "Новое"
+        thread.score = 5  # not a text column: the index is left alone
+        db.session.commit()
+        assert search("старое").items == []
+        assert _hits(search("новое")) == [("thread", thread_id)]
+
+        delete_thread(thread_id, actor_user_id=user_id, actor_is_admin=True)
+        assert search("новое").items == [] and search("кактус").items == []
+
+
+def test_search_pages_by_rank_cursor(app, user_id):
+    with app.app_context():
+        # identical rows tie on rank, so the id tiebreaker orders them
+        ids = [create_thread(user_id, f"t{i}", "общий текст").thread_id for i in range(5)]
+        db.session.add(Comment(content="общий", user_id=user_id, post_id=ids[0]))
+        db.session.commit()
+
+        seen, after = [], None
+        while True:
+            page = search("общий", after=after, per_page=2)
+            seen.extend(_hits(page))
+            if not page.has_next:
+                break
+            after = page.next_cursor
+        assert len(seen) == len(set(seen)) == 6
+        thread_hits = [hit_id for kind, hit_id in seen if kind == "thread"]
+        assert thread_hits == sorted(thread_hits, reverse=True)
+
+        assert search("общий", after="garbage", per_page=2).after is None
+
+
+def test_search_ignores_fts_syntax_and_empty_queries(app, user_id):
+    with app.app_context():
+        thread_id = create_thread(user_id, "C++ и NEAR", "AND OR NOT").thread_id
+        assert search("   ").reason == "empty_query"
+        assert search("!!! ***").reason == "empty_query"
+        assert _hits(search('"near" OR')) == [("thread", thread_id)]
+        assert _hits(search("c++ -near*")) == [("thread", thread_id)]
+
+
+def test_rebuild_search_index_restores_rows(app, user_id):
+    with app.app_context():
+        thread_id = create_thread(user_id, "Восстановление", "индекса").thread_id
+        db.session.execute(text("INSERT INTO post_fts(post_fts) VALUES ('delete-all')"))
+        db.session.commit()
+        assert search("восстановление").items == []
+
+        rebuild_search_index()
+        assert _hits(search("восстановление")) == [("thread", thread_id)]
+
+
+def test_search_page(app, client, user_id):
+    with app.app_context():
+        thread_id = create_thread(user_id, "Жабы", "<script>alert(1)</script> жабы").thread_id
+
+    login(client)
+    page = client.get("/search?q=жабы").get_data(as_text=True)
+    assert f'href="/thread/{thread_id}"' in page
+    assert "<mark>Жабы</mark>" in page
+    assert "<script>alert(1)</script>" not in page
+    assert "Ничего не найдено" in client.get("/search?q=носорог").get_data(as_text=True)
+    assert client.get("/search").status_code == 200
+
+
+def test_autogenerate_ignores_the_search_index(app):
+    from alembic.autogenerate import compare_metadata
+    from alembic.migration import MigrationContext
+
+    from app.search import include_object
+
+    with app.app_context(), db.engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={"include_object": include_object})
+        assert compare_metadata(context, db.metadata) == []
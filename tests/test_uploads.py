@@ -0,0 +1,97 @@
+import io
+
+from werkzeug.datastructures import FileStorage
+
+from app.extensions import db
+from app.models import Post, User
+
+
+def _image(name="pic.png"):
+    return FileStorage(stream=io.BytesIO(b"\x89PNG fake"), filename=name, content_type="image/png")
+
+
+def test_create_thread_stores_placeholder_then_uploaded_url(app, user_id):
+    from app.services import create_thread
+    from app.uploads import placeholder_url
+
+    seen = {}
+
+    def fake_uploader(data, filename, options):
+        with app.app_context():
+            # the row is already committed with the placeholder
+            seen["before"] = Post.query.one().image_url
+        seen["data"] = data
+        return "https://cdn.example/pic.png"
+
+    app.extensions["upload_queue"].uploader = fake_uploader
+    with app.test_request_context():
+        res = create_thread(user_id, "t", "x", image_file=_image())
+        assert res.created
+
+        assert seen["before"] == placeholder_url()
+        assert seen["data"] == b"\x89PNG fake"
+        db.session.expire_all()
+        assert db.session.get(Post, res.thread_id).image_url == "https://cdn.example/pic.png"
+
+        metrics = app.extensions["upload_queue"].metrics()
+        assert (metrics["completed"], metrics["failed"], metrics["queue_depth"]) == (1, 0, 0)
+
+
+def test_failed_upload_retries_then_clears_placeholder(app, user_id):
+    from app.services import create_thread
+
+    calls = []
+
+    def broken_uploader(data, filename, options):
+        calls.append(filename)
+        raise RuntimeError("cloudinary is down")
+
+    app.extensions["upload_queue"].uploader = broken_uploader
+    with app.test_request_context():
+        res = create_thread(user_id, "t", "x", image_file=_image())
+        assert res.created
+        assert len(calls) == app.config["UPLOAD_MAX_ATTEMPTS"]
+        db.session.expire_all()  # the job wrote through its own session
+        assert db.session.get(Post, res.thread_id).image_url is None
+
+        metrics = app.extensions["upload_queue"].metrics()
+        assert metrics["failed"] == 1
+        assert metrics["retries"] == app.config["UPLOAD_MAX_ATTEMPTS"] - 1
+
+
+def test_sweep_clears_placeholders_of_lost_uploads(app, user_id):
+    from datetime import datetime, timedelta, timezone
+
+    from app.jobs import enqueue_scheduled
+    from app.models import AdminJob
+    from app.uploads import placeholder_url
+
+    with app.app_context():
+        old = datetime.now(timezone.utc) - timedelta(hours=2)
+        # the worker died with the bytes in memory: nothing will replace these
+        lost = Post(title="lost", content="x", user_id=user_id, image_url=placeholder_url(), date_posted=old)
+        pending = Post(title="pending", content="x", user_id=user_id, image_url=placeholder_url())
+        done = Post(title="done", content="x", user_id=user_id, image_url="https://cdn.example/a.png", date_posted=old)
+        db.session.add_all([lost, pending, done])
+        db.session.commit()
+
+        job_id = enqueue_scheduled("clear_upload_placeholders", {})
+        db.session.expire_all()
+        job = db.session.get(AdminJob, job_id)
+        assert job.status == "done" and job.summary.startswith("Сброшено заглушек: треды 1,")
+        assert db.session.get(Post, lost.id).image_url is None
+        assert db.session.get(Post, pending.id).image_url == placeholder_url()
+        assert db.session.get(Post, done.id).image_url == "https://cdn.example/a.png"
+
+
+def test_avatar_route_enqueues_upload(app, client, user_id):
+    from tests.test_posts import login
+
+    app.extensions["upload_queue"].uploader = lambda data, filename, options: f"https://cdn.example/{options['public_id']}"
+    login(client)
+
+    resp = client.post("/profile/avatar", data={"avatar": _image("me.png")}, content_type="multipart/form-data")
+    assert resp.status_code == 302
+
+    with app.app_context():
+        assert db.session.get(User, user_id).avatar_url == f"https://cdn.example/avatar_{user_id}"
@@ -0,0 +1,185 @@
+import threading
+
+from sqlalchemy import func
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Post, Comment, PostVote, CommentVote
+from tests.conftest import TestConfig
+
+
+def test_vote_post_toggle_and_switch(app, user_id):
+    from app.services import vote_post
+
+    with app.app_context():
+        post = Post(title="t", content="x", user_id=user_id)
+        db.session.add(post)
+        db.session.commit()
+
+        res = vote_post(post.id, user_id, 1)
+        assert (res.success, res.score, res.my_vote) == (True, 1, 1)
+
+        res = vote_post(post.id, user_id, -1)
+        assert (res.score, res.my_vote) == (-1, -1)
+
+        res = vote_post(post.id, user_id, -1)
+        assert (res.score, res.my_vote) == (0, 0)
+        assert PostVote.query.count() == 0
+
+        assert vote_post(post.id + 100, user_id, 1).reason == "not_found"
+        assert vote_post(post.id, user_id, 5).reason == "invalid_value"
+
+
+def test_vote_comment_updates_score(app, user_id):
+    from app.services import vote_comment
+
+    with app.app_context():
+        post = Post(title="t", content="x", user_id=user_id)
+        db.session.add(post)
+        db.session.commit()
+        comment = Comment(content="c", user_id=user_id, post_id=post.id)
+        db.session.add(comment)
+        db.session.commit()
+
+        res = vote_comment(comment.id, user_id, 1)
+        assert (res.score, res.my_vote) == (1, 1)
+        res = vote_comment(comment.id, user_id, 1)
+        assert (res.score, res.my_vote) == (0, 0)
+        assert CommentVote.query.count() == 0
+        assert vote_comment(comment.id + 100, user_id, 1).reason == "not_found"
+
+
+def test_concurrent_votes_keep_score_consistent(tmp_path):
+    from app.services import vote_post
+
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'votes.db'}"
+        SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"timeout": 30}}
+
+    app = create_app(FileConfig)
+    workers, votes_per_worker = 8, 25
+
+    with app.app_context():
+        db.create_all()
+        users = [User(username=f"u{i}", password_hash=generate_password_hash("x")) for i in range(workers)]
+        db.session.add_all(users)
+        db.session.commit()
+        post = Post(title="hot", content="x", user_id=users[0].id)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+        user_ids = [u.id for u in users]
+
+    errors = []
+
+    def hammer(uid: int, n: int):
+        try:
+            with app.app_context():
+                for i in range(votes_per_worker):
+                    # mix of up/down votes, switches and toggle-offs
+                    vote_post(post_id, uid, 1 if (i + n) % 3 else -1)
+        except Exception as exc:  # pragma: no cover - surfaced by the assert below
+            errors.append(exc)
+
+    # two workers per user: the same user's concurrent (first) votes must serialize too
+    threads = [threading.Thread(target=hammer, args=(uid, n)) for n, uid in enumerate(user_ids + user_ids)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    with app.app_context():
+        score = db.session.get(Post, post_id).score
+        total = db.session.query(func.coalesce(func.sum(PostVote.value), 0)).filter_by(post_id=post_id).scalar()
+        assert score == total
+        db.drop_all()
+
+
+def test_concurrent_comments_and_votes_keep_thread_counters(tmp_path):
+    from app.ranking import hot_rank
+    from app.services import create_comment, vote_post
+
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'comments.db'}"
+        SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"timeout": 30}}
+
+    app = create_app(FileConfig)
+    workers, comments_per_worker = 6, 10
+
+    with app.app_context():
+        db.create_all()
+        users = [User(username=f"u{i}", password_hash=generate_password_hash("x")) for i in range(workers)]
+        db.session.add_all(users)
+        db.session.commit()
+        post = Post(title="hot", content="x", user_id=users[0].id)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+        user_ids = [u.id for u in users]
+
+    errors = []
+
+    def comment_and_vote(uid: int):
+        try:
+            with app.app_context():
+                for i in range(comments_per_worker):
+                    create_comment(thread_id=post_id, author_id=uid, content=f"c{i}")
+                    vote_post(post_id, uid, 1 if i % 3 else -1)
+        except Exception as exc:  # pragma: no cover - surfaced by the assert below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=comment_and_vote, args=(uid,)) for uid in user_ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    with app.app_context():
+        post = db.session.get(Post, post_id)
+        assert post.comment_count == workers * comments_per_worker == Comment.query.count()
+        assert post.score == db.session.query(func.coalesce(func.sum(PostVote.value), 0)).scalar()
+        assert post.hot_rank == hot_rank(post.score, post.comment_count, post.date_posted)
+        db.drop_all()
+
+
+def test_resolve_my_votes_batches_posts_and_comments(app, user_id):
+    from app.services import resolve_my_votes, vote_post, vote_comment
+
+    with app.app_context():
+        posts = [Post(title=f"t{i}", content="x", user_id=user_id) for i in range(3)]
+        db.session.add_all(posts)
+        db.session.commit()
+        comment = Comment(content="c", user_id=user_id, post_id=posts[0].id)
+        db.session.add(comment)
+        db.session.commit()
+
+        vote_post(posts[0].id, user_id, 1)
+        vote_post(posts[2].id, user_id, -1)
+        vote_comment(comment.id, user_id, -1)
+
+        with app.test_request_context():
+            votes = resolve_my_votes(user_id, post_ids=[p.id for p in posts], comment_ids=[comment.id])
+            assert votes.post(posts[0].id) == 1
+            assert votes.post(posts[1].id) == 0
+            assert votes.post(posts[2].id) == -1
+            assert votes.comment(comment.id) == -1
+        assert resolve_my_votes(None, post_ids=[posts[0].id]).post(posts[0].id) == 0
+
+
+def test_my_votes_lru_is_invalidated_by_vote_writes(app, user_id):
+    from app.services import resolve_my_votes, vote_post
+
+    app.config["MY_VOTES_CACHE_SIZE"] = 16
+    with app.app_context():
+        post = Post(title="t", content="x", user_id=user_id)
+        db.session.add(post)
+        db.session.commit()
+
+        assert resolve_my_votes(user_id, post_ids=[post.id]).post(post.id) == 0
+        vote_post(post.id, user_id, 1)
+        assert resolve_my_votes(user_id, post_ids=[post.id]).post(post.id) == 1
+        vote_post(post.id, user_id, 1)
+        assert resolve_my_votes(user_id, post_ids=[post.id]).post(post.id) == 0